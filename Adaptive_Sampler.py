@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Adaptive_Sampler.py
+Module to choose the time between samples from how fast the signals being
+logged are changing, so that rests are sampled sparsely and transients
+densely.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# ---------
+# Constants
+
+# factor the period grows by on each quiet sample
+default_backoff = 1.25
+
+#
+# ---------
+# Classes
+
+class AdaptiveSampler(object):
+    """
+    Class that drops the sample period to its minimum when the voltage or
+    current changes faster than a threshold, or when an event such as a state
+    change or new setpoint is signalled, and lets it grow back towards its
+    maximum while the signals are steady.
+
+    @attribute min_period      (float)  The shortest time between samples (s)
+    @attribute max_period      (float)  The longest time between samples (s)
+    @attribute dvdt_threshold  (float)  Voltage slope that is treated as a
+                                        transient (V/s)
+    @attribute didt_threshold  (float)  Current slope that is treated as a
+                                        transient (A/s)
+    @attribute backoff         (float)  Factor the period grows by on each
+                                        steady sample
+    @attribute period          (float)  The time until the next sample (s)
+    @attribute samples         (int)    The number of samples taken
+    """
+
+    def __init__(self, min_period, max_period, dvdt_threshold,
+                 didt_threshold, backoff = default_backoff):
+        """
+        Initialise the AdaptiveSampler Object
+
+        @param[in] min_period       The shortest time between samples (float)
+        @param[in] max_period       The longest time between samples (float)
+        @param[in] dvdt_threshold   Voltage transient slope in V/s (float)
+        @param[in] didt_threshold   Current transient slope in A/s (float)
+        @param[in] backoff          Factor to grow the period by (float)
+        """
+        if min_period > max_period:
+            raise ValueError('The minimum sample period must not exceed the '
+                             'maximum')
+        # end if
+
+        self.min_period = min_period
+        self.max_period = max_period
+        self.dvdt_threshold = dvdt_threshold
+        self.didt_threshold = didt_threshold
+        self.backoff = backoff
+        self.period = min_period
+        self.samples = 0
+
+        self.last_time = None
+        self.last_voltage = None
+        self.last_current = None
+        self.triggered = False
+    # end def
+
+    def trigger(self):
+        """
+        Signal an event, such as a state change or a new setpoint, after which
+        the signals are expected to move. The next period is the minimum.
+        """
+        self.triggered = True
+        self.period = self.min_period
+    # end def
+
+    def update(self, sample_time, voltage, current):
+        """
+        Record a sample and choose the time until the next one
+
+        @param[in]  sample_time   When the sample was taken in seconds (float)
+        @param[in]  voltage       The voltage measured in volts (float)
+        @param[in]  current       The current measured in amps (float)
+        @return     (float)       Seconds until the next sample
+        """
+        transient = self.triggered
+
+        if (self.last_time is not None) and (sample_time > self.last_time):
+            dt = sample_time - self.last_time
+
+            if ((voltage is not None) and (self.last_voltage is not None) and
+                (abs(voltage - self.last_voltage)/dt > self.dvdt_threshold)):
+                transient = True
+            # end if
+
+            if ((current is not None) and (self.last_current is not None) and
+                (abs(current - self.last_current)/dt > self.didt_threshold)):
+                transient = True
+            # end if
+        # end if
+
+        if transient:
+            self.period = self.min_period
+
+        else:
+            self.period = min(self.period*self.backoff, self.max_period)
+        # end if
+
+        self.last_time = sample_time
+        self.last_voltage = voltage
+        self.last_current = current
+        self.triggered = False
+        self.samples += 1
+
+        return self.period
+    # end def
+# end class
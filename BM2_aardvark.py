@@ -22,10 +22,18 @@ __version__ = '0.3.1' #Versioning: http://www.python.org/dev/peps/pep-0386/
 # -------
 # Imports
 
-import aardvark_py
+try:
+    import aardvark_py
+except ImportError:
+    # only a simulated backend can be used
+    aardvark_py = None
+# end try
+
 from array import array
 from struct import unpack
 import Tkinter as TK
+import time
+import Coulomb_Counter
 
 
 # ---------
@@ -39,6 +47,14 @@ Pullups = True
 radix = 16
 Bitrate = 100
 
+# GPIO mask of the Aardvark SS pin, used to drive external switches
+GPIO_SS = 0x20
+
+# the GUI refresh period in ms, and the longest gap in its readings that the
+# charge and energy totals integrate over in s
+GUI_update_period = 1000
+GUI_max_gap = 5.0
+
 #
 # ----------------
 # Classes
@@ -104,13 +120,19 @@ class BM2:
     @attribute message      (string) Place to store error messages
     @attribute port         (Aardvark_py.Aardvark handle) 
                                      The aardvark port in use
+    @attribute backend      (object) SMBus object to use in place of the
+                                     aardvark, e.g. a Battery_Sim.SimSMBus
     """ 
 
-    def __init__(self):
+    def __init__(self, backend = None):
         """
         Initialise the BM2 object to its default values
+        
+        @param[in] backend   SMBus object to use instead of connecting to the
+                             aardvark (object)
         """
         self.port = None
+        self.backend = backend
         self.Data = BM2_Data()
         
     #end def
@@ -119,11 +141,7 @@ class BM2:
         """
         For use with the 'with' operator
         """   
-        self.port = configure_aardvark()
-        
-        if (self.port == None):
-            raise IOError("No Aardvark was found")
-        # end if
+        self.open()
         
         #if ((self.get_ChargingVoltage() == 257) 
             #and (self.get_TaperCurrent() == 257)):
@@ -138,10 +156,16 @@ class BM2:
         If used in another 'with' capable module this provides __enter__ 
         functionality
         """
-        self.port = configure_aardvark()
-        
-        if (self.port == None):
-            raise IOError("No Aardvark was found")
+        if self.backend is not None:
+            # use the backend in place of the aardvark
+            self.port = self.backend
+            
+        else:
+            self.port = configure_aardvark()
+            
+            if (self.port == None):
+                raise IOError("No Aardvark was found")
+            # end if
         # end if
     # end def
     
@@ -151,11 +175,7 @@ class BM2:
         
         For use with the 'with' operator
         """      
-        if self.port != None:
-            aardvark_py.aa_close(self.port)
-        #end if
-        
-        self.port = None
+        self.close()
     #end def
     
     def close(self):
@@ -163,7 +183,7 @@ class BM2:
         If used in another 'with' capable module this provided __exit__ 
         functionality
         """
-        if self.port != None:
+        if (self.port != None) and (self.backend is None):
             aardvark_py.aa_close(self.port)
         #end if
         
@@ -217,55 +237,59 @@ class BM2:
     # end def
     
     def get_Voltage(self):
-        return send_SMB_command('0x09', self.port, 'uint')
+        return self.read_register('0x09', 'uint')
     #end def
     
     def get_Current(self):
-        return send_SMB_command('0x0A', self.port, 'int')
+        return self.read_register('0x0A', 'int')
     #end def    
     
     def get_ChargingVoltage(self):
-        return send_SMB_command('0x15', self.port, 'uint')
+        return self.read_register('0x15', 'uint')
     #end def
     
     def get_ChargingCurrent(self):
-        return send_SMB_command('0x14', self.port, 'uint')
+        return self.read_register('0x14', 'uint')
     #end def
     
     def get_OperationStatus(self):
-        return send_SMB_command('0x54', self.port, 'uint')
+        return self.read_register('0x54', 'uint')
     #end def       
     
     def get_SafetyAlert(self):
-        return send_SMB_command('0x50', self.port, 'uint')
+        return self.read_register('0x50', 'uint')
     #end def      
     
     def get_SafetyStatus(self):
-        return send_SMB_command('0x51', self.port, 'uint')
+        return self.read_register('0x51', 'uint')
     #end def    
     
     def get_MaxError(self):
-        return send_SMB_command('0x0C', self.port, 'char')
+        return self.read_register('0x0C', 'char')
     #end def    
     
     def get_BatteryStatus(self):
-        return send_SMB_command('0x16', self.port, 'uint')
+        return self.read_register('0x16', 'uint')
+    #end def    
+    
+    def get_SerialNumber(self):
+        return self.read_register('0x1C', 'uint')
     #end def    
     
     def get_CellVoltage1(self):
-        return send_SMB_command('0x3f', self.port, 'uint')
+        return self.read_register('0x3f', 'uint')
     #end def     
     
     def get_CellVoltage2(self):
-        return send_SMB_command('0x3e', self.port, 'uint')
+        return self.read_register('0x3e', 'uint')
     #end def  
     
     def get_CellVoltage3(self):
-        return send_SMB_command('0x3d', self.port, 'uint')
+        return self.read_register('0x3d', 'uint')
     #end def  
     
     def get_CellVoltage4(self):
-        return send_SMB_command('0x3c', self.port, 'uint')
+        return self.read_register('0x3c', 'uint')
     #end def      
     
     def get_RDIS(self):
@@ -289,23 +313,92 @@ class BM2:
     # end def     
     
     def get_TaperCurrent(self):
-        send_SMB_data(['0x77', '0x24', '0x00'], self.port)
-        aardvark_py.aa_sleep_ms(50) 
-        flash_page = send_SMB_command('0x78', self.port, 'page')
+        self.write_data(['0x77', '0x24', '0x00'])
+        self._wait_ms(50) 
+        flash_page = self.read_register('0x78', 'page')
         flash_page = flash_page[1:] # remove length byte
         return flash_page[3] + flash_page[2]*256
     #end def    
     
     def get_UpdateStatus(self):
-        send_SMB_data(['0x77', '0x52', '0x00'], self.port)
-        aardvark_py.aa_sleep_ms(50) 
-        flash_page = send_SMB_command('0x78', self.port, 'page')
+        self.write_data(['0x77', '0x52', '0x00'])
+        self._wait_ms(50) 
+        flash_page = self.read_register('0x78', 'page')
         flash_page = flash_page[1:] # remove length byte
         return "0x%0.2X" % flash_page[12]
     #end def     
     
     def get_FC(self):
-        return (send_SMB_command('0x16', self.port, 'uint') & int('0020',16)) != 0
+        return (self.read_register('0x16', 'uint') & int('0020',16)) != 0
+    # end def
+    
+    def read_register(self, command, return_format):
+        """
+        Read a register from the BM2
+        
+        @param[in]  command         the hex command to send (string)
+        @param[in]  return_format   format to return the data in (string)
+        @return                     the register value in return_format
+        """
+        if self.backend is not None:
+            return self.backend.read_register(command, return_format)
+        # end if
+        
+        return send_SMB_command(command, self.port, return_format)
+    # end def
+    
+    def write_data(self, data):
+        """
+        Write data to the BM2
+        
+        @param[in]  data   the hex data to send (list of strings)
+        """
+        if self.backend is not None:
+            self.backend.write_data(data)
+            
+        else:
+            send_SMB_data(data, self.port)
+        # end if
+    # end def
+    
+    def gpio_direction(self, mask):
+        """
+        Set which of the aardvark GPIO pins are outputs
+        
+        @param[in]  mask   the output pins, e.g. GPIO_SS (int)
+        """
+        if self.backend is not None:
+            self.backend.gpio_direction(mask)
+            
+        else:
+            aardvark_py.aa_gpio_direction(self.port, mask)
+        # end if
+    # end def
+    
+    def gpio_set(self, value):
+        """
+        Set the state of the aardvark GPIO outputs
+        
+        @param[in]  value   the pins to set high, e.g. GPIO_SS (int)
+        """
+        if self.backend is not None:
+            self.backend.gpio_set(value)
+            
+        else:
+            aardvark_py.aa_gpio_set(self.port, value)
+        # end if
+    # end def
+    
+    def _wait_ms(self, milliseconds):
+        """
+        Give the BM2 time to process a command. A backend responds
+        immediately so does not need the delay.
+        
+        @param[in]  milliseconds   the time to wait (int)
+        """
+        if self.backend is None:
+            aardvark_py.aa_sleep_ms(milliseconds)
+        # end if
     # end def
 # end class
 
@@ -338,6 +431,8 @@ class BM2_GUI:
                                               current.
     @attribute power_value     (TK Label)     Display of the actual load
                                               power.
+    @attribute counter         (CoulombCounter) The charge and energy passed
+                                              since the totals were reset.
     """  
     
     def __init__(self, gui_frame, gui):
@@ -358,6 +453,9 @@ class BM2_GUI:
         # initialise the powerSupply to be used
         self.BM = BM2()
         
+        # running charge and energy totals
+        self.counter = Coulomb_Counter.CoulombCounter(max_gap = GUI_max_gap)
+        
         # load the GUI elements
         self.load_gui()
     # end def
@@ -433,6 +531,25 @@ class BM2_GUI:
         # FC Flag display
         self.FC_flag = TK.Label(self.frame, text = "FC")
         self.FC_flag.grid(row = 4, column = 3, ipadx = 5, ipady = 8)          
+        
+        # charge total display
+        charge_title = TK.Label(self.frame, text = "Charge (Ah)", 
+                                font = "Arial 10 italic")
+        charge_title.grid(row = 5, column = 0)
+        self.charge_value = TK.Label(self.frame, text = "-")
+        self.charge_value.grid(row = 6, column = 0, ipadx = 5, ipady = 8)
+        
+        # energy total display
+        energy_title = TK.Label(self.frame, text = "Energy (Wh)", 
+                                font = "Arial 10 italic")
+        energy_title.grid(row = 5, column = 1)
+        self.energy_value = TK.Label(self.frame, text = "-")
+        self.energy_value.grid(row = 6, column = 1, ipadx = 5, ipady = 8)
+        
+        # button to restart the totals
+        reset_button = TK.Button(self.frame, text = "Reset Totals", 
+                                 command = self.counter.reset)
+        reset_button.grid(row = 5, column = 2, rowspan = 2)
              
         # update the gui from the power supply
         self.update_gui()     
@@ -449,6 +566,8 @@ class BM2_GUI:
         self.charging_current_value.config(text = '-')
         self.update_status_value.config(text = '-')
         self.taper_current_value.config(text = '-')
+        self.charge_value.config(text = '-')
+        self.energy_value.config(text = '-')
         
         self.RDIS_flag.config(background = self.frame.cget('bg'))
         self.QEN_flag.config(background = self.frame.cget('bg'))
@@ -474,8 +593,14 @@ class BM2_GUI:
                     
                 self.enabled = True
                 
-                self.voltage_value.config(text = '%.3f' % (self.BM.get_Voltage()/1000.0))
-                self.current_value.config(text = '%.3f' % (self.BM.get_Current()/1000.0))
+                voltage = self.BM.get_Voltage()/1000.0
+                current = self.BM.get_Current()/1000.0
+                self.counter.add(time.time(), voltage, current)
+                
+                self.voltage_value.config(text = '%.3f' % voltage)
+                self.current_value.config(text = '%.3f' % current)
+                self.charge_value.config(text = '%.4f' % self.counter.amp_hours)
+                self.energy_value.config(text = '%.4f' % self.counter.watt_hours)
                 self.charging_voltage_value.config(text = '%.3f' % (self.BM.get_ChargingVoltage()/1000.0))
                 self.charging_current_value.config(text = '%.3f' % (self.BM.get_ChargingCurrent()/1000.0))
                 self.update_status_value.config(text = self.BM.get_UpdateStatus())
@@ -506,7 +631,7 @@ class BM2_GUI:
         # end try  
         
         # schedule the next repetition of this function
-        self.gui.after(1000, self.update_gui)
+        self.gui.after(GUI_update_period, self.update_gui)
     #end def
     
     def close_GUI(self):
@@ -539,6 +664,11 @@ def configure_aardvark():
     # define the handle to return
     Aardvark_in_use = None
     
+    if aardvark_py is None:
+        print '*** The Aardvark library could not be loaded ***'
+        return Aardvark_in_use
+    # end if
+    
     # find all connected aardvarks
     AA_Devices = aardvark_py.aa_find_devices(1)
     
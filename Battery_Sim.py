@@ -0,0 +1,968 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Battery_Sim.py
+Module to simulate a battery pack with a BM2 gauge, a KA3005P power supply
+and an M9711 DC load so that test sequences can be run without hardware on
+a virtual clock.
+
+The backends plug into the existing drivers:
+
+    clock = Battery_Sim.VirtualClock()
+    pack = Battery_Sim.SimPack(clock = clock)
+    BM = BM2_aardvark.BM2(backend = Battery_Sim.SimSMBus(pack))
+    PS = Power_Supply.PowerSupply('KA3005P', backend = Battery_Sim.SimKorad(pack))
+    Load = DC_Load.DCLoad('M9711', backend = Battery_Sim.SimMaynuo(pack))
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import math
+import threading
+import time
+from struct import pack as struct_pack
+from struct import unpack
+
+import numpy
+
+# ---------
+# Constants
+
+# open circuit voltage of a Li-ion cell (V) against state of charge
+default_ocv_soc = [0.00, 0.02, 0.05, 0.10, 0.20, 0.30, 0.40, 0.50,
+                   0.60, 0.70, 0.80, 0.90, 0.95, 1.00]
+default_ocv = [2.50, 3.00, 3.30, 3.45, 3.55, 3.62, 3.68, 3.74,
+               3.82, 3.91, 4.00, 4.08, 4.13, 4.20]
+
+# series resistance (Ohm) and RC pairs (Ohm, s) of a single cell
+default_R0 = 0.035
+default_RC = [(0.015, 30.0), (0.020, 1200.0)]
+
+# largest step the pack model is integrated over (s)
+max_step = 1.0
+
+# gauge thresholds
+CUV_threshold = 2700            # mV, cell under voltage alert
+CUV_recovery = 3000             # mV, cell under voltage alert clears
+FC_clear_soc = 0.95             # full charge flag clears below this SOC
+taper_current = 250             # mA, full charge is detected below this
+taper_window = 100              # mV, below charging voltage full charge
+                                # can be detected
+quit_current = 10               # mA, the pack is relaxing below this
+OCV_relax_time = 1800           # s, minimum relaxation before an OCV reading
+OCV_dvdt = 4e-6                 # V/s, maximum cell slope for an OCV reading
+
+# ManufacturerAccess command enabling Impedance Track
+IT_ENABLE = 0x0021
+
+# update status values while learning
+UPDATE_STATUS_DISABLED = 0x00
+UPDATE_STATUS_ENABLED = 0x0C
+UPDATE_STATUS_QMAX = 0x0D
+UPDATE_STATUS_RA = 0x0E
+
+# OperationStatus bits, the data is only considered valid with bit 15 set
+OPERATION_QEN = 0x0001
+OPERATION_VOK = 0x0002
+OPERATION_RDIS = 0x0004
+OPERATION_VALID = 0x8000
+
+# GPIO mask of the aardvark SS pin that drives the pack power switch
+GPIO_SS = 0x20
+
+#
+# ---------
+# Classes
+
+class VirtualClock(object):
+    """
+    Class providing time() and sleep() on a simulated clock so sequences run
+    faster than real time.
+
+    @attribute now       (float)   The simulated time in seconds
+    @attribute speedup   (float)   Ratio of simulated to real time, None to
+                                   run as fast as possible
+    """
+
+    def __init__(self, start = None, speedup = None):
+        """
+        Initialise the VirtualClock Object
+
+        @param[in] start     The simulated start time, the real time by
+                             default (float)
+        @param[in] speedup   Ratio of simulated to real time (float)
+        """
+        self.now = start if start is not None else time.time()
+        self.speedup = speedup
+        self._lock = threading.Lock()
+    # end def
+
+    def time(self):
+        """
+        @return   (float)   The simulated time in seconds
+        """
+        return self.now
+    # end def
+
+    def sleep(self, seconds):
+        """
+        Advance the simulated time
+
+        @param[in] seconds   The time to sleep for (float)
+        """
+        if seconds <= 0:
+            return
+        # end if
+
+        if self.speedup is not None:
+            time.sleep(seconds/self.speedup)
+        # end if
+
+        with self._lock:
+            self.now += seconds
+        # end with
+    # end def
+# end class
+
+
+class Cell(object):
+    """
+    Class modelling a single cell as an equivalent circuit: an open circuit
+    voltage that depends on state of charge in series with R0 and RC pairs.
+
+    @attribute capacity   (float)   The capacity in Ah
+    @attribute soc        (float)   The state of charge, 0 to 1
+    @attribute R0         (float)   The series resistance in Ohms
+    @attribute RC         (list)    The (R, tau) of each RC pair
+    @attribute V_RC       (list)    The voltage across each RC pair
+    """
+
+    def __init__(self, capacity = 3.0, soc = 1.0, R0 = default_R0,
+                 RC = default_RC, ocv_soc = default_ocv_soc,
+                 ocv = default_ocv):
+        """
+        Initialise the Cell Object
+
+        @param[in] capacity   The capacity in Ah (float)
+        @param[in] soc        The initial state of charge (float)
+        @param[in] R0         The series resistance in Ohms (float)
+        @param[in] RC         The (R, tau) of each RC pair (list)
+        @param[in] ocv_soc    The SOC points of the OCV curve (list)
+        @param[in] ocv        The OCV at each point in volts (list)
+        """
+        self.capacity = capacity
+        self.soc = soc
+        self.R0 = R0
+        self.RC = list(RC)
+        self.V_RC = [0.0]*len(RC)
+        self.ocv_soc = numpy.asarray(ocv_soc, dtype = float)
+        self.ocv_curve = numpy.asarray(ocv, dtype = float)
+    # end def
+
+    def ocv(self):
+        """
+        @return   (float)   The open circuit voltage in volts
+        """
+        return float(numpy.interp(self.soc, self.ocv_soc, self.ocv_curve))
+    # end def
+
+    def emf(self):
+        """
+        @return   (float)   The voltage with no current through R0
+        """
+        return self.ocv() + sum(self.V_RC)
+    # end def
+
+    def voltage(self, current):
+        """
+        @param[in]  current   Charging current in amps (float)
+        @return     (float)   The terminal voltage in volts
+        """
+        return self.emf() + current*self.R0
+    # end def
+
+    def step(self, current, dt):
+        """
+        Apply a current for a time
+
+        @param[in]  current   Charging current in amps (float)
+        @param[in]  dt        The time step in seconds (float)
+        """
+        self.soc += current*dt/(3600.0*self.capacity)
+        self.soc = min(max(self.soc, 0.0), 1.0)
+
+        for i in range(len(self.RC)):
+            R, tau = self.RC[i]
+            decay = math.exp(-dt/tau)
+            self.V_RC[i] = self.V_RC[i]*decay + current*R*(1 - decay)
+        # end for
+    # end def
+# end class
+
+
+class SimPack(object):
+    """
+    Class modelling a series pack of cells with the behaviour of the BM2 gauge
+    that the test sequences depend on, and the power switch, power supply and
+    load connected to it.
+
+    @attribute clock             (object)  Provides time(), VirtualClock or
+                                           the time module
+    @attribute cells             (list)    The Cells in series
+    @attribute switch            (bool)    Whether the pack is connected to
+                                           the power supply and load
+    @attribute current           (float)   Charging current in amps
+    @attribute ps_on             (bool)    The power supply output state
+    @attribute ps_voltage        (float)   The power supply voltage setting
+    @attribute ps_current        (float)   The power supply current setting
+    @attribute load_on           (bool)    The load input state
+    @attribute load_mode         (string)  The load mode
+    @attribute load_settings     (dict)    The load setting for each mode
+    @attribute serial_number     (int)     The serial number of the gauge
+    """
+
+    def __init__(self, clock = time, cells = 2, capacity = 3.0, soc = 0.5,
+                 imbalance = 0.02, charge_current = 3.5, serial_number = 1):
+        """
+        Initialise the SimPack Object
+
+        @param[in] clock            Object providing time() (object)
+        @param[in] cells            Number of cells in series (int)
+        @param[in] capacity         Nominal cell capacity in Ah (float)
+        @param[in] soc              Initial state of charge (float)
+        @param[in] imbalance        Fractional spread of capacity, SOC and
+                                    resistance between cells (float)
+        @param[in] charge_current   ChargingCurrent reported by the gauge in
+                                    amps (float)
+        @param[in] serial_number    SerialNumber reported by the gauge (int)
+        """
+        self.clock = clock
+        self.cells = []
+        for i in range(cells):
+            # spread the cells evenly either side of nominal
+            if cells > 1:
+                offset = imbalance*(2.0*i/(cells - 1) - 1)
+            else:
+                offset = 0.0
+            # end if
+
+            self.cells.append(Cell(capacity = capacity*(1 - offset),
+                                   soc = min(max(soc + offset/2, 0.0), 1.0),
+                                   R0 = default_R0*(1 + offset)))
+        # end for
+
+        self.switch = True
+        self.current = 0.0
+        self.time = clock.time()
+
+        self.ps_on = False
+        self.ps_voltage = 0.0
+        self.ps_current = 0.0
+        self.ps_output_current = 0.0
+
+        self.load_on = False
+        self.load_mode = 'constant_current'
+        self.load_settings = {'constant_current': 0.0,
+                              'constant_voltage': 0.0,
+                              'constant_power': 0.0,
+                              'constant_resistance': 1000.0}
+
+        # gauge state
+        self.charging_voltage = 4200*cells
+        self.charging_current = int(charge_current*1000)
+        self.serial_number = serial_number
+        self.qen = False
+        self.vok = False
+        self.rdis = False
+        self.fc = False
+        self.cuv = False
+        self.max_error = 100
+        self.update_status = UPDATE_STATUS_DISABLED
+        self.relax_start = None
+        self.last_emf = None
+        self.dvdt = 0.0
+        self.charged = False
+        self.discharged = False
+
+        self.lock = threading.RLock()
+        self._registers = None
+        self._registers_time = None
+    # end def
+
+    def update(self):
+        """
+        Bring the model up to the current time of the clock
+        """
+        with self.lock:
+            now = self.clock.time()
+
+            while self.time < now:
+                dt = min(max_step, now - self.time)
+                self._step(dt)
+                self.time += dt
+            # end while
+        # end with
+    # end def
+
+    def voltage(self):
+        """
+        @return   (float)   The pack terminal voltage in volts
+        """
+        with self.lock:
+            self.update()
+            return sum([cell.voltage(self.current) for cell in self.cells])
+        # end with
+    # end def
+
+    def cell_voltages(self):
+        """
+        @return   (list)   The terminal voltage of each cell in volts
+        """
+        with self.lock:
+            self.update()
+            return [cell.voltage(self.current) for cell in self.cells]
+        # end with
+    # end def
+
+    def soc(self):
+        """
+        @return   (float)   The state of charge of the pack, limited by the
+                            cell with the least charge remaining
+        """
+        with self.lock:
+            self.update()
+            return min([cell.soc for cell in self.cells])
+        # end with
+    # end def
+
+    def set_switch(self, state):
+        """
+        Connect or disconnect the pack from the power supply and load
+
+        @param[in] state   True to connect (bool)
+        """
+        self.change('switch', state)
+    # end def
+
+    def change(self, attribute, value):
+        """
+        Change a setting of the connected equipment, first bringing the model
+        up to date so the old setting applies up to now.
+
+        @param[in] attribute   The attribute to change (string)
+        @param[in] value       Its new value
+        """
+        with self.lock:
+            self.update()
+            setattr(self, attribute, value)
+            self.current = self._solve_current()
+            self._registers_time = None
+        # end with
+    # end def
+
+    def manufacturer_access(self, value):
+        """
+        Handle a command written to ManufacturerAccess
+
+        @param[in] value   The command (int)
+        """
+        with self.lock:
+            self.update()
+
+            if value == IT_ENABLE:
+                self.qen = True
+                self.rdis = False
+                self.update_status = UPDATE_STATUS_ENABLED
+                self.charged = False
+                self.discharged = False
+            # end if
+
+            self._registers_time = None
+        # end with
+    # end def
+
+    def registers(self):
+        """
+        @return   (dict)   The SBS register values by command
+        """
+        with self.lock:
+            self.update()
+
+            # the registers only change as the model steps
+            if self._registers_time == self.time:
+                return self._registers
+            # end if
+
+            cell_mV = [int(round(V*1000)) for V in self.cell_voltages()]
+            cell_mV = (cell_mV + [0, 0, 0, 0])[0:4]
+
+            operation_status = OPERATION_VALID
+            if self.qen:
+                operation_status |= OPERATION_QEN
+            # end if
+            if self.vok:
+                operation_status |= OPERATION_VOK
+            # end if
+            if self.rdis:
+                operation_status |= OPERATION_RDIS
+            # end if
+
+            self._registers_time = self.time
+            self._registers = {
+                    0x09: int(round(self.voltage()*1000)),
+                    0x0A: int(round(self.current*1000)),
+                    0x0C: self.max_error,
+                    0x0D: int(round(self.soc()*100)),
+                    0x0E: int(round(self.soc()*100)),
+                    0x14: 0 if self.fc else self.charging_current,
+                    0x15: self.charging_voltage,
+                    0x16: 0x20 if self.fc else 0x00,
+                    0x1C: self.serial_number,
+                    0x3c: cell_mV[3],
+                    0x3d: cell_mV[2],
+                    0x3e: cell_mV[1],
+                    0x3f: cell_mV[0],
+                    0x50: 0x80 if self.cuv else 0x00,
+                    0x51: 0x00,
+                    0x54: operation_status}
+
+            return self._registers
+        # end with
+    # end def
+
+    def _solve_current(self):
+        """
+        Calculate the pack current from the equipment connected to it
+
+        @return   (float)   Charging current in amps
+        """
+        if not self.switch:
+            return 0.0
+        # end if
+
+        emf = sum([cell.emf() for cell in self.cells])
+        resistance = sum([cell.R0 for cell in self.cells])
+
+        # current drawn by the load
+        load_current = 0.0
+        if self.load_on:
+            setting = self.load_settings[self.load_mode]
+
+            if self.load_mode == 'constant_current':
+                load_current = setting
+
+            elif self.load_mode == 'constant_resistance':
+                load_current = emf/(resistance + setting)
+
+            elif self.load_mode == 'constant_power':
+                load_current = setting/emf
+
+            elif self.load_mode == 'constant_voltage':
+                load_current = max((emf - setting)/resistance, 0.0)
+            # end if
+        # end if
+
+        # current sourced by the power supply in constant voltage, limited
+        # by its current setting
+        ps_current = 0.0
+        if self.ps_on:
+            ps_current = (self.ps_voltage - emf)/resistance + load_current
+            ps_current = min(max(ps_current, 0.0), self.ps_current)
+        # end if
+
+        self.ps_output_current = ps_current
+        return ps_current - load_current
+    # end def
+
+    def _step(self, dt):
+        """
+        Integrate the model over a time step
+
+        @param[in] dt   The time step in seconds (float)
+        """
+        self.current = self._solve_current()
+
+        for cell in self.cells:
+            cell.step(self.current, dt)
+        # end for
+
+        self.current = self._solve_current()
+        self._update_gauge(dt)
+    # end def
+
+    def _update_gauge(self, dt):
+        """
+        Update the gauge flags that the learning cycle waits on. This is a
+        simplified model of Impedance Track that produces the flag and update
+        status sequence of a successful learning cycle.
+
+        @param[in] dt   The time step in seconds (float)
+        """
+        cell_mV = [cell.voltage(self.current)*1000 for cell in self.cells]
+        current_mA = self.current*1000
+
+        # cell under voltage alert with hysteresis
+        if min(cell_mV) < CUV_threshold:
+            self.cuv = True
+
+        elif min(cell_mV) > CUV_recovery:
+            self.cuv = False
+        # end if
+
+        # full charge
+        if ((current_mA > 0) and (current_mA < taper_current) and
+            (sum(cell_mV) > self.charging_voltage - taper_window)):
+            self.fc = True
+
+        elif min([cell.soc for cell in self.cells]) < FC_clear_soc:
+            self.fc = False
+        # end if
+
+        # track the slowest settling cell to decide when the pack is relaxed
+        emf = max([cell.emf() for cell in self.cells])
+        if self.last_emf is not None:
+            self.dvdt = abs(emf - self.last_emf)/dt
+        # end if
+        self.last_emf = emf
+
+        if abs(current_mA) > quit_current:
+            self.relax_start = None
+
+            if self.qen:
+                self.vok = True
+
+                if current_mA > 0:
+                    self.charged = True
+
+                else:
+                    self.discharged = True
+                # end if
+            # end if
+
+        elif self.relax_start is None:
+            self.relax_start = self.time
+        # end if
+
+        # take an OCV reading once relaxed
+        if (self.vok and (self.relax_start is not None) and
+            ((self.time - self.relax_start) >= OCV_relax_time) and
+            (self.dvdt < OCV_dvdt)):
+            self.vok = False
+
+            if self.update_status == UPDATE_STATUS_ENABLED and self.charged:
+                # Qmax update after a charge and relaxation
+                self.update_status = UPDATE_STATUS_QMAX
+                self.max_error = 3
+
+            elif self.update_status == UPDATE_STATUS_QMAX and self.discharged:
+                # resistance update after a discharge and relaxation
+                self.update_status = UPDATE_STATUS_RA
+                self.max_error = 1
+            # end if
+
+            self.charged = False
+            self.discharged = False
+        # end if
+    # end def
+# end class
+
+
+class SimSMBus(object):
+    """
+    Class providing the BM2 register set of a SimPack as a backend for
+    BM2_aardvark.BM2. The aardvark SS GPIO drives the pack power switch.
+
+    @attribute pack           (SimPack)  The simulated pack
+    @attribute transactions   (int)      The number of SMBus transactions
+    """
+
+    def __init__(self, pack):
+        """
+        Initialise the SimSMBus Object
+
+        @param[in] pack   The simulated pack (SimPack)
+        """
+        self.pack = pack
+        self.transactions = 0
+        self.subclass = 0
+        self.gpio_outputs = 0
+    # end def
+
+    def read_register(self, command, return_format):
+        """
+        Read a register in the format send_SMB_command returns it
+
+        @param[in]  command         the hex command (string)
+        @param[in]  return_format   format to return the data in (string)
+        @return                     the register value in return_format
+        """
+        self.transactions += 1
+        command = int(command, 16)
+
+        if return_format == 'page':
+            return self._page(command)
+        # end if
+
+        value = self.pack.registers().get(command, 0)
+        raw = struct_pack('<H', value & 0xFFFF)
+
+        if return_format == 'none':
+            return None
+
+        elif return_format == 'int':
+            return unpack('<h', raw)[0]
+
+        elif return_format == 'uint':
+            return unpack('<H', raw)[0]
+
+        elif return_format == 'char':
+            return unpack('<B', raw[0:1])[0]
+
+        elif return_format == 'schar':
+            return unpack('<b', raw[0:1])[0]
+
+        elif return_format == 'hex':
+            return ' '.join(['%02X' % x for x in reversed(bytearray(raw))])
+        # end if
+
+        return None
+    # end def
+
+    def write_data(self, data):
+        """
+        Write data to the gauge
+
+        @param[in]  data   the hex data to send (list of strings)
+        """
+        self.transactions += 1
+        data = [int(byte, 16) for byte in data]
+
+        if (len(data) == 3) and (data[0] == 0x00):
+            # ManufacturerAccess
+            self.pack.manufacturer_access(data[1] + data[2]*256)
+
+        elif (len(data) == 3) and (data[0] == 0x77):
+            # select a data flash subclass to read from 0x78
+            self.subclass = data[1] + data[2]*256
+        # end if
+    # end def
+
+    def gpio_direction(self, mask):
+        """
+        @param[in]  mask   the output pins (int)
+        """
+        self.gpio_outputs = mask
+    # end def
+
+    def gpio_set(self, value):
+        """
+        @param[in]  value   the pins to set high (int)
+        """
+        self.pack.set_switch((value & GPIO_SS) != 0)
+    # end def
+
+    def close(self):
+        """
+        Nothing to close
+        """
+        pass
+    # end def
+
+    def _page(self, command):
+        """
+        Build a data flash page of the selected subclass
+
+        @param[in]  command   the command being read (int)
+        @return     (list)    the page, starting with its length byte
+        """
+        data = [0]*31
+
+        if (command == 0x78) and (self.subclass == 0x52):
+            data[12] = self.pack.update_status
+
+        elif (command == 0x78) and (self.subclass == 0x24):
+            data[2] = (taper_current >> 8) & 0xFF
+            data[3] = taper_current & 0xFF
+        # end if
+
+        return [len(data)] + data
+    # end def
+# end class
+
+
+class SimKorad(object):
+    """
+    Class providing the KoradSerial interface used by Power_Supply for a
+    SimPack.
+
+    @attribute pack       (SimPack)  The simulated pack
+    @attribute channels   (list)     The output channels
+    @attribute output     (object)   The output on/off button
+    """
+
+    def __init__(self, pack):
+        """
+        Initialise the SimKorad Object
+
+        @param[in] pack   The simulated pack (SimPack)
+        """
+        self.pack = pack
+        self.channels = [_SimKoradChannel(pack)]
+        self.output = _SimKoradOutput(pack)
+    # end def
+
+    def __enter__(self):
+        return self
+    # end def
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+        return False
+    # end def
+
+    @property
+    def status(self):
+        """
+        @return   (object)   The output state and channel mode, each with a
+                             name as KoradSerial.Status gives
+        """
+        pack = self.pack
+        with pack.lock:
+            pack.update()
+
+            if pack.ps_on and (pack.ps_output_current >= pack.ps_current):
+                mode = 'constant_current'
+            else:
+                mode = 'constant_voltage'
+            # end if
+
+            return _SimKoradStatus('on' if pack.ps_on else 'off', mode)
+        # end with
+    # end def
+
+    def close(self):
+        """
+        Nothing to close
+        """
+        pass
+    # end def
+# end class
+
+
+class SimMaynuo(object):
+    """
+    Class providing the MaynuoDCLoad interface used by DC_Load for a SimPack.
+
+    @attribute pack   (SimPack)  The simulated pack
+    """
+
+    def __init__(self, pack):
+        """
+        Initialise the SimMaynuo Object
+
+        @param[in] pack   The simulated pack (SimPack)
+        """
+        self.pack = pack
+        self.running = False
+    # end def
+
+    def __enter__(self):
+        self.running = True
+        return self
+    # end def
+
+    def __exit__(self, type, value, traceback):
+        self.running = False
+    # end def
+
+    def on(self):
+        self.pack.change('load_on', True)
+    # end def
+
+    def off(self):
+        self.pack.change('load_on', False)
+    # end def
+
+    def getInputStatus(self):
+        return 'on' if self.pack.load_on else 'off'
+    # end def
+
+    def getMode(self):
+        return self.pack.load_mode
+    # end def
+
+    def setMode(self, mode):
+        if mode in self.pack.load_settings:
+            self.pack.change('load_mode', mode)
+        # end if
+    # end def
+
+    def setPC2(self, value):
+        pass
+    # end def
+
+    def getVoltage(self):
+        with self.pack.lock:
+            return self.pack.voltage() if self.pack.switch else 0.0
+        # end with
+    # end def
+
+    def getCurrent(self):
+        with self.pack.lock:
+            self.pack.update()
+            if not (self.pack.switch and self.pack.load_on):
+                return 0.0
+            # end if
+
+            return self.pack.ps_output_current - self.pack.current
+        # end with
+    # end def
+
+    def getConstantCurrent(self):
+        return self.pack.load_settings['constant_current']
+    # end def
+
+    def getConstantVoltage(self):
+        return self.pack.load_settings['constant_voltage']
+    # end def
+
+    def getConstantPower(self):
+        return self.pack.load_settings['constant_power']
+    # end def
+
+    def getConstantResistance(self):
+        return self.pack.load_settings['constant_resistance']
+    # end def
+
+    def setConstantCurrent(self, value):
+        self._set('constant_current', value)
+    # end def
+
+    def setConstantVoltage(self, value):
+        self._set('constant_voltage', value)
+    # end def
+
+    def setConstantPower(self, value):
+        self._set('constant_power', value)
+    # end def
+
+    def setConstantResistance(self, value):
+        self._set('constant_resistance', value)
+    # end def
+
+    def _set(self, mode, value):
+        settings = dict(self.pack.load_settings)
+        settings[mode] = float(value)
+        self.pack.change('load_settings', settings)
+    # end def
+# end class
+
+
+class _SimKoradChannel(object):
+    """
+    Class providing KoradSerial.Channel for a SimPack
+    """
+
+    def __init__(self, pack):
+        self.pack = pack
+    # end def
+
+    @property
+    def current(self):
+        return self.pack.ps_current
+    # end def
+
+    @current.setter
+    def current(self, value):
+        self.pack.change('ps_current', float(value))
+    # end def
+
+    @property
+    def voltage(self):
+        return self.pack.ps_voltage
+    # end def
+
+    @voltage.setter
+    def voltage(self, value):
+        self.pack.change('ps_voltage', float(value))
+    # end def
+
+    @property
+    def output_current(self):
+        with self.pack.lock:
+            self.pack.update()
+            return self.pack.ps_output_current if self.pack.switch else 0.0
+        # end with
+    # end def
+
+    @property
+    def output_voltage(self):
+        with self.pack.lock:
+            if not self.pack.ps_on:
+                return 0.0
+
+            elif self.pack.switch:
+                return self.pack.voltage()
+            # end if
+
+            return self.pack.ps_voltage
+        # end with
+    # end def
+# end class
+
+
+class _SimKoradOutput(object):
+    """
+    Class providing KoradSerial.OnOffButton for a SimPack
+    """
+
+    def __init__(self, pack):
+        self.pack = pack
+    # end def
+
+    def on(self):
+        self.pack.change('ps_on', True)
+    # end def
+
+    def off(self):
+        self.pack.change('ps_on', False)
+    # end def
+# end class
+
+
+class _SimKoradStatus(object):
+    """
+    Class providing the parts of KoradSerial.Status used by Power_Supply
+    """
+
+    def __init__(self, output, mode):
+        self.output = _Named(output)
+        self.channel1 = _Named(mode)
+    # end def
+# end class
+
+
+class _Named(object):
+    """
+    Class standing in for an Enum member, which Power_Supply reads the name of
+    """
+
+    def __init__(self, name):
+        self.name = name
+    # end def
+# end class
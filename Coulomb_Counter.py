@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Coulomb_Counter.py
+Module to integrate the charge and energy passed by a cell from voltage and
+current samples as they are taken.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# ---------
+# Constants
+
+seconds_per_hour = 3600.0
+
+#
+# ---------
+# Classes
+
+class CoulombCounter(object):
+    """
+    Class that integrates timestamped voltage and current samples with the
+    trapezoidal rule into running charge and energy totals. The totals
+    follow the sign of the current.
+
+    Intervals longer than the maximum gap, such as when logging was paused
+    or a reading failed, are not integrated across, as the current during
+    them is not known. They are counted so that the totals can be judged.
+
+    @attribute max_gap          (float)  The longest interval integrated (s),
+                                         None to integrate every interval
+    @attribute capacity_target  (float)  The charge at which the target is
+                                         reached (Ah), None for no target
+    @attribute energy_target    (float)  The energy at which the target is
+                                         reached (Wh), None for no target
+    @attribute amp_hours        (float)  The charge passed (Ah)
+    @attribute watt_hours       (float)  The energy passed (Wh)
+    @attribute duration         (float)  The time integrated over (s)
+    @attribute samples          (int)    The number of samples added
+    @attribute gaps             (int)    The number of intervals skipped
+    @attribute gap_time         (float)  The time skipped in gaps (s)
+    """
+
+    def __init__(self, max_gap = None, capacity_target = None,
+                 energy_target = None):
+        """
+        Initialise the CoulombCounter Object
+
+        @param[in] max_gap           The longest interval to integrate in
+                                     seconds (float)
+        @param[in] capacity_target   Charge to stop at in Ah (float)
+        @param[in] energy_target     Energy to stop at in Wh (float)
+        """
+        self.max_gap = max_gap
+        self.capacity_target = capacity_target
+        self.energy_target = energy_target
+        self.reset()
+    # end def
+
+    def reset(self):
+        """
+        Clear the totals, e.g. at the start of a new charge or discharge
+        """
+        self.amp_hours = 0.0
+        self.watt_hours = 0.0
+        self.duration = 0.0
+        self.samples = 0
+        self.gaps = 0
+        self.gap_time = 0.0
+
+        self.last_time = None
+        self.last_voltage = None
+        self.last_current = None
+    # end def
+
+    def add(self, sample_time, voltage, current):
+        """
+        Add a sample to the totals
+
+        @param[in]  sample_time   When the sample was taken in seconds (float)
+        @param[in]  voltage       The voltage in volts (float)
+        @param[in]  current       The current in amps (float)
+        """
+        if self.last_time is not None:
+            dt = sample_time - self.last_time
+
+            if dt <= 0:
+                # a repeated or out of order sample adds nothing
+                return
+
+            elif (self.max_gap is not None) and (dt > self.max_gap):
+                self.gaps += 1
+                self.gap_time += dt
+
+            else:
+                self.amp_hours += ((self.last_current + current)/2.0*dt/
+                                   seconds_per_hour)
+                self.watt_hours += ((self.last_voltage*self.last_current +
+                                     voltage*current)/2.0*dt/
+                                    seconds_per_hour)
+                self.duration += dt
+            # end if
+        # end if
+
+        self.last_time = sample_time
+        self.last_voltage = voltage
+        self.last_current = current
+        self.samples += 1
+    # end def
+
+    def target_reached(self):
+        """
+        @return   (bool)   True once the charge or energy passed, in either
+                           direction, has reached its target
+        """
+        if ((self.capacity_target is not None) and
+            (abs(self.amp_hours) >= self.capacity_target)):
+            return True
+
+        elif ((self.energy_target is not None) and
+              (abs(self.watt_hours) >= self.energy_target)):
+            return True
+        # end if
+
+        return False
+    # end def
+
+    def report(self):
+        """
+        @return   (string)   A summary of the totals
+        """
+        summary = ('%.4f Ah, %.4f Wh over %.2f hours' %
+                   (abs(self.amp_hours), abs(self.watt_hours),
+                    self.duration/seconds_per_hour))
+
+        if self.gaps > 0:
+            summary += (' (' + str(self.gaps) + ' gaps totalling %.0f s '
+                        'were not integrated)' % self.gap_time)
+        # end if
+
+        return summary
+    # end def
+# end class
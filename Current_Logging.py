@@ -1,4 +1,5 @@
 import Multimeter
+import Scheduler
 import time
 import csv
 import os
@@ -9,6 +10,10 @@ filename = "Multimeter_log.csv"
 logging_period = 0.1
 logging_duration = 10
 
+# take the readings as a single buffered burst rather than polling
+burst_mode = False
+burst_nplc = 0.02
+
 full_filename = os.getcwd() + '/' + filename
 
 # delete the old file if it exists
@@ -33,22 +38,39 @@ start_time = time.time()
 
 # open the multimeter
 with Multimeter.Multimeter("DM3058E") as dmm:
-    # constrain the logging to the time requested
-    while (time.time() - start_time < logging_duration):
+    if burst_mode:
+        # capture the whole log in one transfer from the meter
+        times, currents = dmm.get_burst('dc_current', 
+                                        int(logging_duration/logging_period), 
+                                        logging_period, burst_nplc)
+        
+        for row in zip(times, currents):
+            output_writer.writerow(row)
+        # end for
+    
+    else:
+        # pace the readings to deadlines a logging period apart so the time
+        # taken by each reading does not add to the period
+        scheduler = Scheduler.PeriodicScheduler(logging_period)
+        scheduler.start()
         
-        # read the current
-        current = dmm.get_DC_current()
+        # constrain the logging to the time requested
+        while (scheduler.elapsed() < logging_duration):
         
-        # capture the time stamp (after current incase current reading takes variable time)
-        loop_time = time.time()
+            # read the current
+            current = dmm.get_DC_current()
         
-        output_writer.writerow([(loop_time-start_time), current])
+            # capture the time stamp (after current incase current reading takes variable time)
+            loop_time = scheduler.elapsed()
         
-        # waste extra time
-        while (time.time() - loop_time) < logging_period:
-            time.sleep(0.001)
+            output_writer.writerow([loop_time, current])
+        
+            # wait for the next deadline
+            scheduler.wait()
         # end while
-    # end while
+        
+        print scheduler.report()
+    # end if
 # end with
 
 csv_output.close()
@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Cycle_Report.py
+Module to summarise the learning cycle logs, giving the capacity, energy,
+efficiency, time in each state and lowest cell voltage of each run.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import csv
+import glob
+import json
+import os
+import sys
+
+import numpy
+
+import Log_Reader
+import Result_Cache
+
+# ---------
+# Constants
+
+# the logs reported by default
+log_file_pattern = 'log file *.csv'
+
+# where the result for each log is cached
+default_cache_dir = 'Cycle report cache'
+
+# the summary table written by default
+report_filename = 'Cycle report.csv'
+
+# changed whenever the report changes so that old cache entries are not used
+cache_version = '1'
+
+# the states of Learning_cycle that can be told apart from a log. The IT
+# setup is not among them, as QEN is set throughout the logs.
+INITIAL_DISCHARGE       = 'INITIAL_DISCHARGE'
+LOW_REST                = 'LOW_REST'
+CHARGE                  = 'CHARGE'
+VOK_WAIT                = 'VOK_WAIT'
+FINAL_DISCHARGE         = 'FINAL_DISCHARGE'
+MAX_ERROR_WAIT          = 'MAX_ERROR_WAIT'
+
+states = [INITIAL_DISCHARGE, LOW_REST, CHARGE, VOK_WAIT, FINAL_DISCHARGE,
+          MAX_ERROR_WAIT]
+
+# current magnitude above which the pack is charging or discharging (A)
+current_threshold = 0.05
+
+# number of consecutive samples the pack must be charging, discharging or
+# resting for to count as a change of state
+state_debounce = 3
+
+# the longest interval integrated across, longer ones are gaps in the log
+# (s)
+max_gap = 120.0
+
+# the value logged for a register the BM2 did not answer, which is what the
+# read buffer is filled with
+failed_read = 257
+
+# the flags that end a charge and a discharge, as BM2_aardvark.get_FC and
+# get_CUV
+full_charge_mask = 0x0020
+cell_undervoltage_mask = 0x0080
+
+# the columns read from each log
+log_columns = ['time', 'voltage', 'current', 'battery_status',
+               'safety_alert', 'cell_voltage1', 'cell_voltage2',
+               'cell_voltage3', 'cell_voltage4']
+
+seconds_per_hour = 3600.0
+
+#
+# ----------------
+# Public Functions
+
+def load_log(filename):
+    """
+    Load a learning cycle log, dropping the samples where the voltage or
+    current was not read
+
+    @param[in]  filename   The log filename (string)
+    @return     (dict)     The log_columns as arrays, by name, the voltages
+                           in volts, the current in amps and positive when
+                           charging, and the cell voltages NaN where there is
+                           no cell or it was not read
+    """
+    with Log_Reader.LogReader(filename, convert = False,
+                              names = log_columns) as reader:
+        if reader.schema != 'learning':
+            raise ValueError(filename + ' is not a learning cycle log')
+        # end if
+
+        data = reader.read_all()
+        scales = dict([(column.name, column.scale)
+                       for column in reader.columns])
+    # end with
+
+    read = (data['voltage'] != failed_read) & (data['current'] != failed_read)
+
+    result = {}
+    for name in log_columns:
+        values = data[name][read]
+
+        if name.startswith('cell_voltage'):
+            values = numpy.where((values == 0) | (values == failed_read),
+                                 numpy.nan, values*scales[name])
+
+        elif scales[name] != 1:
+            values = values*scales[name]
+        # end if
+
+        result[name] = values
+    # end for
+
+    return result
+# end def
+
+
+def infer_states(current, battery_status, safety_alert):
+    """
+    Find the state of the learning cycle at each sample. The pack is
+    charging or discharging while the current is above the threshold, until
+    FC ends a charge or CUV ends a discharge as they do in Learning_cycle.
+    A discharge after a charge is the final discharge, and the rests are
+    named by whether the pack has been charged and finally discharged.
+
+    @param[in]  current          The current in amps, positive when
+                                 charging (array)
+    @param[in]  battery_status   The BatteryStatus flags (array)
+    @param[in]  safety_alert     The SafetyAlert flags (array)
+    @return     (array)          The index in states of each sample
+    """
+    activity = numpy.zeros(len(current), dtype = int)
+    activity[(current > current_threshold) &
+             ((battery_status & full_charge_mask) == 0)] = 1
+    activity[(current < -current_threshold) &
+             ((safety_alert & cell_undervoltage_mask) == 0)] = -1
+    activity = _debounce(activity, state_debounce)
+
+    charged = numpy.maximum.accumulate(activity == 1)
+    final = numpy.maximum.accumulate((activity == -1) & charged)
+
+    result = numpy.where(final, states.index(MAX_ERROR_WAIT),
+                         numpy.where(charged, states.index(VOK_WAIT),
+                                     states.index(LOW_REST)))
+    result[activity == 1] = states.index(CHARGE)
+    result[(activity == -1) & ~charged] = states.index(INITIAL_DISCHARGE)
+    result[(activity == -1) & charged] = states.index(FINAL_DISCHARGE)
+
+    return result
+# end def
+
+
+def summarise_run(data):
+    """
+    Integrate a log with the trapezoidal rule, as Coulomb_Counter does,
+    giving each interval to the state it starts in. Repeated samples add
+    nothing and gaps longer than max_gap are not integrated across.
+
+    @param[in]  data    The log, as load_log (dict)
+    @return     (dict)  discharge_capacity (Ah) and discharge_energy (Wh)
+                        of the final discharge, charge_capacity (Ah) and
+                        charge_energy (Wh) of the charge, the
+                        coulombic_efficiency and energy_efficiency of the
+                        two, NaN where the run has no charge or no final
+                        discharge, min_cell_voltage (V) and min_cell, the
+                        number of the cell, state_time (s), state_charge
+                        (Ah) and state_energy (Wh) by state, charge into
+                        the pack being positive, and the duration (s),
+                        gap_time (s) and samples
+    """
+    time = data['time']
+    voltage = data['voltage']
+    current = data['current']
+
+    if len(time) < 2:
+        raise ValueError('The log has too few samples to report')
+    # end if
+
+    state = infer_states(current, data['battery_status'],
+                         data['safety_alert'])[:-1]
+
+    intervals = numpy.diff(time)
+    dt = numpy.where((intervals > 0) & (intervals <= max_gap), intervals,
+                     0.0)
+    charge = (current[1:] + current[:-1])/2.0*dt/seconds_per_hour
+    power = voltage*current
+    energy = (power[1:] + power[:-1])/2.0*dt/seconds_per_hour
+
+    result = {'state_time': {}, 'state_charge': {}, 'state_energy': {}}
+    for index, name in enumerate(states):
+        in_state = state == index
+        result['state_time'][name] = float(dt[in_state].sum())
+        result['state_charge'][name] = float(charge[in_state].sum())
+        result['state_energy'][name] = float(energy[in_state].sum())
+    # end for
+
+    result['discharge_capacity'] = numpy.nan
+    result['discharge_energy'] = numpy.nan
+    if result['state_time'][FINAL_DISCHARGE] > 0:
+        result['discharge_capacity'] = \
+            -result['state_charge'][FINAL_DISCHARGE]
+        result['discharge_energy'] = -result['state_energy'][FINAL_DISCHARGE]
+    # end if
+
+    result['charge_capacity'] = numpy.nan
+    result['charge_energy'] = numpy.nan
+    if result['state_time'][CHARGE] > 0:
+        result['charge_capacity'] = result['state_charge'][CHARGE]
+        result['charge_energy'] = result['state_energy'][CHARGE]
+    # end if
+
+    # NaN unless the run was both charged and finally discharged
+    result['coulombic_efficiency'] = (result['discharge_capacity']/
+                                      result['charge_capacity'])
+    result['energy_efficiency'] = (result['discharge_energy']/
+                                   result['charge_energy'])
+
+    cells = numpy.column_stack([data['cell_voltage' + str(cell)]
+                                for cell in range(1, 5)])
+    result['min_cell_voltage'] = numpy.nan
+    result['min_cell'] = None
+    if not numpy.isnan(cells).all():
+        lowest = numpy.nanargmin(cells)
+        result['min_cell_voltage'] = float(cells.flat[lowest])
+        result['min_cell'] = int(lowest % cells.shape[1]) + 1
+    # end if
+
+    result['duration'] = float(dt.sum())
+    result['gap_time'] = float(intervals[intervals > max_gap].sum())
+    result['samples'] = len(time)
+
+    return result
+# end def
+
+
+def report_file(filename, cache_dir = default_cache_dir):
+    """
+    Summarise a log, using the cached result if the log has been reported
+    before
+
+    @param[in]  filename    The log filename (string)
+    @param[in]  cache_dir   The cache directory, None to not cache (string)
+    @return     (dict)      The summary, as summarise_run
+    """
+    return Result_Cache.cached(filename, cache_dir, cache_version, '.json',
+                               lambda: summarise_run(load_log(filename)),
+                               _load_json, _save_json)
+# end def
+
+
+def report_all(filenames = None, cache_dir = default_cache_dir,
+               processes = None):
+    """
+    Summarise several logs in parallel. The logs that are empty or not
+    learning cycle logs are left out.
+
+    @param[in]  filenames   The logs, all the learning cycle logs in the
+                            working directory by default (list)
+    @param[in]  cache_dir   The cache directory, None to not cache (string)
+    @param[in]  processes   The number of worker processes, one per core by
+                            default (int)
+    @return     (dict)      The summary of each log by filename
+    """
+    if filenames is None:
+        filenames = sorted(glob.glob(log_file_pattern))
+    # end if
+
+    # an empty log, or one that is not a learning cycle log, raises a
+    # ValueError and has nothing to report
+    results = Result_Cache.map_files(report_file, filenames, cache_dir,
+                                     processes, skipped = (ValueError,))
+
+    return dict([(filename, result)
+                 for filename, result in zip(filenames, results)
+                 if result is not None])
+# end def
+
+
+def write_report(results, filename = report_filename):
+    """
+    Write the summary of each log as a row of a tab delimited table, in
+    order of name. Values a run does not have are left empty.
+
+    @param[in]  results    The summary of each log by filename (dict)
+    @param[in]  filename   The file to write (string)
+    """
+    headings = (['Log', 'Duration (h)', 'Discharge Capacity (Ah)',
+                 'Charge Capacity (Ah)', 'Discharge Energy (Wh)',
+                 'Charge Energy (Wh)', 'Coulombic Efficiency (%)',
+                 'Energy Efficiency (%)', 'Min Cell Voltage (V)',
+                 'Min Cell'] +
+                [state.replace('_', ' ').title() + ' (h)'
+                 for state in states] +
+                ['Gaps (h)'])
+
+    with open(filename, 'wb' if sys.version_info[0] < 3 else 'w') \
+            as csv_output:
+        output_writer = csv.writer(csv_output, delimiter = '\t')
+        output_writer.writerow(headings)
+
+        for name in sorted(results):
+            result = results[name]
+
+            row = ([os.path.splitext(os.path.basename(name))[0],
+                    result['duration']/seconds_per_hour,
+                    result['discharge_capacity'], result['charge_capacity'],
+                    result['discharge_energy'], result['charge_energy'],
+                    result['coulombic_efficiency']*100,
+                    result['energy_efficiency']*100,
+                    result['min_cell_voltage'], result['min_cell']] +
+                   [result['state_time'][state]/seconds_per_hour
+                    for state in states] +
+                   [result['gap_time']/seconds_per_hour])
+
+            output_writer.writerow([_format(value) for value in row])
+        # end for
+    # end with
+# end def
+
+
+#
+# ----------------
+# Private Functions
+
+def _debounce(activity, samples):
+    """
+    @param[in]  activity   1 charging, -1 discharging or 0 resting at each
+                           sample (array)
+    @param[in]  samples    The fewest consecutive samples of a change that
+                           are kept (int)
+    @return     (array)    The activity with the shorter runs replaced by
+                           the run before them
+    """
+    result = activity.copy()
+    starts = numpy.flatnonzero(numpy.diff(activity)) + 1
+    ends = numpy.append(starts[1:], len(activity))
+
+    for start, end in zip(starts, ends):
+        if end - start < samples:
+            result[start:end] = result[start - 1]
+        # end if
+    # end for
+
+    return result
+# end def
+
+
+def _format(value):
+    """
+    @param[in]  value      A value of the table (string, int or float)
+    @return     (string)   The value as written, empty for None or NaN
+    """
+    if value is None:
+        return ''
+
+    elif isinstance(value, float):
+        return '' if numpy.isnan(value) else '%.4f' % value
+    # end if
+
+    return str(value)
+# end def
+
+
+def _load_json(filename):
+    """
+    @param[in]  filename   A cache entry (string)
+    @return     (dict)     The summary in the entry
+    """
+    with open(filename, 'r') as cached:
+        return json.load(cached)
+    # end with
+# end def
+
+
+def _save_json(filename, result):
+    """
+    @param[in]  filename   The cache entry to write (string)
+    @param[in]  result     The summary (dict)
+    """
+    with open(filename, 'w') as cached:
+        json.dump(result, cached)
+    # end with
+# end def
+
+
+def _main():
+    """
+    Summarise every learning cycle log in the working directory
+    """
+    filenames = sorted(glob.glob(log_file_pattern))
+    results = report_all(filenames)
+
+    for filename in sorted(results):
+        result = results[filename]
+
+        print('%-30s %6.1f h  %7.3f Ah  %7.3f Ah  %5.1f %%  %5.1f %%  '
+              '%.3f V' %
+              (os.path.splitext(os.path.basename(filename))[0],
+               result['duration']/seconds_per_hour,
+               result['discharge_capacity'], result['charge_capacity'],
+               result['coulombic_efficiency']*100,
+               result['energy_efficiency']*100,
+               result['min_cell_voltage']))
+    # end for
+
+    print(str(len(filenames) - len(results)) + ' logs had nothing to report')
+
+    write_report(results)
+# end def
+
+if __name__ == '__main__':
+    # if this code is not running as an imported module write the report
+    _main()
+# end if
@@ -52,29 +52,39 @@ class DCLoad(object):
     @attribute port     (string)     The COM port being used by the DC Load
     @attribute addr     (int)        The address of the Load
     @attribute Load     (object)     The DC Load object
+    @attribute backend  (object)     Load object to use in place of the 
+                                     hardware, e.g. a Battery_Sim.SimMaynuo
     """    
     
-    def __init__(self, Model, address = None):
+    def __init__(self, Model, address = None, backend = None):
         """
         Initialise the DCLoad Object
     
         @param[in] Model     The model of the DC Load selected (string)
+        @param[in] address   The modbus address of the Load (int)
+        @param[in] backend   Load object to use instead of connecting to the
+                             hardware (object)
         """       
         
         # Initialise attributes
         self.model = Model
         self.port = 'NULL'
         self.addr = None
+        self.backend = backend
         
         # check to see if the model requested is selected
-        if self.model == 'M9711':
-            # find the port associated with the M97121 Load
-            [self.port, self.addr] = findM9711Port(address)
-            
-        else:
+        if self.model not in ['M9711']:
             # The requested load is not supported
             raise ValueError('The DC Load model selected is not supported'+
                              'by this Module')
+        
+        elif self.backend is not None:
+            # no hardware to find
+            pass
+        
+        elif self.model == 'M9711':
+            # find the port associated with the M97121 Load
+            [self.port, self.addr] = findM9711Port(address)
         # end if        
     #end def
     
@@ -86,8 +96,12 @@ class DCLoad(object):
     
         """        
         
+        if self.backend is not None:
+            # use the backend in place of the hardware
+            self.Load = self.backend
+        
         # check to see if a power supply has been detected previously
-        if self.port == 'NULL':
+        elif self.port == 'NULL':
             # it has not so attempt to detect one based on the model requested
             if self.model == 'M9711':
                 # find the port associated with the KA3005P
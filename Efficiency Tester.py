@@ -1,7 +1,9 @@
 import DC_Load
 import Power_Supply
-import csv
-import time
+import Efficiency_Sweep
+import Grid_Plot
+import Log_Reader
+import Settling_Detector
 import numpy
 import os
 import matplotlib.pyplot as plt
@@ -34,220 +36,104 @@ full_filename = os.getcwd() + '/' + output_filename
 output_filename2 = "Voltage test.csv"
 full_filename2 = os.getcwd() + '/' + output_filename2
 
+# every point measured is added to this log, so that a sweep can resume
+points_filename = os.getcwd() + '/' + "Efficiency points.csv"
+
 timestep = 2
 
-## initialise the equipment
-#PS = Power_Supply.PowerSupply('KA3005P')
-#Load = DC_Load.DCLoad('M9711')
-
-## init the CSV
-#if os.path.isfile(full_filename):
-    #os.remove(full_filename);
-## end if
-
-## init the CSV
-#if os.path.isfile(full_filename2):
-    #os.remove(full_filename2);
-## end if
-
-#start_time = time.time()
-
-## set up the csv writing output
-#with open(full_filename, 'wb') as csv_output:
-    #output_writer = csv.writer(csv_output, delimiter = '\t')
-    
-    ## write the header row
-    #output_writer.writerow(['Efficiency'])
-    
-    ## write the second row
-    #second_row = ['', 'Power'] + power_settings
-    #output_writer.writerow(second_row)
-    
-    ## write the third row
-    #output_writer.writerow(['Voltage'])    
-    
-    ## set up the csv writing output
-    #with open(full_filename2, 'wb') as csv_output2:
-        #output_writer2 = csv.writer(csv_output2, delimiter = '\t')    
-    
-        ## write the header row
-        #output_writer2.writerow(['Voltage'])
-        
-        ## write the second row
-        #second_row = ['', 'Power'] + power_settings
-        #output_writer2.writerow(second_row)
-        
-        ## write the third row
-        #output_writer2.writerow(['Voltage'])
-    
-        #with PS:
-            #with Load:
-                ## set up initial power supply setings
-                #PS.set_voltage(voltage_settings[0])
-                #PS.set_current(max_input_current)
-                #PS.output_on()
-                
-                ## set up initial load settings
-                #Load.set_mode('constant_power', power_settings[0])
-                #Load.load_on()
-                
-                #voltage_counter = 0
-                
-                ## iterate through the settings to test
-                #for voltage in voltage_settings:
-                    
-                    ## set the voltage
-                    #PS.set_voltage(voltage)
-                    
-                    #data_list = [voltage, '']
-                    #data_list2 = [voltage, '']
-                    
-                    #for power in power_settings:
-                        
-                        #Load.set_mode('constant_power', power)
-                        
-                        #time.sleep(timestep)
-                        
-                        #read_successful = False
-                        #read_attempts = 0
-                        
-                        #while (not read_successful) and (read_attempts < 100):
-                            #try:
-                                #output_current = Load.get_current()
-                                #time.sleep(0.010)
-                                #output_voltage = Load.get_voltage()
-                                #output_power = output_current*output_voltage
-                                #read_successful = True
-                            
-                            #except:
-                                #Load.re_enter()
-                                #read_attempts += 1
-                                #print "Load reading at " + str(voltage) + "V input and " + str(power) + "W load was unsuccessful"
-                            ## end try
-                        ## end while
-                        
-                        #if read_successful:
-                            #input_voltage = PS.get_output_voltage()
-                            #input_current = PS.get_output_current()
-                            #input_power = input_voltage*input_current
-                            
-                            #if output_voltage < dropout_voltage:
-                                #print "at " + str(input_voltage) + "V input, output has drooped to " + str(output_voltage) + "V, current drawn is " + str(input_current) + "A"
-                            ## end if
-                        
-                            #data_list.append((output_power/input_power))
-                            #data_list2.append(output_voltage)
-                        
-                        #else:
-                            #data_list.append(data_list[-1])
-                            #data_list.append(data_list2[-1])
-                            #print "Load reading at " + str(voltage) + "V input and " + str(power) + "W load was still unsuccessful"
-                        ## end try
-                    ## end for
-                    
-                    #voltage_counter += 1
-                    #complete_percentage = int(100*voltage_counter/len(voltage_settings))
-                    #total_time_estimate = (time.time() - start_time)*100/complete_percentage
-                    #time_to_go = int((total_time_estimate - (time.time() - start_time))/60)
-                    
-                    #print "Test is " + str(complete_percentage) + "% complete, estimated completion in " + str(time_to_go) + " minutes"
-                    
-                    #output_writer.writerow(data_list)
-                    #output_writer2.writerow(data_list2)
-                ## end for
-                
-                #PS.output_off()
-                #try:
-                    #Load.load_off()
-                    
-                #except:
-                    #print "Failed to turn load off"
-                ## end try
-                    
-            ## end with
-        ## end with
-    ## end with
-## end with
+# wait at each point until the output voltage and supply current are steady
+# over the settling window, rather than for the timestep, waiting no longer
+# than the maximum dwell. Off until the thresholds below are tuned on a real
+# converter
+settle = False
+settle_window = 1.0         # s
+max_dwell = 10              # s
+settle_voltage_slope = 0.01 # V/s
+settle_current_slope = 0.01 # A/s
+settle_voltage_noise = 0.005 # V
+settle_current_noise = 0.005 # A
+
+converter_name = 'PTH08T221WAZ'
+
+# what to do: run a sweep, showing the grids as they fill, and then plot
+# the grids from file
+run_test = False
+live_plot = True
+plot_results = True
+
+# measure coarsely and refine only where the efficiency changes quickly or
+# the converter nears dropout or the current limit, rather than every point
+adaptive_sweep = True
+coarse_step = 8
+gradient_threshold = 0.02
+
+# carry on from the points log of an interrupted sweep of the same converter
+# and grid, otherwise start a new log
+resume = False
+
+if run_test:
+    # initialise the equipment
+    PS = Power_Supply.PowerSupply('KA3005P')
+    Load = DC_Load.DCLoad('M9711')
+
+    grid = Efficiency_Sweep.SweepGrid(voltage_settings, power_settings)
+
+    if settle:
+        dwell = Settling_Detector.SettlingDetector(
+            settle_window, [settle_voltage_slope, settle_current_slope],
+            [settle_voltage_noise, settle_current_noise], max_dwell)
+
+    else:
+        dwell = timestep
+    # end if
+
+    if resume and os.path.isfile(points_filename):
+        # a log of another converter or grid is refused with a ValueError
+        print(str(grid.load_points(points_filename, converter_name)) +
+              " points restored from the last sweep")
+
+    else:
+        Efficiency_Sweep.new_points_log(points_filename, converter_name, grid)
+    # end if
+
+    if live_plot:
+        live = Grid_Plot.LiveGridPlot(grid, converter_name)
+        point_callback = live.update
+
+    else:
+        point_callback = None
+    # end if
+
+    with PS:
+        with Load:
+            if adaptive_sweep:
+                Efficiency_Sweep.run_adaptive_sweep(
+                    PS, Load, grid, dwell, max_input_current,
+                    dropout_voltage, full_filename, full_filename2,
+                    points_filename, point_callback,
+                    coarse_step = coarse_step,
+                    gradient_threshold = gradient_threshold)
+
+            else:
+                Efficiency_Sweep.run_sweep(PS, Load, grid, dwell,
+                                           max_input_current, dropout_voltage,
+                                           full_filename, full_filename2,
+                                           points_filename, point_callback)
+            # end if
+        # end with
+    # end with
+# end if
 
 # plot
-
-with open(full_filename, 'r') as csv_input:
-    readCSV = csv.reader(csv_input, delimiter=',')
-    
-    power = []
-    voltage = []
-    efficiency = []
-    
-    row_count = 0
-    for row in readCSV:
-        if row_count == 1:
-            power = [float(i) for i in row[2:]]
-            
-        elif row_count >= 3:
-            voltage.append(float(row[0]))
-            try:
-                efficiency.append([100*float(i) for i in row[2:]])
-            except:
-                efficiency.append([0 for i in row[2:]])
-            # end try
-        # end if
-        row_count += 1
-    # end for
-    
-    x = numpy.asarray(power, dtype=numpy.float32)
-    y = numpy.asarray(voltage, dtype=numpy.float32)
-    Z = numpy.asarray(efficiency, dtype=numpy.float32)
-    
-    X,Y = numpy.meshgrid(x,y)
-    
-    levels = [0, 1, 20, 40, 60, 70, 80, 85, 90, 95, 100]
-    plt.figure()
-    mycmap = plt.get_cmap('gnuplot2')
-    cp = plt.contourf(X, Y, Z, levels, cmap=mycmap)
-    plt.colorbar(cp)
-    plt.title('PTH08T221WAZ % Efficiency at 5V')
-    plt.xlabel('Applied Load (W)')
-    plt.ylabel('Supply Voltage (V)')
-    plt.show()    
-# end with
-
-with open(full_filename2, 'r') as csv_input:
-    readCSV = csv.reader(csv_input, delimiter=',')
-    
-    power = []
-    voltage = []
-    efficiency = []
-    
-    row_count = 0
-    for row in readCSV:
-        if row_count == 1:
-            power = [float(i) for i in row[2:]]
-            
-        elif row_count >= 3:
-            voltage.append(float(row[0]))
-            try:
-                efficiency.append([float(i) for i in row[2:]])
-            except:
-                efficiency.append([0 for i in row[2:]])
-            # end try
-        # end if
-        row_count += 1
-    # end for
-    
-    x = numpy.asarray(power, dtype=numpy.float32)
-    y = numpy.asarray(voltage, dtype=numpy.float32)
-    Z = numpy.asarray(efficiency, dtype=numpy.float32)
-    
-    X,Y = numpy.meshgrid(x,y)
-    
-    levels = [0, 4, 4.1, 4.2, 4.3, 4.4, 4.5, 4.6, 4.7, 4.8, 4.9, 4.95, 5.0, 5.05, 5.1]
-    plt.figure()
-    mycmap = plt.get_cmap('gnuplot2')
-    cp = plt.contourf(X, Y, Z, levels, cmap=mycmap)
-    plt.colorbar(cp)
-    plt.title('PTH08T221WAZ Output Voltage at 5V')
-    plt.xlabel('Applied Load (W)')
-    plt.ylabel('Supply Voltage (V)')
-    plt.show()    
-# end with
-            
\ No newline at end of file
+if plot_results:
+    Grid_Plot.plot_grid(Log_Reader.read_grid(full_filename),
+                        Grid_Plot.efficiency_levels,
+                        converter_name + ' % Efficiency at 5V', scale = 100)
+
+    Grid_Plot.plot_grid(Log_Reader.read_grid(full_filename2),
+                        Grid_Plot.voltage_levels,
+                        converter_name + ' Output Voltage at 5V')
+
+    plt.ioff()
+    plt.show()
+# end if
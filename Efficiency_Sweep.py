@@ -0,0 +1,874 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Efficiency_Sweep.py
+Module to measure the efficiency and output voltage of a converter over a
+grid of supply voltages and load powers, using a power supply and a DC load,
+and to write the grids in the layout the Efficiency Tester has always used.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import csv
+import os
+import sys
+import time
+
+import numpy
+
+import Log_Reader
+import Settling_Detector
+
+# ---------
+# Constants
+
+# the number of times a load reading is tried before the point is given up
+read_attempts = 100
+
+# the time between reading the load current and voltage (s)
+read_spacing = 0.010
+
+# the time between the readings a settling detector judges (s)
+settle_period = 0.2
+
+# the defaults of an adaptive sweep: the spacing of the first pass in grid
+# steps, the efficiency change between neighbouring points that is refined,
+# the distance from the dropout voltage (V) and the fraction of the current
+# limit that are refined
+default_coarse_step = 8
+default_gradient_threshold = 0.02
+default_dropout_margin = 0.25
+default_current_margin = 0.9
+
+# the headings of the points log, which Log_Reader reads as a timed log
+points_headings = ['Time (s)', 'Set Voltage (V)', 'Set Power (W)',
+                   'Efficiency', 'Output Voltage (V)', 'Input Voltage (V)',
+                   'Input Current (A)', 'Settling Time (s)']
+
+#
+# ---------
+# Classes
+
+class SweepGrid(object):
+    """
+    Class that holds the results of a sweep as grids with a row per supply
+    voltage and a column per load power. Points not yet measured, or whose
+    reading failed, are NaN.
+
+    @attribute voltages        (array)  The supply voltage of each row (V)
+    @attribute powers          (array)  The load power of each column (W)
+    @attribute efficiency      (array)  The efficiency at each point, 0 to 1
+    @attribute output_voltage  (array)  The output voltage at each point (V)
+    @attribute input_current   (array)  The supply current at each point (A)
+    @attribute settling_time   (array)  The time waited at each point (s)
+    @attribute measured        (array)  Whether each point has been measured
+    """
+
+    def __init__(self, voltages, powers):
+        """
+        Initialise the SweepGrid Object
+
+        @param[in] voltages   The supply voltages (list)
+        @param[in] powers     The load powers (list)
+        """
+        self.voltages = numpy.array(voltages, dtype = numpy.float64)
+        self.powers = numpy.array(powers, dtype = numpy.float64)
+
+        shape = (len(self.voltages), len(self.powers))
+        self.efficiency = numpy.full(shape, numpy.nan)
+        self.output_voltage = numpy.full(shape, numpy.nan)
+        self.input_current = numpy.full(shape, numpy.nan)
+        self.settling_time = numpy.full(shape, numpy.nan)
+        self.measured = numpy.zeros(shape, dtype = bool)
+    # end def
+
+    def set(self, row, column, efficiency, output_voltage,
+            input_current = numpy.nan, settling_time = numpy.nan):
+        """
+        Record a point
+
+        @param[in]  row              The index of the supply voltage (int)
+        @param[in]  column           The index of the load power (int)
+        @param[in]  efficiency       The efficiency, None if the reading
+                                     failed (float)
+        @param[in]  output_voltage   The output voltage (float)
+        @param[in]  input_current    The supply current (float)
+        @param[in]  settling_time    The time waited before reading (float)
+        """
+        self.measured[row, column] = True
+
+        if efficiency is not None:
+            self.efficiency[row, column] = efficiency
+            self.output_voltage[row, column] = output_voltage
+            self.input_current[row, column] = input_current
+            self.settling_time[row, column] = settling_time
+        # end if
+    # end def
+
+    def find(self, voltage, power):
+        """
+        @param[in]  voltage   A supply voltage (float)
+        @param[in]  power     A load power (float)
+        @return     (tuple)   The row and column of the point, None if it is
+                              not on the grid
+        """
+        rows = numpy.flatnonzero(numpy.isclose(self.voltages, voltage))
+        columns = numpy.flatnonzero(numpy.isclose(self.powers, power))
+
+        if (len(rows) == 0) or (len(columns) == 0):
+            return None
+        # end if
+
+        return rows[0], columns[0]
+    # end def
+
+    def load_points(self, points_filename, converter_name = None):
+        """
+        Restore the points of an earlier sweep from its points log. A log
+        started by new_points_log is only restored if it was for the same
+        converter and grid.
+
+        @param[in]  points_filename   The points log (string)
+        @param[in]  converter_name    The converter being tested, None to
+                                      not check it (string)
+        @return     (int)             The number of points restored
+        """
+        with Log_Reader.LogReader(points_filename) as reader:
+            self._check_settings(reader.metadata, converter_name,
+                                 points_filename)
+            points = reader.read_all()
+        # end with
+
+        restored = 0
+
+        # logs from before settling was detected have no settling times
+        settling_time = points.get('settling_time',
+                                   numpy.full(len(points['time']), numpy.nan))
+
+        for index in range(len(points['time'])):
+            point = self.find(points['set_voltage'][index],
+                              points['set_power'][index])
+
+            if point is not None:
+                if numpy.isnan(points['efficiency'][index]):
+                    self.set(point[0], point[1], None, None)
+
+                else:
+                    self.set(point[0], point[1], points['efficiency'][index],
+                             points['output_voltage'][index],
+                             points['input_current'][index],
+                             settling_time[index])
+                # end if
+
+                restored += 1
+            # end if
+        # end for
+
+        return restored
+    # end def
+
+    def _check_settings(self, metadata, converter_name, points_filename):
+        """
+        Check the converter and grid recorded in a points log match this
+        sweep, raising a ValueError if they do not
+
+        @param[in]  metadata          The settings above the headings of the
+                                      log (dict)
+        @param[in]  converter_name    The converter being tested, None to
+                                      not check it (string)
+        @param[in]  points_filename   The points log (string)
+        """
+        if ((converter_name is not None) and
+            (metadata.get('Converter') != converter_name)):
+            raise ValueError(points_filename + ' is for converter ' +
+                             str(metadata.get('Converter')) + ', not ' +
+                             converter_name)
+        # end if
+
+        for name, axis in (('Voltages', self.voltages),
+                           ('Powers', self.powers)):
+            if name in metadata:
+                logged = numpy.array([float(value) for value in
+                                      metadata[name].split()])
+
+                if ((len(logged) != len(axis)) or
+                    not numpy.allclose(logged, axis)):
+                    raise ValueError(points_filename + ' was measured over '
+                                     'different ' + name.lower())
+                # end if
+            # end if
+        # end for
+    # end def
+
+    def progress(self):
+        """
+        @return   (float)   The fraction of the points measured
+        """
+        return numpy.count_nonzero(self.measured)/float(self.measured.size)
+    # end def
+
+    def filled(self, values):
+        """
+        Fill in the points not measured by interpolating between measured
+        points, first along each row and then along each column. Points
+        outside the measured points are left NaN.
+
+        @param[in]  values    A grid of values, e.g. the efficiency (array)
+        @return     (array)   The grid filled in
+        """
+        values = values.copy()
+
+        for row in range(values.shape[0]):
+            values[row] = _interpolate(self.powers, values[row])
+        # end for
+
+        for column in range(values.shape[1]):
+            values[:, column] = _interpolate(self.voltages, values[:, column])
+        # end for
+
+        return values
+    # end def
+
+    def write(self, efficiency_filename, voltage_filename, filled = False):
+        """
+        Write the efficiency and output voltage grids, with the rows that
+        have been measured so far
+
+        @param[in]  efficiency_filename   The efficiency grid file (string)
+        @param[in]  voltage_filename      The output voltage grid file
+                                          (string)
+        @param[in]  filled                Write every row, with the points not
+                                          measured interpolated (bool)
+        """
+        if filled:
+            rows = numpy.arange(len(self.voltages))
+            efficiency = self.filled(self.efficiency)
+            output_voltage = self.filled(self.output_voltage)
+
+        else:
+            rows = numpy.flatnonzero(self.measured.any(axis = 1))
+            efficiency = self.efficiency
+            output_voltage = self.output_voltage
+        # end if
+
+        write_grid(efficiency_filename, 'Efficiency', self.voltages[rows],
+                   self.powers, efficiency[rows])
+        write_grid(voltage_filename, 'Voltage', self.voltages[rows],
+                   self.powers, output_voltage[rows])
+    # end def
+# end class
+
+
+#
+# ----------------
+# Public Functions
+
+def write_grid(filename, title, voltages, powers, values):
+    """
+    Write a grid, tab delimited, as the title, the power axis, the
+    'Voltage' label and then a row per supply voltage. Points that were not
+    measured are left empty.
+
+    @param[in]  filename   The file to write (string)
+    @param[in]  title      The title of the grid (string)
+    @param[in]  voltages   The supply voltage of each row (array)
+    @param[in]  powers     The load power of each column (array)
+    @param[in]  values     The values, a row per supply voltage (array)
+    """
+    temp_filename = filename + '.tmp'
+
+    with open(temp_filename, 'wb' if sys.version_info[0] < 3 else 'w') \
+            as csv_output:
+        output_writer = csv.writer(csv_output, delimiter = '\t')
+
+        output_writer.writerow([title])
+        output_writer.writerow(['', 'Power'] + [repr(float(power))
+                                                for power in powers])
+        output_writer.writerow(['Voltage'])
+
+        for voltage, row in zip(voltages, values):
+            output_writer.writerow([repr(float(voltage)), ''] +
+                                   ['' if numpy.isnan(value)
+                                    else repr(float(value))
+                                    for value in row])
+        # end for
+    # end with
+
+    # replace the old grid only once the new one is complete, so a grid
+    # being plotted is never read half written
+    if os.path.isfile(filename):
+        os.remove(filename)
+    # end if
+    os.rename(temp_filename, filename)
+# end def
+
+
+def new_points_log(points_filename, converter_name, grid):
+    """
+    Start a points log, replacing any earlier one, with the converter and
+    the grid written above the headings so that only a sweep of the same
+    test is resumed from it
+
+    @param[in]  points_filename   The points log (string)
+    @param[in]  converter_name    The converter being tested (string)
+    @param[in]  grid              The grid being swept (SweepGrid)
+    """
+    with open(points_filename, 'wb' if sys.version_info[0] < 3 else 'w') \
+            as points_file:
+        output_writer = csv.writer(points_file, delimiter = '\t')
+
+        output_writer.writerow(['Converter', converter_name,
+                                'Voltages', ' '.join([repr(float(voltage))
+                                                      for voltage in
+                                                      grid.voltages]),
+                                'Powers', ' '.join([repr(float(power))
+                                                    for power in grid.powers])])
+        output_writer.writerow(points_headings)
+    # end with
+# end def
+
+
+def append_point(points_filename, voltage, power, efficiency,
+                 output_voltage, input_voltage, input_current,
+                 settling_time):
+    """
+    Add a point to the points log, writing the headings if the log is new.
+    The log is closed after each point so an interrupted sweep loses
+    nothing.
+
+    @param[in]  points_filename   The points log (string)
+    @param[in]  voltage           The supply voltage set (float)
+    @param[in]  power             The load power set (float)
+    @param[in]  efficiency        The efficiency, None if the reading failed
+                                  (float)
+    @param[in]  output_voltage    The output voltage (float)
+    @param[in]  input_voltage     The supply voltage measured (float)
+    @param[in]  input_current     The supply current measured (float)
+    @param[in]  settling_time     The time waited before reading (float)
+    """
+    new_log = not os.path.isfile(points_filename)
+
+    if sys.version_info[0] < 3:
+        points_file = open(points_filename, 'ab')
+
+    else:
+        points_file = open(points_filename, 'a', newline = '')
+    # end if
+
+    with points_file:
+        output_writer = csv.writer(points_file, delimiter = '\t')
+
+        if new_log:
+            output_writer.writerow(points_headings)
+        # end if
+
+        output_writer.writerow([repr(time.time()), repr(float(voltage)),
+                                repr(float(power))] +
+                               ['' if value is None else repr(float(value))
+                                for value in (efficiency, output_voltage,
+                                              input_voltage, input_current,
+                                              settling_time)])
+    # end with
+# end def
+
+
+def measure_point(supply, load, power, dwell):
+    """
+    Set the load power, wait and measure the efficiency. The load is
+    reopened if a reading fails.
+
+    @param[in]  supply     The power supply (Power_Supply.PowerSupply)
+    @param[in]  load       The DC load (DC_Load.DCLoad)
+    @param[in]  power      The load power (float)
+    @param[in]  dwell      The time to wait before reading in seconds, or a
+                           detector to wait until the output voltage and
+                           supply current settle (float or
+                           Settling_Detector.SettlingDetector)
+    @return     (tuple)    The efficiency, output voltage, input voltage,
+                           input current and the time waited, None if the
+                           load could not be read
+    """
+    load.set_mode('constant_power', power)
+
+    if isinstance(dwell, Settling_Detector.SettlingDetector):
+        try:
+            settling_time = Settling_Detector.wait_until_settled(
+                dwell, lambda: _settling_values(supply, load), settle_period)
+        except IOError:
+            return None
+        # end try
+
+    else:
+        time.sleep(dwell)
+        settling_time = dwell
+    # end if
+
+    for attempt in range(read_attempts):
+        try:
+            output_current = load.get_current()
+            time.sleep(read_spacing)
+            output_voltage = load.get_voltage()
+            break
+
+        except Exception:
+            load.re_enter()
+        # end try
+
+    else:
+        return None
+    # end for
+
+    input_voltage = supply.get_output_voltage()
+    input_current = supply.get_output_current()
+    input_power = input_voltage*input_current
+
+    if input_power > 0:
+        efficiency = (output_current*output_voltage)/input_power
+
+    else:
+        # the supply has not registered the load
+        efficiency = numpy.nan
+    # end if
+
+    return (efficiency, output_voltage, input_voltage, input_current,
+            settling_time)
+# end def
+
+
+def run_sweep(supply, load, grid, dwell, max_input_current, dropout_voltage,
+              efficiency_filename, voltage_filename, points_filename = None,
+              point_callback = None):
+    """
+    Measure every point of a grid, a supply voltage at a time, writing the
+    grids after each supply voltage. The power is swept up and down on
+    alternate supply voltages so the load never jumps across the range.
+    Points already in the grid, e.g. loaded from the points log of an
+    interrupted sweep, are not measured again.
+
+    @param[in]  supply                The power supply, entered
+                                      (Power_Supply.PowerSupply)
+    @param[in]  load                  The DC load, entered (DC_Load.DCLoad)
+    @param[in]  grid                  The grid to fill (SweepGrid)
+    @param[in]  dwell                 The time to wait at each point before
+                                      reading in seconds, or a detector to
+                                      wait until the point settles (float or
+                                      Settling_Detector.SettlingDetector)
+    @param[in]  max_input_current     The supply current limit (float)
+    @param[in]  dropout_voltage       The output voltage below which the
+                                      converter has dropped out (float)
+    @param[in]  efficiency_filename   The efficiency grid file (string)
+    @param[in]  voltage_filename      The output voltage grid file (string)
+    @param[in]  points_filename       The log each point is added to as it
+                                      is measured, None for no log (string)
+    @param[in]  point_callback        Called with the row and column after
+                                      each point, e.g. to update a plot
+                                      (function)
+    """
+    start_time = time.time()
+    start_progress = grid.progress()
+    position = None
+
+    _start(supply, load, grid, max_input_current)
+
+    try:
+        for row in range(len(grid.voltages)):
+            points = [(row, column) for column in range(len(grid.powers))
+                      if not grid.measured[row, column]]
+
+            for point in order_points(points, position):
+                _measure(supply, load, grid, point, position, dwell,
+                         dropout_voltage, points_filename)
+                position = point
+
+                if point_callback is not None:
+                    point_callback(*point)
+                # end if
+            # end for
+
+            grid.write(efficiency_filename, voltage_filename)
+
+            complete = grid.progress()
+            if complete > start_progress:
+                time_to_go = ((time.time() - start_time)*(1 - complete)/
+                              (complete - start_progress))
+
+                print("Test is " + str(int(100*complete)) + "% complete, "
+                      "estimated completion in " + str(int(time_to_go/60)) +
+                      " minutes")
+            # end if
+        # end for
+
+    finally:
+        _stop(supply, load)
+    # end try
+# end def
+
+
+def run_adaptive_sweep(supply, load, grid, dwell, max_input_current,
+                       dropout_voltage, efficiency_filename, voltage_filename,
+                       points_filename = None, point_callback = None,
+                       coarse_step = default_coarse_step,
+                       gradient_threshold = default_gradient_threshold,
+                       dropout_margin = default_dropout_margin,
+                       current_margin = default_current_margin):
+    """
+    Measure a grid coarsely and then refine it only where it changes. Each
+    pass measures the points refine_points finds, in serpentine order, and
+    rewrites the grids with the points not measured interpolated, until
+    there is nothing left to refine. Points already in the grid are not
+    measured again, so an interrupted sweep resumes where it stopped.
+
+    @param[in]  supply                The power supply, entered
+                                      (Power_Supply.PowerSupply)
+    @param[in]  load                  The DC load, entered (DC_Load.DCLoad)
+    @param[in]  grid                  The grid to fill (SweepGrid)
+    @param[in]  dwell                 The time to wait at each point before
+                                      reading in seconds, or a detector to
+                                      wait until the point settles (float or
+                                      Settling_Detector.SettlingDetector)
+    @param[in]  max_input_current     The supply current limit (float)
+    @param[in]  dropout_voltage       The output voltage below which the
+                                      converter has dropped out (float)
+    @param[in]  efficiency_filename   The efficiency grid file (string)
+    @param[in]  voltage_filename      The output voltage grid file (string)
+    @param[in]  points_filename       The log each point is added to as it
+                                      is measured, None for no log (string)
+    @param[in]  point_callback        Called with the row and column after
+                                      each point (function)
+    @param[in]  coarse_step           The spacing of the first pass in grid
+                                      steps (int)
+    @param[in]  gradient_threshold    The efficiency change between measured
+                                      neighbours that is refined (float)
+    @param[in]  dropout_margin        The distance from the dropout voltage
+                                      that is refined (float)
+    @param[in]  current_margin        The fraction of the current limit
+                                      above which points are refined (float)
+    """
+    position = None
+    sweep_pass = 0
+
+    _start(supply, load, grid, max_input_current)
+
+    try:
+        points = [point for point in coarse_points(grid, coarse_step)
+                  if not grid.measured[point]]
+
+        while True:
+            for point in order_points(points, position):
+                _measure(supply, load, grid, point, position, dwell,
+                         dropout_voltage, points_filename)
+                position = point
+
+                if point_callback is not None:
+                    point_callback(*point)
+                # end if
+            # end for
+
+            grid.write(efficiency_filename, voltage_filename, filled = True)
+
+            sweep_pass += 1
+            print("Pass " + str(sweep_pass) + " measured " +
+                  str(len(points)) + " points, " +
+                  str(numpy.count_nonzero(grid.measured)) + " of " +
+                  str(grid.measured.size) + " measured in total")
+
+            points = refine_points(grid, dropout_voltage, max_input_current,
+                                   gradient_threshold, dropout_margin,
+                                   current_margin)
+
+            if len(points) == 0:
+                break
+            # end if
+        # end while
+
+    finally:
+        _stop(supply, load)
+    # end try
+# end def
+
+
+def coarse_points(grid, step):
+    """
+    @param[in]  grid     The grid (SweepGrid)
+    @param[in]  step     The spacing in grid steps (int)
+    @return     (list)   The row and column of every step'th point in both
+                         directions, always including the edges of the grid
+    """
+    rows = _spaced(len(grid.voltages), step)
+    columns = _spaced(len(grid.powers), step)
+
+    return [(row, column) for row in rows for column in columns]
+# end def
+
+
+def refine_points(grid, dropout_voltage, max_input_current,
+                  gradient_threshold = default_gradient_threshold,
+                  dropout_margin = default_dropout_margin,
+                  current_margin = default_current_margin):
+    """
+    Find the points to measure next. Between each pair of measured points
+    that are neighbours along a row or a column, but not adjacent, the
+    point half way is measured if the efficiency changes by more than the
+    threshold, either reading failed, the output is near or crosses the
+    dropout voltage, or the input current is near the limit.
+
+    @param[in]  grid                 The grid (SweepGrid)
+    @param[in]  dropout_voltage      The dropout voltage (float)
+    @param[in]  max_input_current    The supply current limit (float)
+    @param[in]  gradient_threshold   The efficiency change refined (float)
+    @param[in]  dropout_margin       The distance from the dropout voltage
+                                     refined (float)
+    @param[in]  current_margin       The fraction of the current limit above
+                                     which points are refined (float)
+    @return     (list)               The row and column of each point, in
+                                     grid order
+    """
+    efficiency = grid.efficiency
+    output_voltage = grid.output_voltage
+    current_limit = current_margin*max_input_current
+    points = set()
+
+    def refine(first, second):
+        """
+        @param[in]  first    The row and column of a measured point (tuple)
+        @param[in]  second   The row and column of the next one (tuple)
+        @return     (bool)   True if the points between them are needed
+        """
+        if numpy.isnan(efficiency[first]) or numpy.isnan(efficiency[second]):
+            return True
+        # end if
+
+        if abs(efficiency[first] - efficiency[second]) > gradient_threshold:
+            return True
+        # end if
+
+        first_voltage = output_voltage[first]
+        second_voltage = output_voltage[second]
+        if (((first_voltage < dropout_voltage) !=
+             (second_voltage < dropout_voltage)) or
+            (abs(first_voltage - dropout_voltage) < dropout_margin) or
+            (abs(second_voltage - dropout_voltage) < dropout_margin)):
+            return True
+        # end if
+
+        return max(grid.input_current[first],
+                   grid.input_current[second]) > current_limit
+    # end def
+
+    for row in range(len(grid.voltages)):
+        columns = numpy.flatnonzero(grid.measured[row])
+        for first, second in zip(columns[:-1], columns[1:]):
+            if (second - first > 1) and refine((row, first), (row, second)):
+                points.add((row, (first + second)//2))
+            # end if
+        # end for
+    # end for
+
+    for column in range(len(grid.powers)):
+        rows = numpy.flatnonzero(grid.measured[:, column])
+        for first, second in zip(rows[:-1], rows[1:]):
+            if ((second - first > 1) and
+                refine((first, column), (second, column))):
+                points.add(((first + second)//2, column))
+            # end if
+        # end for
+    # end for
+
+    return sorted(points)
+# end def
+
+
+def order_points(points, position = None):
+    """
+    Order points to keep the setpoint changes small. The supply voltages
+    are visited in turn, starting from the end of the grid nearest the
+    present position, and the power is swept up and down alternately.
+
+    @param[in]  points     The row and column of each point (list)
+    @param[in]  position   The row and column of the last point measured,
+                           None if there is none (tuple)
+    @return     (list)     The points in the order to measure them
+    """
+    rows = sorted(set([row for row, _ in points]))
+    if len(rows) == 0:
+        return []
+    # end if
+
+    row_position, column_position = position if position is not None \
+                                    else (rows[0], 0)
+
+    if abs(rows[-1] - row_position) < abs(rows[0] - row_position):
+        rows.reverse()
+    # end if
+
+    ordered = []
+    for row in rows:
+        columns = sorted([column for point_row, column in points
+                          if point_row == row])
+
+        if abs(columns[-1] - column_position) < \
+           abs(columns[0] - column_position):
+            columns.reverse()
+        # end if
+
+        ordered += [(row, column) for column in columns]
+        column_position = columns[-1] if columns[0] != columns[-1] \
+                          else column_position
+    # end for
+
+    return ordered
+# end def
+
+
+#
+# ----------------
+# Private Functions
+
+def _spaced(count, step):
+    """
+    @param[in]  count    The number of grid steps (int)
+    @param[in]  step     The spacing (int)
+    @return     (list)   Every step'th index, and the last
+    """
+    indices = list(range(0, count, max(step, 1)))
+    if (count > 0) and (indices[-1] != count - 1):
+        indices.append(count - 1)
+    # end if
+
+    return indices
+# end def
+
+
+def _interpolate(axis, values):
+    """
+    @param[in]  axis      The position of each value, in either order (array)
+    @param[in]  values    The values, NaN where not known (array)
+    @return     (array)   The values, with those between known values
+                          interpolated
+    """
+    known = ~numpy.isnan(values)
+    if numpy.count_nonzero(known) < 2:
+        return values
+    # end if
+
+    order = numpy.argsort(axis[known])
+    return numpy.interp(axis, axis[known][order], values[known][order],
+                        left = numpy.nan, right = numpy.nan)
+# end def
+
+
+def _settling_values(supply, load):
+    """
+    Read the signals that settle after the load power changes, reopening
+    the load if a reading fails
+
+    @param[in]  supply   The power supply (Power_Supply.PowerSupply)
+    @param[in]  load     The DC load (DC_Load.DCLoad)
+    @return     (list)   The output voltage and supply current
+    """
+    for attempt in range(read_attempts):
+        try:
+            return [load.get_voltage(), supply.get_output_current()]
+
+        except Exception:
+            load.re_enter()
+        # end try
+    # end for
+
+    raise IOError('The load could not be read')
+# end def
+
+
+def _start(supply, load, grid, max_input_current):
+    """
+    Set up the supply and the load at the first point of the grid
+
+    @param[in]  supply              The power supply (Power_Supply.PowerSupply)
+    @param[in]  load                The DC load (DC_Load.DCLoad)
+    @param[in]  grid                The grid (SweepGrid)
+    @param[in]  max_input_current   The supply current limit (float)
+    """
+    supply.set_voltage(grid.voltages[0])
+    supply.set_current(max_input_current)
+    supply.output_on()
+
+    load.set_mode('constant_power', grid.powers[0])
+    load.load_on()
+# end def
+
+
+def _stop(supply, load):
+    """
+    Turn off the supply and the load
+
+    @param[in]  supply   The power supply (Power_Supply.PowerSupply)
+    @param[in]  load     The DC load (DC_Load.DCLoad)
+    """
+    supply.output_off()
+    try:
+        load.load_off()
+
+    except Exception:
+        print("Failed to turn load off")
+    # end try
+# end def
+
+
+def _measure(supply, load, grid, point, previous, dwell, dropout_voltage,
+             points_filename):
+    """
+    Measure a point of the grid and record it
+
+    @param[in]  supply            The power supply (Power_Supply.PowerSupply)
+    @param[in]  load              The DC load (DC_Load.DCLoad)
+    @param[in]  grid              The grid (SweepGrid)
+    @param[in]  point             The row and column (tuple)
+    @param[in]  previous          The row and column of the last point
+                                  measured, None if there is none (tuple)
+    @param[in]  dwell             The time to wait before reading, or a
+                                  settling detector (float or
+                                  Settling_Detector.SettlingDetector)
+    @param[in]  dropout_voltage   The dropout voltage (float)
+    @param[in]  points_filename   The points log, None for no log (string)
+    """
+    row, column = point
+    voltage = grid.voltages[row]
+    power = grid.powers[column]
+
+    if (previous is None) or (previous[0] != row):
+        supply.set_voltage(voltage)
+    # end if
+
+    result = measure_point(supply, load, power, dwell)
+
+    if result is None:
+        print("Load reading at " + str(voltage) + "V input and " +
+              str(power) + "W load was unsuccessful")
+        result = (None, None, None, None, None)
+
+    elif result[1] < dropout_voltage:
+        print("at " + str(result[2]) + "V input, output has drooped to " +
+              str(result[1]) + "V, current drawn is " + str(result[3]) + "A")
+    # end if
+
+    grid.set(row, column, result[0], result[1], result[3], result[4])
+
+    if points_filename is not None:
+        append_point(points_filename, voltage, power, *result)
+    # end if
+# end def
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Grid_Plot.py
+Module to plot the efficiency and output voltage grids of an efficiency
+sweep, either from the grid files or live as the sweep fills them in.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import time
+
+import numpy
+import matplotlib.pyplot as plt
+
+# ---------
+# Constants
+
+# the contour levels of the efficiency (%) and output voltage (V) plots
+efficiency_levels = [0, 1, 20, 40, 60, 70, 80, 85, 90, 95, 100]
+voltage_levels = [0, 4, 4.1, 4.2, 4.3, 4.4, 4.5, 4.6, 4.7, 4.8, 4.9, 4.95,
+                  5.0, 5.05, 5.1]
+
+colour_map = 'gnuplot2'
+
+# the shortest time between redrawing the live contours (s)
+redraw_period = 1.0
+
+#
+# ---------
+# Classes
+
+class LiveGridPlot(object):
+    """
+    Class that shows the efficiency and output voltage of a sweep side by
+    side while it runs. Each point is marked as soon as it is measured and
+    the contours are redrawn at most once per redraw period.
+
+    @attribute grid    (Efficiency_Sweep.SweepGrid)  The grid shown
+    @attribute title   (string)  The name of the converter
+    """
+
+    def __init__(self, grid, title):
+        """
+        Initialise the LiveGridPlot Object, opening the figure
+
+        @param[in] grid    The grid being filled (Efficiency_Sweep.SweepGrid)
+        @param[in] title   The name of the converter (string)
+        """
+        self.grid = grid
+        self.title = title
+        self.last_redraw = None
+
+        plt.ion()
+        self.figure, axes = plt.subplots(1, 2, figsize = (14, 6))
+        self.panels = [(axes[0], 100, efficiency_levels,
+                        '% Efficiency', 'efficiency'),
+                       (axes[1], 1, voltage_levels,
+                        'Output Voltage', 'output_voltage')]
+        self.colour_bars = [None, None]
+
+        self._draw()
+    # end def
+
+    def update(self, row, column):
+        """
+        Show a newly measured point
+
+        @param[in]  row      The index of the supply voltage (int)
+        @param[in]  column   The index of the load power (int)
+        """
+        now = time.time()
+
+        if now - self.last_redraw >= redraw_period:
+            self._draw()
+
+        else:
+            for axis, _, _, _, _ in self.panels:
+                axis.plot(self.grid.powers[column], self.grid.voltages[row],
+                          'k.', markersize = 2)
+            # end for
+
+            plt.pause(0.001)
+        # end if
+    # end def
+
+    def _draw(self):
+        """
+        Redraw the contours of the points measured so far
+        """
+        X, Y = numpy.meshgrid(self.grid.powers, self.grid.voltages)
+        measured = self.grid.measured
+
+        for index, (axis, scale, levels, label, attribute) in \
+                enumerate(self.panels):
+            axis.clear()
+
+            # the points not yet measured are interpolated, which an
+            # adaptive sweep leaves most of
+            values = numpy.ma.masked_invalid(
+                self.grid.filled(getattr(self.grid, attribute))*scale)
+
+            # a contour needs a measured cell, two by two
+            if numpy.count_nonzero(~values.mask) >= 4 and \
+               numpy.count_nonzero(measured.any(axis = 1)) >= 2:
+                contours = axis.contourf(X, Y, values, levels,
+                                         cmap = plt.get_cmap(colour_map))
+
+                if self.colour_bars[index] is None:
+                    self.colour_bars[index] = self.figure.colorbar(
+                        contours, ax = axis)
+                # end if
+            # end if
+
+            axis.plot(X[measured], Y[measured], 'k.', markersize = 2)
+            axis.set_xlim(self.grid.powers.min(), self.grid.powers.max())
+            axis.set_ylim(self.grid.voltages.min(), self.grid.voltages.max())
+            axis.set_title(self.title + ' ' + label)
+            axis.set_xlabel('Applied Load (W)')
+            axis.set_ylabel('Supply Voltage (V)')
+        # end for
+
+        self.last_redraw = time.time()
+        plt.pause(0.001)
+    # end def
+# end class
+
+
+#
+# ----------------
+# Public Functions
+
+def plot_grid(grid, levels, title, scale = 1.0):
+    """
+    Plot a grid read from file as filled contours
+
+    @param[in]  grid     The grid (Log_Reader.Grid)
+    @param[in]  levels   The contour levels (list)
+    @param[in]  title    The title of the plot (string)
+    @param[in]  scale    What the values are multiplied by, e.g. 100 for a
+                         percentage (float)
+    """
+    X, Y = numpy.meshgrid(grid.power, grid.voltage)
+
+    plt.figure()
+    cp = plt.contourf(X, Y, numpy.ma.masked_invalid(grid.values*scale),
+                      levels, cmap = plt.get_cmap(colour_map))
+    plt.colorbar(cp)
+    plt.title(title)
+    plt.xlabel('Applied Load (W)')
+    plt.ylabel('Supply Voltage (V)')
+# end def
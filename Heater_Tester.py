@@ -24,6 +24,7 @@ __version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
 
 import Multimeter
 import Power_Supply
+import Scheduler
 import sys
 import csv
 import os
@@ -116,8 +117,9 @@ print "Starting Analysys\n"
 with Power_Supply.PowerSupply('KA3005P') as PS:
     with Multimeter.Multimeter('34410A') as MM:
         
-        # record the start time
-        start_time = time.time()
+        # pace the measurements to deadlines a data period apart
+        scheduler = Scheduler.PeriodicScheduler(1.0/DATA_RATE)
+        scheduler.start()
         
         #  turn on the output
         PS.set_voltage(TEST_VOLTAGE)
@@ -125,33 +127,39 @@ with Power_Supply.PowerSupply('KA3005P') as PS:
         PS.output_on()
         
         # record measurements for the requisite time
-        while ((time.time() - start_time) < EXECUTION_TIME):
+        while (scheduler.elapsed() < EXECUTION_TIME):
             
             # take measurements
-            current_time = '%.3f' % time.time()-start_time
-            voltage = '%.3f' % PS.get_output_voltage()
-            current = '%.3f' % PS.get_output_current()
+            current_time = scheduler.elapsed()
+            voltage = PS.get_output_voltage()
+            current = PS.get_output_current()
             try:
-                heater_resistance = '%.3f' % voltage/current
+                heater_resistance = '%.3f' % (voltage/current)
                 
-            except:
+            except ZeroDivisionError:
                 heater_resistance = 'inf'
             # end try
-            power = '%.3f' % voltage*current
-            resistance = '%.3f' % MM.get_resistance()
-            temperature = '%.3f' % thermistor_voltage(resistance)
+            power = voltage*current
+            resistance = MM.get_resistance()
+            temperature = thermistor_voltage(resistance)
             
             # write measurements
-            output_writer.writerow([current_time, voltage, current, heater_resistance, power, resistance, temperature])
+            output_writer.writerow(['%.3f' % current_time, 
+                                    '%.3f' % voltage, 
+                                    '%.3f' % current, 
+                                    heater_resistance, 
+                                    '%.3f' % power, 
+                                    '%.3f' % resistance, 
+                                    '%.3f' % temperature])
             
-            # wait for time to pass to maintain timing
-            while (time.time() < (start_time + current_time + 1.0/DATA_RATE)):
-                time.sleep(0.001)
-            # end while
+            # wait for the next deadline to maintain timing
+            scheduler.wait()
         # end while
         
         # turn off the output
         PS.output_off()
+        
+        print scheduler.report()
     # end with
 # end with
 
@@ -5,20 +5,25 @@ import DC_Load
 import csv
 import os
 import time
-import Multimeter
 import random
-import BM2_aardvark
-
-import sys
-sys.path.insert(1, '../process/src')
-
-import process_SCPI
+import Adaptive_Sampler
+import Scheduler
+import Measurement_Sources
+import Settling_Detector
 
 # set constants
 output_filename = "IR test.csv"
 full_filename = os.getcwd() + '/' + output_filename
 
 timestep = 5
+
+# logged sample period limits and the slopes that trigger fast sampling, while
+# the load or charger is on the end of the step is still checked every 
+# min_timestep however long the logged sample period grows
+min_timestep = 1
+max_timestep = 60
+dvdt_threshold = 0.0005   # V/s
+didt_threshold = 0.002    # A/s
 pulse_width = 60
 taper_current = 0.200
 charge_voltage = 16.8
@@ -28,150 +33,65 @@ min_voltage = 2.5
 fast_current = 3
 slow_current = 0.3
 
-rest_duration = 3600
+# move to the next pulse current as soon as the voltage has settled over the
+# settling window, rather than after the pulse width, which becomes the
+# longest pulse. Off until the thresholds below are tuned on a real cell
+settle_pulses = False
+settle_window = 15        # s
+settle_slope = 0.0005     # V/s
+settle_noise = 0.002      # V
 
-pulse_loops = pulse_width/timestep
+rest_duration = 3600
 
 is_test = False
 do_random = True
-use_BM2 = False
-use_I2C = True
+
+# what the cell is measured with, one of Measurement_Sources.sources
+measurement_source = 'I2C'
+
 invert_current = True
 
-class Measurement_device:
-    def __init__(self):
-        if use_BM2:
-            self.device = BM2_aardvark.BM2()
-            
-        elif use_I2C:
-            self.device = process_SCPI.aardvark()
-            
-        else:
-            self.device = Multimeter.Multimeter('DM3058E')
-        # end if        
-    # end def
-    
-    def __enter__(self):
-        self.device.open()
-    # end def
-    
-    def __exit__(self, type, value, traceback):
-        self.device.close()
-    # end def       
-    
-    def get_is_fully_charged(self):
-        if use_BM2:
-            while not self.device.update_data():
-                print "BM2 data collection was bad"
-                time.sleep(0.05)
-            # end while        
-            return self.device.get_FC()
-        
-        elif use_I2C:
-            return (self.device.read_SCPI("BM2:TEL? 22,data", "0x5C", "uint") & int('0020',16)) != 0
-            
-        else:
-            if invert_current:
-                return ((self.device.get_DC_current(secondary = True)*-1) < taper_current)
-            
-            else:
-                return (self.device.get_DC_current(secondary = True) < taper_current)
-            # end if
-        # end if    
-    # end def
-    
-    def get_is_discharged(self):
-        if use_BM2:
-            while not self.device.update_data():
-                print "BM2 data collection was bad"
-                time.sleep(0.05)
-            # end while            
-            return self.device.get_CUV()
-        
-        elif use_I2C:
-            return (self.device.read_SCPI("BM2:TEL? 80,data", "0x5C", "uint") & int('0080',16)) != 0
-            
-        else:
-            return (self.device.get_DC_voltage() < min_voltage)
-        # end if    
-    # end def        
-    
-    def get_current(self):
-        if use_BM2:
-            while not self.device.update_data():
-                print "BM2 data collection was bad"
-                time.sleep(0.05)
-            # end while            
-            return self.device.Data.Current/1000.0
-        
-        elif use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 10,data", "0x5C", "int")/1000.0
-            
-        else:
-            return self.device.get_DC_current(secondary = True)
-        # end if    
-    # end def  
-    
-    def get_voltage(self):
-        if use_BM2:
-            while not self.device.update_data():
-                print "BM2 data collection was bad"
-                time.sleep(0.05)
-            # end while            
-            return self.device.Data.Voltage/1000.0
-        
-        elif use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 9,data", "0x5C", "uint")/1000.0        
-            
-        else:
-            return self.device.get_DC_voltage()
-        # end if    
-    # end def   
-    
-    def get_internal_resistance(self):
-        if use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 37,data", "0x5C", "uint")/10000.0      
-        else:
-            print "Internal resistance capture is not supported by this capture mode"
-        # end if
-    # end def
-    
-    def get_smoothed_voltage(self):
-        if use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 38,data", "0x5C", "uint")/1000.0      
-        else:
-            print "smoothed voltage capture is not supported by this capture mode"
-        # end if
-    # end def    
+# the display of the multimeter that shows the current when measuring with it
+current_display = 'secondary'
+
+def get_random_current():
+    return random.randint(slow_current*1000, fast_current*1000)/1000.0
+# end def
+
+def pulse_done():
+    # the current is changed once the voltage has settled, or after the
+    # pulse width
+    if settle_pulses:
+        return settling.done()
     
-    def get_approximate_SOC(self):
-        if use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 36,data", "0x5C", "char")     
-        else:
-            print "Approximate SOC capture is not supported by this capture mode"
-        # end if
-    # end def    
+    else:
+        return (time.time() - pulse_start) >= pulse_width
+    # end if
+# end def
+
+def log_sample(output_writer, sample_time):
+    global last_log_time
     
-    def get_relative_SOC(self):
-        if use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 13,data", "0x5C", "char")  
-        else:
-            print "Approximate SOC capture is not supported by this capture mode"
-        # end if
-    # end def
+    # judge whether the voltage has settled since the last current change
+    settling.add(sample_time, Meas_Dev.get('voltage'))
+    settling_time = settling.settling_time if settling.settled else ''
     
-    def get_absolute_SOC(self):
-        if use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 14,data", "0x5C", "char")   
-        else:
-            print "Approximate SOC capture is not supported by this capture mode"
-        # end if
-    # end def    
-# end class
+    output_writer.writerow([sample_time] + 
+                           [Meas_Dev.get(channel.name) 
+                            for channel in Meas_Dev.logged_channels()] +
+                           [settling_time])
     
+    # choose when to sample next from how fast the cell is changing
+    sampler.update(sample_time, Meas_Dev.get('voltage'), Meas_Dev.get('current'))
+    last_log_time = sample_time
+# end def
 
-def get_random_current():
-    return random.randint(slow_current*1000, fast_current*1000)/1000.0
+def log_if_due(output_writer, sample_time):
+    # the end of the step is checked on every tick, but a sample is only 
+    # logged once the adaptive sample period has passed, allowing for jitter
+    if (sample_time - last_log_time) >= (sampler.period - sampler.min_period/2.0):
+        log_sample(output_writer, sample_time)
+    # end if
 # end def
 
 if is_test:
@@ -185,7 +105,17 @@ else:
 
 PS = Power_Supply.PowerSupply('KA3005P')
 Load = DC_Load.DCLoad('M9711')
-Meas_Dev = Measurement_device()
+Meas_Dev = Measurement_Sources.create(measurement_source, 
+                                      current_display = current_display,
+                                      invert_current = invert_current,
+                                      taper_current = taper_current,
+                                      min_voltage = min_voltage)
+sampler = Adaptive_Sampler.AdaptiveSampler(max(min_timestep, Meas_Dev.min_period()), 
+                                           max_timestep, 
+                                           dvdt_threshold, didt_threshold)
+scheduler = Scheduler.PeriodicScheduler(min_timestep)
+settling = Settling_Detector.SettlingDetector(settle_window, settle_slope, 
+                                              settle_noise, pulse_width)
 
 start_time = time.time()
 
@@ -199,12 +129,12 @@ with Meas_Dev:
         PS.set_current(charge_current)
         PS.output_on()
         
-        Meas_Dev.get_current()
+        Meas_Dev.update()
         
         time.sleep(timestep)
         
         # wait for the taper current requirement to be met.
-        while not Meas_Dev.get_is_fully_charged():
+        while not Meas_Dev.get('fully_charged', refresh = True):
             time.sleep(timestep)
             
             if is_test:
@@ -236,68 +166,48 @@ with Meas_Dev:
         output_writer = csv.writer(csv_output, delimiter = '\t')
         
         # write the header row
-        if use_I2C:
-            output_writer.writerow(['Time (s)' , 'Voltage', 'Current', 
-                                    'Internal Resistance', 'Compensated Voltage',
-                                    'Approximate SOC', 'Relative SOC', 'Absolute SOC'])
-        else:
-            output_writer.writerow(['Time (s)' , 'Voltage', 'Current'])
-        # end if
+        output_writer.writerow(['Time (s)'] + 
+                               [channel.heading 
+                                for channel in Meas_Dev.logged_channels()] +
+                               ['Settling Time (s)'])
         
         # baseling for logging time
         start_time = time.time()
+        scheduler.start()
         
         # discharge the cell and log
         print "Discharging"
         with Load:
             
             # write initial row
-            if use_I2C:
-                output_writer.writerow([0 , Meas_Dev.get_voltage(), 
-                                        Meas_Dev.get_current(),
-                                        Meas_Dev.get_internal_resistance(),
-                                        Meas_Dev.get_smoothed_voltage(),
-                                        Meas_Dev.get_approximate_SOC(),
-                                        Meas_Dev.get_relative_SOC(),
-                                        Meas_Dev.get_absolute_SOC()])
-            else:
-                output_writer.writerow([0 , Meas_Dev.get_voltage(), Meas_Dev.get_current()])
-            # end if
+            Meas_Dev.update()
+            log_sample(output_writer, 0)
             
             # turn on the load
             Load.set_mode('constant_current', slow_current)
             Load.load_on()
+            sampler.trigger()
             
-            pulse_count = 0
+            pulse_start = time.time()
+            settling.start(pulse_start - start_time)
             
             mode = 'slow'
             
-            # wait for the cell to discahrge
-            while not Meas_Dev.get_is_discharged():
+            # wait for the cell to discahrge, as seen in the last update
+            while not Meas_Dev.get('discharged'):
                 # wait for the next time step
-                time.sleep(timestep)
+                scheduler.wait(sampler.min_period)
                 
                 # write current data
-                if use_I2C:
-                    output_writer.writerow([(time.time() - start_time),
-                                            Meas_Dev.get_voltage(), 
-                                            Meas_Dev.get_current(),
-                                            Meas_Dev.get_internal_resistance(),
-                                            Meas_Dev.get_smoothed_voltage(),
-                                            Meas_Dev.get_approximate_SOC(),
-                                            Meas_Dev.get_relative_SOC(),
-                                            Meas_Dev.get_absolute_SOC()])            
-                else:
-                    output_writer.writerow([(time.time() - start_time) , Meas_Dev.get_voltage(), Meas_Dev.get_current()])
-                # end if
-                
-                # increment pulse counting
-                pulse_count += 1
+                Meas_Dev.update()
+                log_if_due(output_writer, time.time() - start_time)
                     
                 # perform current pulsing
-                if (pulse_count >= pulse_loops):
+                if pulse_done():
                     # it is time to change the current
-                    pulse_count = 0
+                    pulse_start = time.time()
+                    settling.start(pulse_start - start_time)
+                    sampler.trigger()
                     
                     # change the current setting
                     if do_random:
@@ -329,24 +239,16 @@ with Meas_Dev:
         print "Resting"
         
         restart_time = time.time()
+        settling.start(restart_time - start_time)
+        sampler.trigger()
         
         while True:
             # wait for the next time step
-            time.sleep(timestep)
+            scheduler.wait(sampler.period)
         
             # write current data
-            if use_I2C:
-                output_writer.writerow([(time.time() - start_time),
-                                        Meas_Dev.get_voltage(), 
-                                        Meas_Dev.get_current(),
-                                        Meas_Dev.get_internal_resistance(),
-                                        Meas_Dev.get_smoothed_voltage(),
-                                        Meas_Dev.get_approximate_SOC(),
-                                        Meas_Dev.get_relative_SOC(),
-                                        Meas_Dev.get_absolute_SOC()])            
-            else:            
-                output_writer.writerow([(time.time() - start_time) , Meas_Dev.get_voltage(), Meas_Dev.get_current()])   
-            # end if
+            Meas_Dev.update()
+            log_sample(output_writer, time.time() - start_time)
             
             if is_test and ((time.time() - restart_time) > 60):
                 break
@@ -366,52 +268,34 @@ with Meas_Dev:
             PS.set_voltage(charge_voltage)
             PS.set_current(slow_current)
             PS.output_on()
+            sampler.trigger()
+            settling.start(time.time() - start_time)
             
             # write initial row
-            if use_I2C:
-                output_writer.writerow([(time.time() - start_time),
-                                        Meas_Dev.get_voltage(), 
-                                        Meas_Dev.get_current(),
-                                        Meas_Dev.get_internal_resistance(),
-                                        Meas_Dev.get_smoothed_voltage(),
-                                        Meas_Dev.get_approximate_SOC(),
-                                        Meas_Dev.get_relative_SOC(),
-                                        Meas_Dev.get_absolute_SOC()])            
-            else:            
-                output_writer.writerow([(time.time() - start_time) , Meas_Dev.get_voltage(), Meas_Dev.get_current()])  
-            # end if
+            Meas_Dev.update()
+            log_sample(output_writer, time.time() - start_time)
             
-            pulse_count = 0
+            pulse_start = time.time()
             
             restart_time = time.time()
             
             mode = 'slow'
             
-            # wait for the taper current requirement to be met.
-            while not Meas_Dev.get_is_fully_charged():
-                time.sleep(timestep)
+            # wait for the taper current requirement to be met, as seen in the
+            # last update
+            while not Meas_Dev.get('fully_charged'):
+                scheduler.wait(sampler.min_period)
                 # write current data
                 
-                if use_I2C:
-                    output_writer.writerow([(time.time() - start_time),
-                                            Meas_Dev.get_voltage(), 
-                                            Meas_Dev.get_current(),
-                                            Meas_Dev.get_internal_resistance(),
-                                            Meas_Dev.get_smoothed_voltage(),
-                                            Meas_Dev.get_approximate_SOC(),
-                                            Meas_Dev.get_relative_SOC(),
-                                            Meas_Dev.get_absolute_SOC()])            
-                else:                
-                    output_writer.writerow([(time.time() - start_time) , Meas_Dev.get_voltage(), Meas_Dev.get_current()])
-                # end if
-                
-                # increment pulse counting
-                pulse_count += 1
+                Meas_Dev.update()
+                log_if_due(output_writer, time.time() - start_time)
                     
                 # perform current pulsing
-                if (pulse_count >= pulse_loops):
+                if pulse_done():
                     # it is time to change the current
-                    pulse_count = 0
+                    pulse_start = time.time()
+                    settling.start(pulse_start - start_time)
+                    sampler.trigger()
                     
                     # change the current setting
                     if do_random:
@@ -441,6 +325,7 @@ with Meas_Dev:
 # end with
 
 print "Complete"
+print scheduler.report()
 
         
         
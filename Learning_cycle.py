@@ -3,13 +3,16 @@
 
 # imports
 import BM2_aardvark
-import aardvark_py
+import Battery_Sim
 import Power_Supply
 import DC_Load
+import Log_Writer
+import Sequence_Engine
+import Adaptive_Sampler
 import sys
 import time
-import csv
 import datetime
+import atexit
 
 # profile specific settings
 DISCHARGE_CURRENT = 2.4    # A
@@ -19,38 +22,118 @@ TERM_VOLTAGE      = 4100   # mV
 
 # other settings
 STATE_PAUSE       = 60     # s
-SAMPLE_RATE_MS    = 1000  # ms
+SAMPLE_RATE_MS    = 1000  # ms, fastest sample rate
+MAX_SAMPLE_PERIOD = 30     # s, slowest sample rate, only in rests with the load and charger off
+DVDT_THRESHOLD    = 0.002  # V/s, sample at the fastest rate above this
+DIDT_THRESHOLD    = 0.005  # A/s, sample at the fastest rate above this
 SLEEP_ONE_SEC     = 1000   # ms
 MESSAGE_PERIOD    = 600    # s
 IMBALANCE_LIMIT   = 100     # mV
+LOG_FLUSH_PERIOD  = 10     # s
+LOG_FSYNC_PERIOD  = 60     # s
+CHECKPOINT_PERIOD = 60     # s
+CHECKPOINT_FILENAME = "learning cycle checkpoint.json"
+CHECKPOINT_MAX_AGE = 3600  # s, oldest checkpoint that can be resumed
+MAX_COMMS_FAILURES = 5     # consecutive ticks the load or charger can fail before stopping
+
+# continue the interrupted cycle saved in the checkpoint, only set this once
+# the same pack is connected again
+RESUME            = False
+
+# run against a simulated pack on a virtual clock instead of the hardware
+SIMULATE          = False
+SIM_INITIAL_SOC   = 0.5
 
 # tracker for state changes
 PASS_CRITERIA = 3
 pass_count = 0
 
+if SIMULATE:
+    clock = Battery_Sim.VirtualClock()
+    pack = Battery_Sim.SimPack(clock = clock, soc = SIM_INITIAL_SOC)
+    BM = BM2_aardvark.BM2(backend = Battery_Sim.SimSMBus(pack))
+    
+else:
+    clock = time
+    pack = None
+    BM = BM2_aardvark.BM2()
+# end if
+
+# the checkpoint is only resumed for the pack it was saved for
+with BM:
+    pack_serial = BM.get_SerialNumber()
+# end with
+
+resume = None
+
+if SIMULATE:
+    # the simulated pack cannot be resumed
+    checkpoint = None
+    
+else:
+    checkpoint = Sequence_Engine.Checkpoint(CHECKPOINT_FILENAME, CHECKPOINT_PERIOD, 
+                                            identity = {'pack_serial': pack_serial}, 
+                                            max_age = CHECKPOINT_MAX_AGE)
+    saved = checkpoint.load()
+    
+    if RESUME:
+        if saved is None:
+            print "There is no checkpoint to resume from"
+            sys.exit()
+        # end if
+        
+        try:
+            checkpoint.check(saved, clock.time())
+            
+        except ValueError as error:
+            print "Cannot resume the Learning Cycle: " + str(error)
+            sys.exit()
+        # end try
+        
+        resume = saved
+        
+    elif saved is not None:
+        print "Starting a new Learning Cycle, set RESUME to continue the interrupted one instead"
+    # end if
+# end if
+
 # definitions
 def BM2_power_switch_init():
     # output state low
-    aardvark_py.aa_gpio_set(BM.port, 0)
+    BM.gpio_set(0)
     
     # direction as output
-    aardvark_py.aa_gpio_direction(BM.port, aardvark_py.AA_GPIO_SS)
+    BM.gpio_direction(BM2_aardvark.GPIO_SS)
 # end def
 
 def BM2_power_switch_set(state):
     
     if (state == 1):
-        aardvark_py.aa_gpio_set(BM.port, aardvark_py.AA_GPIO_SS) 
+        BM.gpio_set(BM2_aardvark.GPIO_SS) 
         
     else:
-        aardvark_py.aa_gpio_set(BM.port, 0) 
+        BM.gpio_set(0) 
     # end if
 # end def
 
-start_time = time.time()
+def new_load():
+    if SIMULATE:
+        return DC_Load.DCLoad('M9711', backend = Battery_Sim.SimMaynuo(pack))
+    
+    else:
+        return DC_Load.DCLoad('M9711')
+    # end if
+# end def
+
+if resume is not None:
+    start_time = resume['start_time']
+    
+else:
+    start_time = clock.time()
+# end if
 
 def get_runtime():
-    return '%.0f mins' % ((time.time() - start_time)/60)
+    return '%.0f mins' % ((clock.time() - start_time)/60)
 # end def
 
 def cell_voltages_good(BM):
@@ -84,19 +167,34 @@ def cell_voltages_good(BM):
     # end if
 # end def
 
-# start csv file to log to
-log_filename = "log file " + datetime.datetime.now().strftime("%Y-%m-%d %H-%M") + ".csv"
-csv_file = open(log_filename, 'a+')
-csv_writer = csv.writer(csv_file, delimiter = ',')
+# start csv file to log to, or continue the one being resumed
+if resume is not None:
+    log_filename = resume['extra']['log_filename']
+    print "Resuming Learning Cycle in " + resume['state'] + " after " + get_runtime() + ", logging to " + log_filename
+    
+elif SIMULATE:
+    log_filename = "sim log file " + datetime.datetime.now().strftime("%Y-%m-%d %H-%M") + ".csv"
+    
+else:
+    log_filename = "log file " + datetime.datetime.now().strftime("%Y-%m-%d %H-%M") + ".csv"
+# end if
+
+if checkpoint is not None:
+    checkpoint.extra['log_filename'] = log_filename
+# end if
+
+log_writer = Log_Writer.LogWriter(log_filename, BM2_aardvark.BM2_Data().headers, 
+                                  flush_interval = LOG_FLUSH_PERIOD, 
+                                  fsync_interval = LOG_FSYNC_PERIOD)
+
+# make sure buffered data reaches the disk however the script exits
+atexit.register(log_writer.close)
 
 def log_data(BM):
     try:
-        csv_file = open(log_filename, 'a+')
-        csv_writer = csv.writer(csv_file, delimiter = ',')
-        csv_writer.writerow(BM.Data.to_list(current_time - start_time))
-        csv_file.close()
+        log_writer.writerow(BM.Data.to_list(current_time - start_time))
         
-    except:
+    except (IOError, OSError):
         print "failed to access the log file"
     # end try  
 # end def
@@ -105,16 +203,19 @@ def log_data(BM):
     
 ######################### INITIALISATION #######################################    
 # initialise Devices
-BM = BM2_aardvark.BM2()
-Load = DC_Load.DCLoad('M9711')
-PS = Power_Supply.PowerSupply('KA3005P')
+if SIMULATE:
+    PS = Power_Supply.PowerSupply('KA3005P', backend = Battery_Sim.SimKorad(pack))
+    
+else:
+    PS = Power_Supply.PowerSupply('KA3005P')
+# end if
+Load = new_load()
 
 
 # initialise hardware
 print "Initialising Hardware"
 
-csv_writer.writerow(BM.Data.headers)
-csv_file.close()
+log_writer.open()
 
 with PS:
     PS.output_off()
@@ -142,313 +243,351 @@ with BM:
 
 ############################## STATE MACHINE ###################################
 # states
-INITIAL_DISCHARGE       = 0
-LOW_REST                = 1
-IT_SETUP                = 2
-CHARGE                  = 3
-VOK_WAIT                = 4
-FINAL_DISCHARGE         = 5
-MAX_ERROR_WAIT          = 6
-COMPLETE                = 7
-
-# state variable
-current_state           = INITIAL_DISCHARGE
-previous_state          = COMPLETE
+INITIAL_DISCHARGE       = 'INITIAL_DISCHARGE'
+LOW_REST                = 'LOW_REST'
+IT_SETUP                = 'IT_SETUP'
+CHARGE                  = 'CHARGE'
+VOK_WAIT                = 'VOK_WAIT'
+FINAL_DISCHARGE         = 'FINAL_DISCHARGE'
+MAX_ERROR_WAIT          = 'MAX_ERROR_WAIT'
+COMPLETE                = 'COMPLETE'
+FAULT                   = 'FAULT'
 
 last_message_time = start_time
-rest_start_time = start_time
 
-break_count = 0
+def sample(seq):
+    global current_time, last_message_time
+    
+    data_good = BM.update_data()
+    if not data_good:
+        print "After " + get_runtime() + " Data collection from BM2 was bad"
+    # end if
+    
+    # new time interval
+    current_time = clock.time()
+    
+    # log the data
+    log_data(BM)
+    
+    # choose when to sample next from how fast the pack is changing
+    if data_good:
+        sampler.update(current_time, BM.Data.Voltage/1000.0, BM.Data.Current/1000.0)
+    # end if
+    
+    # potentially print a message
+    if ((seq.state.name != MAX_ERROR_WAIT) and ((clock.time() - last_message_time) > MESSAGE_PERIOD)):
+        # print a periodic message 
+        print "After " + get_runtime() + " Voltage is " + str(BM.Data.Voltage/1000.0) + "V, Current is " + str(BM.Data.Current) + "mA"
+        last_message_time = clock.time()            
+    #end if   
+    
+    return data_good
+# end def
 
-with BM:
-    BM2_power_switch_init()  
+def reinitialise_load():
+    global Load
     
-    # state machine
-    while (current_state != COMPLETE):
+    old_load = Load
+    try: 
+        Load = new_load()
         
-        if not BM.update_data():
-            print "After " + get_runtime() + " Data collection from BM2 was bad"
-            
-            log_data(BM)
-            next
-        # end if
+    except: 
+        print "Failed to re-initialise the Load"
+        Load = old_load
+        return False
+    # end try    
+    
+    return True
+# end def
+
+# the failed ticks of the load and charger in a row and in total
+comms_failures = {'Load': 0, 'Power Supply': 0}
+total_comms_failures = {'Load': 0, 'Power Supply': 0}
+
+def comms_failed(name, recover = None):
+    # count the failure and try to recover, the cycle carries on through 
+    # transient failures but stops once recovery fails or the device has 
+    # failed on too many ticks in a row
+    comms_failures[name] += 1
+    total_comms_failures[name] += 1
+    
+    print ("Communications with the " + name + " failed after " + get_runtime() + 
+           " (" + str(comms_failures[name]) + " in a row, " + 
+           str(total_comms_failures[name]) + " in total)")
+    
+    recovered = (recover is None) or recover()
+    
+    return recovered and (comms_failures[name] < MAX_COMMS_FAILURES)
+# end def
+
+def comms_ok(name):
+    comms_failures[name] = 0
+# end def
+
+def check_faults():
+    if (BM.Data.SafetyStatus > 0):
+        print "Warning, Fault occurred at bottom of discharge"
         
-        # new time interval
-        current_time = time.time()
+        print "SafetyStatus = " + str(BM.Data.SafetyStatus)
+    # end if  
+# end def
+
+## entry actions
+def enter_initial_discharge(seq):
+    print "Starting Learning Cycle by discharging the pack"
+# end def
+
+def enter_low_rest(seq):
+    print "Pack is discharged to " + str(BM.Data.Voltage/1000.0) + "V after " + get_runtime() + ", relaxing"
+    
+    #check cell voltage validity
+    if BM.Data.Voltage > TERM_VOLTAGE:
+        print "Warning, may not be discharging the pack far enough"
         
-        # log the data
-        log_data(BM)
+        print "Cell volatages = " + str([BM.Data.CellVoltage1, BM.Data.CellVoltage2, BM.Data.CellVoltage3, BM.Data.CellVoltage4]) + "mV"
+    # end if      
+    
+    check_faults()
+# end def
+
+def enter_it_setup(seq):
+    #check cell voltage validity
+    if cell_voltages_good(BM) == False:
+        print "Aborting due to cell imbalance"
+        sys.exit()
+    # end if
         
-        # potentially print a message
-        if ((current_state != MAX_ERROR_WAIT) and ((time.time() - last_message_time) > MESSAGE_PERIOD)):
-            # print a periodic message 
-            print "After " + get_runtime() + " Voltage is " + str(BM.Data.Voltage/1000.0) + "V, Current is " + str(BM.Data.Current) + "mA"
-            last_message_time = time.time()            
-        #end if        
-
-        if ((current_state == INITIAL_DISCHARGE) or (current_state == FINAL_DISCHARGE)):
-            # discharge the pack
-            
-            if ((current_state == INITIAL_DISCHARGE) and (current_state != previous_state)):
-                # just entered this state
-                print "Starting Learning Cycle by discharging the pack"
-                previous_state = current_state
-            
-            elif ((current_state == FINAL_DISCHARGE) and (current_state != previous_state)):
-                # just entered this state
-                print "OCV Measurement taken successfully (Voltage = " + str(BM.Data.Voltage/1000.0) + "V) after " + get_runtime() + ", transitioning to discharge again"
-                previous_state = current_state
-            
-            elif (current_state == FINAL_DISCHARGE):
-                if BM.get_VOK() == False:
-                    print " VOK has not be reset!"
-                # end if    
-            # end if
-            
-            # discharge
-            try:
-                with Load:
-                    # configure the load for a discharge
-                    Load.set_mode('constant_current', DISCHARGE_CURRENT)
-                    Load.load_on()      
-                    
-                    # connect the load to the BM
-                    BM2_power_switch_set(1)  
-                # end with
-            
-            except:
-                print "Communications with the Load failed"
-                old_load = Load
-                try: 
-                    Load = DC_Load.DCLoad('M9711')
-                    
-                except: 
-                    "Failed to re-initialise the Load"
-                    Load = old_load
-                # end try                
-                next
-            # end try
-            
-            # check exit criteria
-            if BM.get_CUV() == True:
-                break_count += 1
-            
-            else:
-                break_count = 0
-            # end if
-            
-            if break_count >=2:
-                if (current_state == INITIAL_DISCHARGE):
-                    current_state = LOW_REST
-                    
-                else:
-                    current_state = MAX_ERROR_WAIT
-                # end if  
-                
-                break_count = 0
-            # end if
-                
-            
-        elif (current_state == LOW_REST):
-            if (previous_state != current_state):
-                # just entered this state
-                print "Pack is discharged to " + str(BM.Data.Voltage/1000.0) + "V after " + get_runtime() + ", relaxing"
-                previous_state = current_state
-                
-                #check cell voltage validity
-                if BM.Data.Voltage > TERM_VOLTAGE:
-                    print "Warning, may not be discharging the pack far enough"
-                    
-                    print "Cell volatages = " + str([BM.Data.CellVoltage1, BM.Data.CellVoltage2, BM.Data.CellVoltage3, BM.Data.CellVoltage4]) + "mV"
-                # end if      
-                
-                #check faults
-                if (BM.Data.SafetyStatus > 0):
-                    print "Warning, Fault occurred at bottom of discharge"
-                    
-                    print "SafetyStatus = " + str(BM.Data.SafetyStatus)
-                # end if                 
-                
-                rest_start_time = time.time()
-            # end if
+    print "Relaxing Complete (Voltage = " + str(BM.Data.Voltage/1000.0) + "V) sending IT_ENABLE"
+    
+    # send the command to start the learning cycles
+    BM.write_data(['0x00', '0x21', '0x00'])    
+# end def
+
+def enter_charge(seq):
+    print "IT_ENABLE acccepted after " + get_runtime() + ", starting to charge"
+# end def
+
+def enter_vok_wait(seq):
+    print "Pack is charged to " + str(BM.Data.Voltage/1000.0) + "V after " + get_runtime() + ", relaxing"
+# end def
+
+def enter_final_discharge(seq):
+    print "OCV Measurement taken successfully (Voltage = " + str(BM.Data.Voltage/1000.0) + "V) after " + get_runtime() + ", transitioning to discharge again"
+# end def
+
+def enter_fault(seq):
+    print "An action failed in " + seq.previous_state.name + " after " + get_runtime() + ", disconnecting the pack and stopping"
+    
+    # disconnect the pack before anything else, then turn both sources off
+    try:
+        disconnect_pack(seq)
         
-            #disconnect the pack from the load
-            BM2_power_switch_set(0)
-            
+    except:
+        print "Failed to disconnect the pack"
+    # end try
+    
+    load_off(seq)
+    charger_off(seq)
+# end def
+
+def enter_max_error_wait(seq):
+    print "Pack is discharged to " + str(BM.Data.Voltage/1000.0) + "V after " + get_runtime() + ", relaxing"
+# end def
+
+## periodic actions, run in order so the load or charger is set up before 
+## the pack is connected to it
+def connect_pack(seq):
+    BM2_power_switch_set(1)
+# end def
+
+def disconnect_pack(seq):
+    BM2_power_switch_set(0)
+# end def
+
+def discharge(seq):
+    try:
+        with Load:
+            # configure the load for a discharge
+            Load.set_mode('constant_current', DISCHARGE_CURRENT)
+            Load.load_on()      
+        # end with
+        
+        comms_ok('Load')
+    
+    except:
+        if not comms_failed('Load', reinitialise_load):
+            # stop the pack being connected to a load that cannot be set up
+            raise
+        # end if
+    # end try
+# end def
+
+def load_off(seq):
+    try:
+        with Load:
             # turn the load off
             Load.load_off()
-            
-            # check exit criteria
-            if ((time.time() - rest_start_time) > STATE_PAUSE*10):
-                break_count += 1
-            
-            else:
-                break_count = 0
-            # end if
-            
-            if break_count >=2:                
-                current_state = IT_SETUP
-                break_count = 0
-            # end if
+        # end with
         
-        elif (current_state == IT_SETUP):
-            if (previous_state != current_state):
-                #check cell voltage validity
-                if cell_voltages_good(BM) == False:
-                    print "Aborting due to cell imbalance"
-                    sys.exit()
-                # end if
-                    
-                print "Relaxing Complete (Voltage = " + str(BM.Data.Voltage/1000.0) + "V) sending IT_ENABLE"
-                
-                # send the command to start the learning cycles
-                BM2_aardvark.send_SMB_data(['0x00', '0x21', '0x00'], BM.port)    
-                
-                previous_state = current_state
-            # end if              
-            
-            # check exit criteria
-            if ((BM.get_QEN() == 1) and (BM.get_RDIS() == 0)):
-                break_count += 1
-            
-            else:
-                break_count = 0
-            # end if
-            
-            if break_count >=2:                 
-                current_state = CHARGE
-                break_count = 0
-            # end if
-            
-        elif (current_state == CHARGE):
-            if (previous_state != current_state):
-                print "IT_ENABLE acccepted after " + get_runtime() + ", starting to charge"
-                previous_state = current_state
-            # end if
+        comms_ok('Load')
         
-            try:
-                # start charging the pack to full
-                with PS:
-                    # configure the power supply and turn it on
-                    PS.set_voltage(CHARGE_VOLTAGE)
-                    PS.set_current(CHARGE_CURRENT)
-                    PS.output_on()
-                # end with
-                
-            except:
-                print "Failed to communicate with the Power Supply"
-                next
-            # end try
-            
-            # connect the PS to the BM
-            BM2_power_switch_set(1)    
-                     
-            # check exit criteria
-            if (BM.get_FC() == True):
-                break_count += 1
-            
-            else:
-                break_count = 0
-            # end if
-            
-            if break_count >=2:                 
-                current_state = VOK_WAIT
-                break_count = 0
-            # end if
-            
-        elif (current_state == VOK_WAIT):
-            if (previous_state != current_state):
-                print "Pack is charged to " + str(BM.Data.Voltage/1000.0) + "V after " + get_runtime() + ", relaxing"
-                previous_state = current_state
-            # end if        
-                
-            #disconnect the pack from the power supply
-            BM2_power_switch_set(0)
-            
-            try:
-                with PS:
-                    # turn the power supply off
-                    PS.output_off()
-                # end with
-            
-            except:
-                print "Failed to communicate with the Power Supply"
-                next
-            # end try
-      
-            # check exit criteria
-            if (BM.get_VOK() == False) and (BM.Data.MaxError == 3) and (BM.Data.UpdateStatus == '0x0D'):
-                break_count += 1
-            
-            else:
-                break_count = 0
-            # end if
-            
-            if break_count >=2:                 
-                current_state = FINAL_DISCHARGE
-                break_count = 0
-            # end if
-            
-        elif (current_state == MAX_ERROR_WAIT):
-            if (previous_state != current_state):
-                print "Pack is discharged to " + str(BM.Data.Voltage/1000.0) + "V after " + get_runtime() + ", relaxing"
-                previous_state = current_state
-            # end if         
-            
-            #disconnect the pack from the load
-            BM2_power_switch_set(0)
-            
-            #check faults
-            if (BM.Data.SafetyStatus > 0):
-                print "Warning, Fault occurred at bottom of discharge"
-                
-                print "SafetyStatus = " + str(BM.Data.SafetyStatus)
-            # end if            
-            
-            try:
-                with Load:
-                    # turn the load off
-                    Load.load_off()
-                # end with
-                
-            except:
-                print "Communications with the Load failed"
-                old_load = Load
-                try: 
-                    Load = DC_Load.DCLoad('M9711')
-                    
-                except: 
-                    "Failed to re-initialise the Load"
-                    Load = old_load
-                # end try
-                next
-            # end try            
-            
-            # check exit criteria
-            if (BM.Data.MaxError == 1) and (BM.get_VOK() == False) and (BM.Data.UpdateStatus == '0x0E'):
-                break_count += 1
-            
-            else:
-                break_count = 0
-            # end if
-            
-            if break_count >=2:                 
-                current_state = COMPLETE
-                break_count = 0
-            # end if
-            
-            if ((time.time() - last_message_time) > MESSAGE_PERIOD):
-                # print a periodic message 
-                print "After " + get_runtime() + "MaxError is " + str(BM.Data.MaxError) + "%"
-                last_message_time = time.time()
-            #end if
+    except:
+        comms_failed('Load', reinitialise_load)
+    # end try  
+# end def
+
+def charge(seq):
+    try:
+        # start charging the pack to full
+        with PS:
+            # configure the power supply and turn it on
+            PS.set_voltage(CHARGE_VOLTAGE)
+            PS.set_current(CHARGE_CURRENT)
+            PS.output_on()
+        # end with
+        
+        comms_ok('Power Supply')
+        
+    except:
+        if not comms_failed('Power Supply'):
+            # stop the pack being connected to a charger that cannot be set up
+            raise
         # end if
+    # end try
+# end def
+
+def charger_off(seq):
+    try:
+        with PS:
+            # turn the power supply off
+            PS.output_off()
+        # end with
+        
+        comms_ok('Power Supply')
     
-        # wait for next loop
-        aardvark_py.aa_sleep_ms(SAMPLE_RATE_MS)  
-    #end while 
+    except:
+        comms_failed('Power Supply')
+    # end try
+# end def
+
+def check_vok(seq):
+    if BM.get_VOK() == False:
+        print " VOK has not be reset!"
+    # end if 
+# end def
+
+def max_error_message(seq):
+    global last_message_time
     
-    print "Learning Cycle has been completed successfully" 
-# end with
+    check_faults()
+    
+    if ((clock.time() - last_message_time) > MESSAGE_PERIOD):
+        # print a periodic message 
+        print "After " + get_runtime() + "MaxError is " + str(BM.Data.MaxError) + "%"
+        last_message_time = clock.time()
+    #end if
+# end def
+
+## exit criteria
+def rest_complete(seq):
+    return seq.time_in_state() > STATE_PAUSE*10
+# end def
+
+def it_enabled(seq):
+    return (BM.get_QEN() == 1) and (BM.get_RDIS() == 0)
+# end def
+
+def vok_cleared(seq):
+    return (BM.get_VOK() == False) and (BM.Data.MaxError == 3) and (BM.Data.UpdateStatus == '0x0D')
+# end def
+
+def learning_complete(seq):
+    return (BM.Data.MaxError == 1) and (BM.get_VOK() == False) and (BM.Data.UpdateStatus == '0x0E')
+# end def
+
+SAMPLE_PERIOD = SAMPLE_RATE_MS/1000.0
+
+# the sample period only backs off in the adaptive rest states, while the load
+# or charger is on the CUV and FC guards are checked every SAMPLE_PERIOD
+sampler = Adaptive_Sampler.AdaptiveSampler(SAMPLE_PERIOD, MAX_SAMPLE_PERIOD, 
+                                           DVDT_THRESHOLD, DIDT_THRESHOLD)
+Transition = Sequence_Engine.Transition
+State = Sequence_Engine.State
+
+learning_cycle = Sequence_Engine.Sequence([
+    State(INITIAL_DISCHARGE, 
+          entry = enter_initial_discharge,
+          actions = [discharge, connect_pack],
+          transitions = [Transition(LOW_REST, lambda seq: BM.get_CUV())],
+          sample_period = SAMPLE_PERIOD),
+    
+    State(LOW_REST, 
+          entry = enter_low_rest,
+          actions = [load_off, disconnect_pack],
+          transitions = [Transition(IT_SETUP, rest_complete)],
+          sample_period = SAMPLE_PERIOD,
+          adaptive = True),
+    
+    State(IT_SETUP, 
+          entry = enter_it_setup,
+          transitions = [Transition(CHARGE, it_enabled)],
+          sample_period = SAMPLE_PERIOD,
+          adaptive = True),
+    
+    State(CHARGE, 
+          entry = enter_charge,
+          actions = [charge, connect_pack],
+          transitions = [Transition(VOK_WAIT, lambda seq: BM.get_FC())],
+          sample_period = SAMPLE_PERIOD),
+    
+    State(VOK_WAIT, 
+          entry = enter_vok_wait,
+          actions = [charger_off, disconnect_pack],
+          transitions = [Transition(FINAL_DISCHARGE, vok_cleared)],
+          sample_period = SAMPLE_PERIOD,
+          adaptive = True),
+    
+    State(FINAL_DISCHARGE, 
+          entry = enter_final_discharge,
+          actions = [discharge, connect_pack, check_vok],
+          transitions = [Transition(MAX_ERROR_WAIT, lambda seq: BM.get_CUV())],
+          sample_period = SAMPLE_PERIOD),
+    
+    State(MAX_ERROR_WAIT, 
+          entry = enter_max_error_wait,
+          actions = [load_off, disconnect_pack, max_error_message],
+          transitions = [Transition(COMPLETE, learning_complete)],
+          sample_period = SAMPLE_PERIOD,
+          adaptive = True),
+    
+    State(COMPLETE, final = True),
+    
+    State(FAULT, entry = enter_fault, final = True)
+    ], INITIAL_DISCHARGE, sample = sample, clock = clock, checkpoint = checkpoint, 
+    sampler = sampler, fault_state = FAULT)
+
+with BM:
+    BM2_power_switch_init()  
+    
+    if resume is not None:
+        # the state's periodic actions bring the equipment back to where it 
+        # was, its entry action already ran before the checkpoint was saved
+        learning_cycle.resume(resume)
+    # end if
+    
+    # run the state machine
+    learning_cycle.run()
     
-      
\ No newline at end of file
+    if learning_cycle.faulted:
+        print "Learning Cycle stopped, it can be resumed from the last checkpoint"
+        
+    else:
+        print "Learning Cycle has been completed successfully" 
+    # end if
+    
+    print ("Communications failed on " + str(total_comms_failures['Load']) + 
+           " ticks with the Load and " + str(total_comms_failures['Power Supply']) + 
+           " with the Power Supply")
+# end with
+
+log_writer.close()
@@ -0,0 +1,743 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Log_Reader.py
+Module to read any of the logs written by the testers, working out the
+delimiter and layout of each file from its first lines, and to return the
+columns under common names and units in NumPy chunks of a bounded number
+of rows.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import collections
+import csv
+import io
+import itertools
+import os
+import re
+import sys
+
+import numpy
+
+# ---------
+# Constants
+
+# how a logged column is returned
+#   heading      the heading of the column in the log
+#   name         the common name the column is returned under
+#   unit         the unit the column is returned in, None if it has none
+#   logged_unit  the unit the column is logged in
+#   scale        what the logged value is multiplied by to give the unit
+#   kind         how the value is written, 'float', 'int' or 'hex'
+Column = collections.namedtuple('Column', ['heading', 'name', 'unit',
+                                           'logged_unit', 'scale', 'kind'])
+
+# the columns of the learning cycle logs written by Learning_cycle.py, the
+# headings of BM2_aardvark.BM2_Data.headers
+learning_columns = dict([(column.heading, column) for column in [
+    Column('time',            'time',             's',  's',  1.0,   'float'),
+    Column('voltage',         'voltage',          'V',  'mV', 0.001, 'int'),
+    Column('current',         'current',          'A',  'mA', 0.001, 'int'),
+    Column('ChargingVoltage', 'charging_voltage', 'V',  'mV', 0.001, 'int'),
+    Column('ChargingCurrent', 'charging_current', 'A',  'mA', 0.001, 'int'),
+    Column('OperationStatus', 'operation_status', None, None, 1,     'int'),
+    Column('SafetyAlert',     'safety_alert',     None, None, 1,     'int'),
+    Column('SafetyStatus',    'safety_status',    None, None, 1,     'int'),
+    Column('MaxError',        'max_error',        '%',  '%',  1,     'int'),
+    Column('BatteryStatus',   'battery_status',   None, None, 1,     'int'),
+    Column('CellVoltage1',    'cell_voltage1',    'V',  'mV', 0.001, 'int'),
+    Column('CellVoltage2',    'cell_voltage2',    'V',  'mV', 0.001, 'int'),
+    Column('CellVoltage3',    'cell_voltage3',    'V',  'mV', 0.001, 'int'),
+    Column('CellVoltage4',    'cell_voltage4',    'V',  'mV', 0.001, 'int'),
+    Column('UpdateStatus',    'update_status',    None, None, 1,     'hex')]])
+
+# the columns of the timed logs written by the Profile Logger, IR logger,
+# multimeter logger and heater tester, named as the Measurement_Sources
+# channels. Other headings are named from their text, with the unit taken
+# from any '(unit)' at the end.
+timed_columns = dict([(column.heading, column) for column in [
+    Column('Time (s)',            'time',                's',   's',   1.0, 'float'),
+    Column('Voltage',             'voltage',             'V',   'V',   1.0, 'float'),
+    Column('Current',             'current',             'A',   'A',   1.0, 'float'),
+    Column('Internal Resistance', 'internal_resistance', 'Ohm', 'Ohm', 1.0, 'float'),
+    Column('Compensated Voltage', 'smoothed_voltage',    'V',   'V',   1.0, 'float'),
+    Column('Approximate SOC',     'approximate_SOC',     '%',   '%',   1.0, 'float'),
+    Column('Relative SOC',        'relative_SOC',        '%',   '%',   1.0, 'float'),
+    Column('Absolute SOC',        'absolute_SOC',        '%',   '%',   1.0, 'float')]])
+
+# an efficiency tester grid
+#   title     the title of the grid
+#   power     the load power of each column (W)
+#   voltage   the input voltage of each row (V)
+#   values    the gridded value, a row per voltage, NaN where not measured
+#   unit      the unit of the values, None if they have none
+#   metadata  the name, value pairs after the title
+Grid = collections.namedtuple('Grid', ['title', 'power', 'voltage', 'values',
+                                       'unit', 'metadata'])
+
+# the quantity held in an efficiency tester grid, by the title of the grid
+grid_quantities = {'Efficiency':       ('efficiency',       None),
+                   'Voltage':          ('output_voltage',   'V'),
+                   'Adjusted Voltage': ('adjusted_voltage', 'V')}
+
+# the value given to an empty cell of each kind of column
+missing_values = {'float': numpy.nan, 'int': -1, 'hex': -1}
+
+# the largest number of rows returned in a chunk by default, the number of
+# cells for a grid
+default_chunk_rows = 4096
+
+# the number of lines read from the start of a log to work out its layout
+sniff_lines = 20
+
+# the types of a filename, which may be unicode on Python 2
+if sys.version_info[0] < 3:
+    filename_types = (basestring,)
+
+else:
+    filename_types = (str,)
+# end if
+
+#
+# ---------
+# Classes
+
+class LogReader(object):
+    """
+    Class that reads a log in chunks. The layout is worked out when the
+    reader is created and each chunk is a dict of arrays by column name,
+    so only one chunk of the log is held in memory at a time.
+
+    Three layouts are recognised:
+      'learning'  the comma delimited logs of Learning_cycle.py
+      'timed'     the tab delimited logs with a 'Time (s)' column, which
+                  may follow a preamble, as the heater tester writes
+      'grid'      the efficiency tester grids, returned a cell per row
+                  as the input voltage, the power and the gridded value
+
+    Blank rows, including the rows of empty cells a spreadsheet saves, are
+    ignored. Rows without a first value, repeated headers and rows cut
+    short or garbled by an interrupted write are skipped and counted. Only
+    the columns returned are read, so a row is only skipped for a garbled
+    value in one of them. Empty cells are given the missing value of the
+    column, NaN or -1.
+
+    @attribute filename   (string)  The log being read
+    @attribute schema     (string)  The layout of the log
+    @attribute delimiter  (string)  The delimiter of the log
+    @attribute columns    (list)    The Columns returned, in log order
+    @attribute metadata   (dict)    The name, value pairs found above the
+                                    header, such as the heater serial number
+                                    or the resistance of a voltage grid
+    @attribute title      (string)  The title of a grid, None otherwise
+    @attribute rows       (int)     The number of rows returned so far
+    @attribute skipped    (int)     The number of rows skipped so far
+    """
+
+    def __init__(self, log_file, chunk_rows = default_chunk_rows,
+                 convert = True, names = None):
+        """
+        Initialise the LogReader Object, reading the header of the log
+
+        @param[in] log_file     The filename of the log, or the log opened
+                                as text (string or file)
+        @param[in] chunk_rows   The largest number of rows in a chunk (int)
+        @param[in] convert      Return the values in the common units,
+                                otherwise they are returned as logged (bool)
+        @param[in] names        The names of the columns to return, all of
+                                them by default (list)
+        """
+        if isinstance(log_file, filename_types):
+            self.filename = log_file
+            self._file = open_text(log_file)
+            self._close = True
+
+        else:
+            self.filename = getattr(log_file, 'name', None)
+            self._file = log_file
+            self._close = False
+        # end if
+
+        self.chunk_rows = chunk_rows
+        self.convert = convert
+        self.metadata = {}
+        self.title = None
+        self.rows = 0
+        self.skipped = 0
+
+        self._sniff()
+
+        if names is not None:
+            unknown = [name for name in names
+                       if name not in [column.name for column in self.columns]]
+            if len(unknown) > 0:
+                raise ValueError(str(self.filename) + ' has no ' +
+                                 ', '.join(unknown) + ' column')
+            # end if
+
+            self._selected = [(index, column) for index, column
+                              in enumerate(self.columns)
+                              if column.name in names]
+
+        else:
+            self._selected = list(enumerate(self.columns))
+        # end if
+    # end def
+
+    def __enter__(self):
+        """
+        For use with the 'with' operator
+        """
+        return self
+    # end def
+
+    def __exit__(self, type, value, traceback):
+        """
+        Closes the log if the reader opened it
+
+        For use with the 'with' operator
+        """
+        self.close()
+    # end def
+
+    def __iter__(self):
+        """
+        @return   (generator)   The chunks of the log
+        """
+        if self.schema == 'grid':
+            return self._grid_chunks()
+        # end if
+
+        return self._chunks()
+    # end def
+
+    def close(self):
+        """
+        Close the log if the reader opened it
+        """
+        if self._close:
+            self._file.close()
+        # end if
+    # end def
+
+    def units(self):
+        """
+        @return   (dict)   The unit of each column returned, by name
+        """
+        return dict([(column.name, column.unit if self.convert
+                      else column.logged_unit)
+                     for _, column in self._selected])
+    # end def
+
+    def read_all(self):
+        """
+        Read the rest of the log into memory
+
+        @return   (dict)   Each column as one array, by name
+        """
+        chunks = list(self)
+        names = [column.name for _, column in self._selected]
+
+        if len(chunks) == 0:
+            return dict([(name, numpy.array([], dtype = self._dtype(column)))
+                         for name, (_, column) in zip(names, self._selected)])
+        # end if
+
+        return dict([(name, numpy.concatenate([chunk[name]
+                                               for chunk in chunks]))
+                     for name in names])
+    # end def
+
+    def _sniff(self):
+        """
+        Work out the delimiter and layout of the log from its first lines
+        and read up to the end of its header
+        """
+        lines = list(itertools.islice(self._file, sniff_lines))
+        sample = ''.join(lines)
+        self.delimiter = '\t' if sample.count('\t') > sample.count(',') else ','
+
+        rows = list(csv.reader(lines, delimiter = self.delimiter))
+        header = None
+
+        for index, row in enumerate(rows):
+            first = row[0].strip() if len(row) > 0 else ''
+
+            if first == 'time':
+                self.schema = 'learning'
+                header = index
+                break
+
+            elif first == 'Time (s)':
+                self.schema = 'timed'
+                header = index
+                break
+
+            elif (len(row) > 2) and (row[1].strip() == 'Power'):
+                self.schema = 'grid'
+                header = index
+                break
+            # end if
+        # end for
+
+        if header is None:
+            raise ValueError('The layout of ' + str(self.filename) +
+                             ' is not recognised')
+        # end if
+
+        for row in rows[:header]:
+            self.metadata.update(_pairs(row))
+        # end for
+
+        headings = [heading.strip() for heading in rows[header]]
+
+        if self.schema == 'grid':
+            # the title is above the power axis, and the 'Voltage' label
+            # of the voltage axis below it
+            titles = [row for row in rows[:header] if any(row)]
+            title_row = titles[-1] if len(titles) > 0 else ['']
+            self.title = title_row[0].strip()
+            self.metadata = _pairs(title_row[1:])
+
+            name, unit = grid_quantities.get(self.title,
+                                             (_name(self.title), None))
+            self.columns = [Column('Voltage', 'input_voltage', 'V', 'V',
+                                   1.0, 'float'),
+                            Column('Power', 'power', 'W', 'W', 1.0, 'float'),
+                            Column(self.title, name, unit, unit, 1.0,
+                                   'float')]
+            # the power axis, without any empty cells after it
+            power = [value.strip() for value in rows[header][2:]]
+            while (len(power) > 0) and (power[-1] == ''):
+                power.pop()
+            # end while
+
+            self.power = numpy.array([_float(value) for value in power])
+            self._width = len(self.power)
+
+            if ((header + 1 < len(rows)) and (len(rows[header + 1]) > 0) and
+                (rows[header + 1][0].strip() == 'Voltage')):
+                header += 1
+            # end if
+
+        else:
+            known = learning_columns if self.schema == 'learning' \
+                    else timed_columns
+            self.columns = [known[heading] if heading in known
+                            else _heading_column(heading)
+                            for heading in headings]
+        # end if
+
+        self._headings = headings
+        self._rows = csv.reader(itertools.chain(lines[_line_count(
+            lines, header + 1, self.delimiter):], self._file),
+            delimiter = self.delimiter)
+    # end def
+
+    def _dtype(self, column):
+        """
+        @param[in]  column    A Column (Column)
+        @return     (type)    The type the column is returned as
+        """
+        if column.kind == 'float' or (self.convert and column.scale != 1):
+            return numpy.float64
+        # end if
+
+        return numpy.int64
+    # end def
+
+    def _chunks(self):
+        """
+        @return   (generator)   The chunks of a learning or timed log
+        """
+        width = len(self._headings)
+        first_heading = self._headings[0]
+        rows = []
+
+        for row in self._rows:
+            if _blank(row):
+                # a blank line, or one of only delimiters
+                continue
+
+            elif ((len(row) != width) or (row[0].strip() == '') or
+                  (row[0].strip() == first_heading)):
+                self.skipped += 1
+                continue
+            # end if
+
+            rows.append(row)
+
+            if len(rows) == self.chunk_rows:
+                yield self._convert(rows)
+                rows = []
+            # end if
+        # end for
+
+        if len(rows) > 0:
+            yield self._convert(rows)
+        # end if
+    # end def
+
+    def _grid_chunks(self):
+        """
+        @return   (generator)   The chunks of a grid, a cell per row
+        """
+        rows = []
+
+        for row in self._rows:
+            if _blank(row):
+                # a blank line, or one of only delimiters
+                continue
+
+            elif (len(row) < 2) or (row[0].strip() == ''):
+                self.skipped += 1
+                continue
+            # end if
+
+            # the voltage and the cells, with any cut short by an
+            # interrupted sweep left empty
+            cells = row[2:2 + self._width]
+            rows.append([row[0]] + cells + ['']*(self._width - len(cells)))
+
+            if len(rows)*self._width >= self.chunk_rows:
+                yield self._grid_chunk(rows)
+                rows = []
+            # end if
+        # end for
+
+        if len(rows) > 0:
+            yield self._grid_chunk(rows)
+        # end if
+    # end def
+
+    def _grid_chunk(self, rows):
+        """
+        Convert grid rows into the cells as columns, falling back to a row
+        at a time to drop any rows that cannot be read
+
+        @param[in]  rows     The voltage and cells of each grid row as text
+                             (list)
+        @return     (dict)   The cells as columns
+        """
+        try:
+            values = _grid_values(rows)
+
+        except ValueError:
+            good = []
+            for row in rows:
+                try:
+                    _grid_values([row])
+                    good.append(row)
+                except ValueError:
+                    self.skipped += 1
+                # end try
+            # end for
+
+            values = _grid_values(good) if len(good) > 0 \
+                     else numpy.zeros((0, self._width + 1))
+        # end try
+
+        self.rows += values.shape[0]*self._width
+        names = [column.name for column in self.columns]
+        chunk = {names[0]: numpy.repeat(values[:, 0], self._width),
+                 names[1]: numpy.tile(self.power, values.shape[0]),
+                 names[2]: values[:, 1:].ravel()}
+
+        return dict([(column.name, chunk[column.name])
+                     for _, column in self._selected])
+    # end def
+
+    def _convert(self, rows):
+        """
+        Convert a chunk of rows into arrays, a column at a time, falling
+        back to a row at a time to drop any rows that cannot be read
+
+        @param[in]  rows     The rows of text (list)
+        @return     (dict)   The columns, by name
+        """
+        try:
+            chunk = self._convert_rows(rows)
+
+        except ValueError:
+            good = []
+            for row in rows:
+                try:
+                    self._convert_rows([row])
+                    good.append(row)
+                except ValueError:
+                    self.skipped += 1
+                # end try
+            # end for
+
+            rows = good
+            chunk = self._convert_rows(rows)
+        # end try
+
+        self.rows += len(rows)
+
+        return chunk
+    # end def
+
+    def _convert_rows(self, rows):
+        """
+        @param[in]  rows     The rows of text (list)
+        @return     (dict)   The columns, by name
+        """
+        return dict([(column.name, self._convert_column(
+                          column, [row[index] for row in rows]))
+                     for index, column in self._selected])
+    # end def
+
+    def _convert_column(self, column, text):
+        """
+        @param[in]  column    The Column (Column)
+        @param[in]  text      The values as logged (list)
+        @return     (array)   The values
+        """
+        missing = missing_values[column.kind]
+
+        if column.kind == 'hex':
+            values = numpy.array([int(value, 16) if value.strip() != ''
+                                  else missing for value in text],
+                                 dtype = numpy.int64)
+
+        else:
+            if '' in text:
+                text = [value if value != '' else str(missing)
+                        for value in text]
+            # end if
+
+            values = numpy.array(text).astype(numpy.float64 if column.kind == 'float'
+                                   else numpy.int64)
+        # end if
+
+        if self.convert and (column.scale != 1):
+            scaled = values*column.scale
+            if column.kind != 'float':
+                scaled[values == missing] = numpy.nan
+            # end if
+            return scaled
+        # end if
+
+        return values
+    # end def
+# end class
+
+
+#
+# ----------------
+# Public Functions
+
+def open_text(filename):
+    """
+    Open a log as text for the csv module
+
+    @param[in]  filename   The filename of the log (string)
+    @return     (file)     The open log
+    """
+    if sys.version_info[0] < 3:
+        return open(filename, 'rb')
+    # end if
+
+    return io.open(filename, 'r', encoding = 'utf-8', errors = 'replace',
+                   newline = '')
+# end def
+
+
+def text_stream(binary_file):
+    """
+    Wrap a binary stream, such as a member of a zip, as text for the csv
+    module
+
+    @param[in]  binary_file   The open binary stream (file)
+    @return     (file)        The stream as text
+    """
+    if sys.version_info[0] < 3:
+        return binary_file
+    # end if
+
+    return io.TextIOWrapper(binary_file, encoding = 'utf-8',
+                            errors = 'replace', newline = '')
+# end def
+
+
+def read_log(log_file, names = None, convert = True):
+    """
+    Read all of a log into memory
+
+    @param[in]  log_file   The filename of the log or the open log
+                           (string or file)
+    @param[in]  names      The columns to read, all of them by default (list)
+    @param[in]  convert    Return the values in the common units (bool)
+    @return     (dict)     Each column as an array, by name
+    """
+    with LogReader(log_file, convert = convert, names = names) as reader:
+        return reader.read_all()
+    # end with
+# end def
+
+
+def read_grid(log_file):
+    """
+    Read an efficiency tester grid as a 2D array
+
+    @param[in]  log_file   The filename of the grid or the open grid
+                           (string or file)
+    @return     (Grid)     The grid
+    """
+    with LogReader(log_file) as reader:
+        if reader.schema != 'grid':
+            raise ValueError(str(reader.filename) + ' is not a grid')
+        # end if
+
+        data = reader.read_all()
+        name = reader.columns[2].name
+        voltage = data['input_voltage'][::len(reader.power)]
+
+        return Grid(reader.title, reader.power, voltage,
+                    data[name].reshape(len(voltage), len(reader.power)),
+                    reader.columns[2].unit, reader.metadata)
+    # end with
+# end def
+
+
+#
+# ----------------
+# Private Functions
+
+def _name(text):
+    """
+    @param[in]  text       A heading or title (string)
+    @return     (string)   The heading as a lower case name
+    """
+    return re.sub(r'[^0-9a-z]+', '_', text.lower()).strip('_')
+# end def
+
+
+def _heading_column(heading):
+    """
+    @param[in]  heading    A heading that is not a known column (string)
+    @return     (Column)   The column, with any unit given in brackets
+    """
+    match = re.match(r'^(.*?)\s*\(([^)]*)\)$', heading)
+    if match is not None:
+        name, unit = match.group(1), match.group(2)
+
+    else:
+        name, unit = heading, None
+    # end if
+
+    return Column(heading, _name(name), unit, unit, 1.0, 'float')
+# end def
+
+
+def _pairs(row):
+    """
+    @param[in]  row      The fields of a row above the header (list)
+    @return     (dict)   The values of the row, each following its name
+    """
+    fields = [field.strip() for field in row if field.strip() != '']
+    return dict(zip(fields[0::2], fields[1::2]))
+# end def
+
+
+def _blank(row):
+    """
+    @param[in]  row      The fields of a row (list)
+    @return     (bool)   True if every field of the row is empty
+    """
+    for field in row:
+        if field.strip() != '':
+            return False
+        # end if
+    # end for
+
+    return True
+# end def
+
+
+def _float(text):
+    """
+    @param[in]  text      A cell of a grid (string)
+    @return     (float)   The value, NaN if the cell is empty
+    """
+    if text.strip() == '':
+        return numpy.nan
+    # end if
+
+    return float(text)
+# end def
+
+
+def _grid_values(rows):
+    """
+    @param[in]  rows      The voltage and cells of grid rows as text, padded
+                          to the same length (list)
+    @return     (array)   The values, empty cells as NaN, a row per grid row
+    """
+    text = numpy.array(rows)
+    return numpy.where(numpy.char.strip(text) == '', 'nan',
+                       text).astype(numpy.float64)
+# end def
+
+
+def _line_count(lines, rows, delimiter):
+    """
+    Find how many lines the first rows of a log take, as a quoted field may
+    span lines
+
+    @param[in]  lines       The lines read from the start of the log (list)
+    @param[in]  rows        The number of rows (int)
+    @param[in]  delimiter   The delimiter of the log (string)
+    @return     (int)       The number of lines
+    """
+    reader = csv.reader(lines, delimiter = delimiter)
+    for _ in range(rows):
+        next(reader)
+    # end for
+
+    return reader.line_num
+# end def
+
+
+def _main():
+    """
+    Describe the layout of the logs given on the command line
+    """
+    for filename in sys.argv[1:]:
+        with LogReader(filename) as reader:
+            for chunk in reader:
+                pass
+            # end for
+
+            print(os.path.basename(filename) + ': ' + reader.schema + ', ' +
+                  str(reader.rows) + ' rows, ' + str(reader.skipped) +
+                  ' skipped')
+            for column in reader.columns:
+                print('  %-24s %-22s %s' % (column.heading, column.name,
+                                             column.unit or ''))
+            # end for
+        # end with
+    # end for
+# end def
+
+if __name__ == '__main__':
+    # if this code is not running as an imported module describe the logs
+    _main()
+# end if
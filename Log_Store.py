@@ -0,0 +1,522 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Log_Store.py
+Module to convert the learning cycle logs into typed columns on disk, one
+NumPy file per column, with a catalog of the runs so that analyses can read
+only the runs, columns and time ranges they need.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import glob
+import json
+import os
+import re
+import shutil
+import time
+import zipfile
+
+import numpy
+
+import Log_Reader
+import Result_Cache
+
+# ---------
+# Constants
+
+# the columns of a learning cycle log and how they are stored, in the order
+# of BM2_aardvark.BM2_Data.headers
+columns = [('time',             numpy.float64),
+           ('voltage',          numpy.int32),
+           ('current',          numpy.int32),
+           ('ChargingVoltage',  numpy.int32),
+           ('ChargingCurrent',  numpy.int32),
+           ('OperationStatus',  numpy.int32),
+           ('SafetyAlert',      numpy.int32),
+           ('SafetyStatus',     numpy.int32),
+           ('MaxError',         numpy.int32),
+           ('BatteryStatus',    numpy.int32),
+           ('CellVoltage1',     numpy.int32),
+           ('CellVoltage2',     numpy.int32),
+           ('CellVoltage3',     numpy.int32),
+           ('CellVoltage4',     numpy.int32),
+           ('UpdateStatus',     numpy.int16)]
+
+# the value stored for a column the log does not have, such as SafetyStatus
+# in the older logs
+missing_value = -1
+
+# where the store is kept by default
+default_store_dir = 'Log store'
+
+# the logs ingested by default
+log_file_pattern = 'log file *.csv'
+learning_logs_zip = 'learning logs.zip'
+
+# the catalog of ingested logs within the store
+catalog_filename = 'catalog.json'
+
+# the start time in the name of a learning cycle log
+log_file_time = re.compile(r'(\d{4})-(\d{2})-(\d{2}) (\d{2})-(\d{2})')
+
+# number of consecutive samples an UpdateStatus must be seen in to count as
+# a state reached, so that corrupted reads are ignored
+state_debounce = 2
+
+#
+# ---------
+# Classes
+
+class LogStore(object):
+    """
+    Class that holds the learning cycle logs as columns of NumPy files,
+    read through memory maps, and a catalog with the start time, duration,
+    UpdateStatus states reached and voltage range of each run.
+
+    @attribute directory  (string)  The directory of the store
+    @attribute catalog    (dict)    The catalog entry of each log by name
+    """
+
+    def __init__(self, directory = default_store_dir):
+        """
+        Initialise the LogStore Object, loading the catalog if there is one
+
+        @param[in] directory   The directory of the store (string)
+        """
+        self.directory = directory
+        self.catalog = {}
+
+        catalog_path = os.path.join(directory, catalog_filename)
+        if os.path.isfile(catalog_path):
+            with open(catalog_path, 'r') as catalog_file:
+                self.catalog = json.load(catalog_file)
+            # end with
+        # end if
+    # end def
+
+    def ingest(self, filenames = None, zip_filename = None):
+        """
+        Add logs to the store, skipping those that are unchanged since they
+        were last ingested
+
+        @param[in]  filenames      The csv logs, 'log file *.csv' in the
+                                   working directory by default (list)
+        @param[in]  zip_filename   A zip of logs to add as well, the
+                                   learning logs zip by default if it exists
+                                   (string)
+        @return     (list)         The names of the logs added or updated
+        """
+        if filenames is None:
+            filenames = sorted(glob.glob(log_file_pattern))
+
+            if (zip_filename is None) and os.path.isfile(learning_logs_zip):
+                zip_filename = learning_logs_zip
+            # end if
+        # end if
+
+        added = []
+
+        for filename in filenames:
+            name = os.path.splitext(os.path.basename(filename))[0]
+            stat = os.stat(filename)
+            signature = [stat.st_size, int(stat.st_mtime)]
+
+            if self._is_current(name, signature):
+                continue
+            # end if
+
+            with Log_Reader.open_text(filename) as log_file:
+                self._add(name, filename, signature, log_file,
+                          _name_start_time(name), None)
+            # end with
+            added.append(name)
+        # end for
+
+        if zip_filename is not None:
+            zip_name = os.path.splitext(os.path.basename(zip_filename))[0]
+
+            with zipfile.ZipFile(zip_filename) as archive:
+                for info in archive.infolist():
+                    if not info.filename.endswith('.csv'):
+                        continue
+                    # end if
+
+                    member = os.path.splitext(os.path.basename(
+                        info.filename))[0]
+                    name = zip_name + '/' + member
+                    signature = [info.file_size, info.CRC]
+
+                    if self._is_current(name, signature):
+                        continue
+                    # end if
+
+                    # the time stored in a zip is when the log was last
+                    # written, which is the end of the run
+                    end_time = time.mktime(info.date_time + (0, 0, -1))
+
+                    with archive.open(info) as member_file:
+                        self._add(name, zip_filename + '/' + info.filename,
+                                  signature,
+                                  Log_Reader.text_stream(member_file),
+                                  None, end_time)
+                    # end with
+                    added.append(name)
+                # end for
+            # end with
+        # end if
+
+        if len(added) > 0:
+            self._save_catalog()
+        # end if
+
+        return added
+    # end def
+
+    def names(self, state = None, after = None, before = None):
+        """
+        Find the logs in the catalog
+
+        @param[in]  state    Only logs that reached this UpdateStatus (int)
+        @param[in]  after    Only logs that ran after this epoch time (float)
+        @param[in]  before   Only logs that ran before this epoch time (float)
+        @return     (list)   The names of the logs, in order of start time
+        """
+        selected = []
+
+        for name, entry in self.catalog.items():
+            if (state is not None) and (state not in entry['states']):
+                continue
+            # end if
+
+            if entry['start_time'] is not None:
+                if (after is not None) and (entry['end_time'] < after):
+                    continue
+                # end if
+
+                if (before is not None) and (entry['start_time'] > before):
+                    continue
+                # end if
+
+            elif (after is not None) or (before is not None):
+                # the run cannot be placed in time
+                continue
+            # end if
+
+            selected.append(name)
+        # end for
+
+        return sorted(selected, key = lambda name:
+                      (self.catalog[name]['start_time'] or 0, name))
+    # end def
+
+    def column(self, name, column):
+        """
+        Read a column of a log without loading it into memory
+
+        @param[in]  name      The name of the log (string)
+        @param[in]  column    The name of the column (string)
+        @return     (array)   The column, memory mapped
+        """
+        if name not in self.catalog:
+            raise KeyError('The log ' + str(name) + ' is not in the store')
+        # end if
+
+        return numpy.load(os.path.join(self._log_dir(name), column + '.npy'),
+                          mmap_mode = 'r')
+    # end def
+
+    def read(self, name, column_names, start = None, end = None):
+        """
+        Read some columns of a log over a time range
+
+        @param[in]  name           The name of the log (string)
+        @param[in]  column_names   The columns to read (list)
+        @param[in]  start          The first log time to read in seconds
+                                   (float)
+        @param[in]  end            The log time to read up to in seconds
+                                   (float)
+        @return     (dict)         The columns by name, memory mapped
+        """
+        first = 0
+        last = self.catalog[name]['rows']
+
+        if (start is not None) or (end is not None):
+            log_time = self.column(name, 'time')
+
+            if self.catalog[name]['sorted']:
+                if start is not None:
+                    first = numpy.searchsorted(log_time, start, 'left')
+                # end if
+
+                if end is not None:
+                    last = numpy.searchsorted(log_time, end, 'left')
+                # end if
+
+            else:
+                selected = numpy.ones(len(log_time), dtype = bool)
+                if start is not None:
+                    selected &= (log_time >= start)
+                # end if
+
+                if end is not None:
+                    selected &= (log_time < end)
+                # end if
+
+                rows = numpy.flatnonzero(selected)
+                return dict([(column, self.column(name, column)[rows])
+                             for column in column_names])
+            # end if
+        # end if
+
+        return dict([(column, self.column(name, column)[first:last])
+                     for column in column_names])
+    # end def
+
+    def query(self, column_names, after = None, before = None, state = None):
+        """
+        Read some columns of every log over a range of epoch times
+
+        @param[in]  column_names   The columns to read (list)
+        @param[in]  after          The epoch time to read from (float)
+        @param[in]  before         The epoch time to read up to (float)
+        @param[in]  state          Only logs that reached this UpdateStatus
+                                   (int)
+        @return     (generator)    The name and columns of each log
+        """
+        for name in self.names(state, after, before):
+            offset = self.catalog[name]['start_time'] or 0.0
+
+            yield name, self.read(
+                name, column_names,
+                None if after is None else after - offset,
+                None if before is None else before - offset)
+        # end for
+    # end def
+
+    def _is_current(self, name, signature):
+        """
+        @param[in]  name        The name of a log (string)
+        @param[in]  signature   The size and modification of its source (list)
+        @return     (bool)      True if the log is stored from this source
+        """
+        return ((name in self.catalog) and
+                (self.catalog[name]['signature'] == signature))
+    # end def
+
+    def _log_dir(self, name):
+        """
+        @param[in]  name       The name of a log (string)
+        @return     (string)   The directory its columns are stored in
+        """
+        return os.path.join(self.directory, *name.split('/'))
+    # end def
+
+    def _add(self, name, source, signature, log_file, start_time, end_time):
+        """
+        Convert a log to columns and add it to the catalog
+
+        @param[in]  name         The name of the log (string)
+        @param[in]  source       Where the log was read from (string)
+        @param[in]  signature    The size and modification of the source
+                                 (list)
+        @param[in]  log_file     The log, open as text (file)
+        @param[in]  start_time   The epoch time the run started (float)
+        @param[in]  end_time     The epoch time the run ended, used when the
+                                 start is not known (float)
+        """
+        log_columns = _parse_log(log_file)
+        log_time = log_columns['time']
+        voltage = log_columns['voltage']
+        rows = len(log_time)
+
+        duration = float(log_time[-1] - log_time[0]) if rows > 0 else 0.0
+        if (start_time is None) and (end_time is not None):
+            start_time = end_time - duration
+        # end if
+
+        # write the columns beside the old ones and then swap them in
+        log_dir = self._log_dir(name)
+        temp_dir = log_dir + '.tmp'
+        if os.path.isdir(temp_dir):
+            shutil.rmtree(temp_dir)
+        # end if
+        os.makedirs(temp_dir)
+
+        for column, values in log_columns.items():
+            numpy.save(os.path.join(temp_dir, column + '.npy'), values)
+        # end for
+
+        if os.path.isdir(log_dir):
+            shutil.rmtree(log_dir)
+        # end if
+        os.rename(temp_dir, log_dir)
+
+        self.catalog[name] = {
+            'source': source,
+            'signature': signature,
+            'rows': rows,
+            'start_time': start_time,
+            'end_time': (None if start_time is None
+                         else start_time + duration),
+            'duration': duration,
+            'sorted': bool(numpy.all(numpy.diff(log_time) >= 0)),
+            'states': _states_reached(log_columns['UpdateStatus']),
+            'min_voltage': int(voltage.min()) if rows > 0 else None,
+            'max_voltage': int(voltage.max()) if rows > 0 else None}
+    # end def
+
+    def _save_catalog(self):
+        """
+        Write the catalog, replacing the old one only once it is complete
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        # end if
+
+        catalog_path = os.path.join(self.directory, catalog_filename)
+        temp_path = catalog_path + '.tmp'
+
+        with open(temp_path, 'w') as catalog_file:
+            json.dump(self.catalog, catalog_file, indent = 2, sort_keys = True)
+        # end with
+
+        Result_Cache.replace_file(temp_path, catalog_path)
+    # end def
+# end class
+
+
+#
+# ----------------
+# Private Functions
+
+def _parse_log(log_file):
+    """
+    Parse a learning cycle log, a chunk at a time. The rows that cannot be
+    read, such as the blank rows and repeated headers left by restarted
+    runs, are skipped by the reader.
+
+    @param[in]  log_file  The log, open as text (file)
+    @return     (dict)    Each column as an array, by name
+    """
+    chunks = dict([(column, []) for column, _ in columns])
+
+    try:
+        reader = Log_Reader.LogReader(log_file, convert = False)
+    except ValueError:
+        # an empty log, or one that is not a learning cycle log
+        reader = None
+    # end try
+
+    if (reader is not None) and (reader.schema == 'learning'):
+        names = dict([(column.heading, column.name)
+                      for column in reader.columns])
+
+        for chunk in reader:
+            rows = len(chunk['time'])
+
+            for column, dtype in columns:
+                if column in names:
+                    chunks[column].append(chunk[names[column]].astype(dtype))
+
+                else:
+                    chunks[column].append(numpy.full(rows, missing_value,
+                                                     dtype = dtype))
+                # end if
+            # end for
+        # end for
+    # end if
+
+    return dict([(column, numpy.concatenate(chunks[column])
+                  if len(chunks[column]) > 0
+                  else numpy.array([], dtype = dtype))
+                 for column, dtype in columns])
+# end def
+
+
+def _states_reached(update_status):
+    """
+    @param[in]  update_status   The UpdateStatus column (array)
+    @return     (list)          The UpdateStatus values held for at least
+                                state_debounce samples, in the order first
+                                reached
+    """
+    states = []
+    run_value = None
+    run_length = 0
+
+    for value in update_status.tolist():
+        if value == run_value:
+            run_length += 1
+
+        else:
+            run_value = value
+            run_length = 1
+        # end if
+
+        if ((run_length == state_debounce) and (value != missing_value) and
+            (value not in states)):
+            states.append(value)
+        # end if
+    # end for
+
+    return states
+# end def
+
+
+def _name_start_time(name):
+    """
+    @param[in]  name      The name of a log (string)
+    @return     (float)   The epoch time in its name, local time, None if
+                          it has none
+    """
+    match = log_file_time.search(name)
+    if match is None:
+        return None
+    # end if
+
+    fields = [int(field) for field in match.groups()]
+    return time.mktime((fields[0], fields[1], fields[2], fields[3],
+                        fields[4], 0, 0, 0, -1))
+# end def
+
+
+def _main():
+    """
+    Ingest the logs in the working directory and list the catalog
+    """
+    store = LogStore()
+    added = store.ingest()
+    print(str(len(added)) + ' logs ingested')
+
+    for name in store.names():
+        entry = store.catalog[name]
+        start = ('-' if entry['start_time'] is None else
+                 time.strftime('%Y-%m-%d %H:%M',
+                               time.localtime(entry['start_time'])))
+
+        print('%-50s %s %8.0f s %7d rows  %s' %
+              (name, start, entry['duration'], entry['rows'],
+               ' '.join(['0x%02X' % state for state in entry['states']])))
+    # end for
+# end def
+
+if __name__ == '__main__':
+    # if this code is not running as an imported module ingest the logs
+    _main()
+# end if
@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Log_Writer.py
+Module to provide a buffered, append only csv writer for long running
+tests that keeps the log durable if the test or the host crashes.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import csv
+import os
+import time
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+# end try
+
+# ---------
+# Constants
+
+# how far back from the end of a file to look for the last complete line
+recovery_scan_bytes = 65536
+
+#
+# ---------
+# Classes
+
+class LogWriter(object):
+    """
+    Class that buffers csv rows in memory and appends them to the log file
+    at a bounded interval, keeping the file open for the whole test.
+
+    @attribute filename         (string)  The file currently being written
+    @attribute headers          (list)    The header row written at the top
+                                          of every new file
+    @attribute delimiter        (string)  The csv delimiter
+    @attribute flush_interval   (float)   Maximum seconds a row is buffered
+    @attribute fsync_interval   (float)   Maximum seconds between fsyncs
+    @attribute max_bytes        (int)     Size at which the log is rotated,
+                                          None to never rotate on size
+    @attribute max_age          (float)   Seconds after which the log is
+                                          rotated, None to never rotate on age
+    @attribute rows_written     (int)     The number of rows written
+    """
+
+    def __init__(self, filename, headers = None, delimiter = ',',
+                 flush_interval = 5.0, fsync_interval = 60.0,
+                 max_bytes = None, max_age = None):
+        """
+        Initialise the LogWriter Object
+
+        @param[in] filename        The log file to append to (string)
+        @param[in] headers         The header row for new files (list)
+        @param[in] delimiter       The csv delimiter (string)
+        @param[in] flush_interval  Maximum seconds to buffer a row (float)
+        @param[in] fsync_interval  Maximum seconds between fsyncs (float)
+        @param[in] max_bytes       Rotate the log at this size (int)
+        @param[in] max_age         Rotate the log after this many seconds
+                                   (float)
+        """
+        self.filename = filename
+        self.base_filename = filename
+        self.headers = headers
+        self.delimiter = delimiter
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.rows_written = 0
+        self.segment = 0
+
+        self.file = None
+        self.file_bytes = 0
+        self.open_time = 0
+        self.last_flush = 0
+        self.last_fsync = 0
+
+        self._buffer = []
+        self._line = StringIO()
+        self._writer = csv.writer(self._line, delimiter = delimiter)
+    # end def
+
+    def __enter__(self):
+        """
+        For use with the 'with' operator
+        """
+        self.open()
+        return self
+    # end def
+
+    def __exit__(self, type, value, traceback):
+        """
+        Ensures everything buffered is written and synced to disk
+
+        For use with the 'with' operator
+        """
+        self.close()
+    # end def
+
+    def open(self):
+        """
+        Open the log file for appending, repairing any torn last line left by
+        a crash.
+        """
+        recover(self.filename)
+
+        self.file = open(self.filename, 'ab')
+        self.file_bytes = self.file.tell()
+        self.open_time = time.time()
+        self.last_flush = self.open_time
+        self.last_fsync = self.open_time
+
+        # only a new file needs headers
+        if (self.file_bytes == 0) and (self.headers is not None):
+            self._buffer.append(self._format(self.headers))
+            self._write(sync = True)
+        # end if
+    # end def
+
+    def writerow(self, row):
+        """
+        Buffer a row, writing the buffer out if it is older than the flush
+        interval.
+
+        @param[in]  row    The values to log (list)
+        """
+        self._buffer.append(self._format(row))
+        self.rows_written += 1
+
+        now = time.time()
+        if (now - self.last_flush) >= self.flush_interval:
+            self.flush(sync = (now - self.last_fsync) >= self.fsync_interval)
+        # end if
+    # end def
+
+    def writerows(self, rows):
+        """
+        Buffer several rows
+
+        @param[in]  rows   The rows to log (list of lists)
+        """
+        for row in rows:
+            self.writerow(row)
+        # end for
+    # end def
+
+    def flush(self, sync = False):
+        """
+        Write the buffered rows to the file, rotating it if it has reached
+        its size or age limit.
+
+        @param[in]  sync   Also fsync the file to disk (bool)
+        """
+        self._write(sync)
+
+        if (self.file is not None) and self._rotation_due():
+            self.rotate()
+        # end if
+    # end def
+
+    def rotate(self):
+        """
+        Close the current file and continue logging in a new one named
+        '<base> <n>.<ext>'
+        """
+        self.close()
+
+        self.segment += 1
+        root, extension = os.path.splitext(self.base_filename)
+        self.filename = root + ' ' + str(self.segment) + extension
+
+        self.open()
+    # end def
+
+    def close(self):
+        """
+        Write everything buffered, sync it to disk and close the file
+        """
+        if self.file is not None:
+            self._write(sync = True)
+            self.file.close()
+            self.file = None
+        # end if
+    # end def
+
+    def _write(self, sync):
+        """
+        Write the buffered rows to the file
+
+        @param[in]  sync   Also fsync the file to disk (bool)
+        """
+        if self.file is None:
+            return
+        # end if
+
+        if len(self._buffer) > 0:
+            data = ''.join(self._buffer)
+            if not isinstance(data, bytes):
+                data = data.encode('utf-8')
+            # end if
+
+            self.file.write(data)
+            self.file.flush()
+            self.file_bytes += len(data)
+            self._buffer = []
+        # end if
+
+        self.last_flush = time.time()
+
+        if sync:
+            os.fsync(self.file.fileno())
+            self.last_fsync = self.last_flush
+        # end if
+    # end def
+
+    def _rotation_due(self):
+        """
+        Determine if the log has reached its size or age limit
+
+        @return   (bool)   True if the log should be rotated
+        """
+        if (self.max_bytes is not None) and (self.file_bytes >= self.max_bytes):
+            return True
+
+        elif ((self.max_age is not None) and
+              ((time.time() - self.open_time) >= self.max_age)):
+            return True
+        # end if
+
+        return False
+    # end def
+
+    def _format(self, row):
+        """
+        Format a row as a csv line
+
+        @param[in]  row       The values to format (list)
+        @return     (string)  The csv line including the terminator
+        """
+        self._line.seek(0)
+        self._line.truncate()
+        self._writer.writerow(row)
+        return self._line.getvalue()
+    # end def
+# end class
+
+
+#
+# ----------------
+# Public Functions
+
+def recover(filename):
+    """
+    Truncate a torn last line from a log file that was being written when
+    the test or host crashed. A file with no line end at all, such as a
+    header or single row saved without one, is kept and its line ended.
+
+    @param[in]  filename   The log file to check (string)
+    @return     (int)      The number of bytes removed
+    """
+    if not os.path.isfile(filename):
+        return 0
+    # end if
+
+    with open(filename, 'r+b') as log_file:
+        log_file.seek(0, os.SEEK_END)
+        size = log_file.tell()
+
+        if size == 0:
+            return 0
+        # end if
+
+        # look at the end of the file for the last line terminator
+        scan_start = max(0, size - recovery_scan_bytes)
+        log_file.seek(scan_start)
+        tail = log_file.read()
+
+        if tail.endswith(b'\n'):
+            # the last line is complete
+            return 0
+        # end if
+
+        last_newline = tail.rfind(b'\n')
+        if (last_newline < 0) and (scan_start > 0):
+            # no line end in the scanned region, leave the file alone
+            return 0
+
+        elif last_newline < 0:
+            # the only line is kept, ended so that rows follow it
+            log_file.write(b'\n')
+            return 0
+        # end if
+
+        new_size = scan_start + last_newline + 1
+        log_file.truncate(new_size)
+    # end with
+
+    return size - new_size
+# end def
@@ -2,25 +2,34 @@
 
 import time
 import platform
+import random
+import array
+import os
+import numpy
 
 WINDOWS_EXECUTION = False
+LINUX_EXECUTION = False
 if (platform.system() == 'Windows'):
     WINDOWS_EXECUTION = True
     import aardvark_py
-    import array
-    
-    # I2C config
-    I2C = True
-    SPI = True
-    GPIO = False
-    Pullups = True
-    radix = 16
-    Bitrate = 100    
-else:
-    print("no valid OS detected")
-    raise
+    
+elif (platform.system() == 'Linux'):
+    LINUX_EXECUTION = True
+    import fcntl
 # endif
 
+# I2C config
+I2C = True
+SPI = True
+GPIO = False
+Pullups = True
+radix = 16
+Bitrate = 100    
+
+# Linux i2c-dev config
+LINUX_I2C_BUS = 1
+I2C_SLAVE = 0x0703 # ioctl to set the slave address
+
 ## Command set
 MS5607_ADDRESS = 0x76 # base address
 MS5607_RESET = 0x1E
@@ -51,6 +60,23 @@ MS5607_OSR_1024_S_DELAY = 0.004
 MS5607_OSR_2048_S_DELAY = 0.006
 MS5607_OSR_4096_S_DELAY = 0.100
 
+# maximum conversion times from the datasheet, used when streaming
+MS5607_CONVERSION_S_DELAY = {256:  0.00060,
+                             512:  0.00117,
+                             1024: 0.00228,
+                             2048: 0.00454,
+                             4096: 0.00904}
+MS5607_OSR_SETTING = {256:  MS5607_OSR_256,
+                      512:  MS5607_OSR_512,
+                      1024: MS5607_OSR_1024,
+                      2048: MS5607_OSR_2048,
+                      4096: MS5607_OSR_4096}
+
+# other delays
+MS5607_RESET_S_DELAY = 0.003
+MS5607_PROM_S_DELAY = 0.1
+MS5607_PROM_TRIALS = 3
+
 DO_2ND_ORDER_COMP = True
 PRINT_DEBUG = False
 
@@ -124,10 +150,215 @@ def configure_aardvark():
     return Aardvark_in_use
 # end def
 
+class AardvarkTransport:
+    # I2C through a Total Phase Aardvark adapter, which also powers the 
+    # sensor from its MISO pin
+    def __init__(self):
+        self.port = None
+    # end def
+    
+    def open(self):
+        if (not WINDOWS_EXECUTION):
+            raise IOError("The Aardvark transport is only supported on Windows")
+        # end if
+        
+        # configure the aardvark adapter
+        self.port = configure_aardvark()
+            
+        if (self.port == None):
+            raise IOError("No Aardvark was found")
+        # end if
+        
+        # power the device
+        aardvark_py.aa_gpio_set(self.port, aardvark_py.AA_GPIO_MISO) 
+        aardvark_py.aa_gpio_direction(self.port, aardvark_py.AA_GPIO_MISO)    
+    # end def
+    
+    def close(self):
+        if self.port != None:
+            aardvark_py.aa_close(self.port)
+        #end if
+        
+        self.port = None
+    # end def
+    
+    def write(self, address, byte_list):
+        out_data = array.array('B', byte_list)  
+        aardvark_py.aa_i2c_write(self.port, address, aardvark_py.AA_I2C_NO_FLAGS, out_data) 
+    # end def
+    
+    def read(self, address, read_length):
+        in_data = array.array('B', [1]*read_length) 
+    
+        # read from the slave device
+        read_data = aardvark_py.aa_i2c_read(self.port, address, aardvark_py.AA_I2C_NO_FLAGS, in_data)   
+        
+        return [i for i in in_data]
+    # end def
+# end class
+
+class LinuxI2CTransport:
+    # I2C through the Linux i2c-dev interface, /dev/i2c-<bus>
+    def __init__(self, bus = LINUX_I2C_BUS):
+        self.bus = bus
+        self.fd = None
+        self.slave_address = None
+    # end def
+    
+    def open(self):
+        if (not LINUX_EXECUTION):
+            raise IOError("The i2c-dev transport is only supported on Linux")
+        # end if
+        
+        self.fd = os.open("/dev/i2c-" + str(self.bus), os.O_RDWR)
+        self.slave_address = None
+    # end def
+    
+    def close(self):
+        if self.fd != None:
+            os.close(self.fd)
+        # end if
+        
+        self.fd = None
+    # end def
+    
+    def _select(self, address):
+        # only change the slave address when it is different
+        if (address != self.slave_address):
+            fcntl.ioctl(self.fd, I2C_SLAVE, address)
+            self.slave_address = address
+        # end if
+    # end def
+    
+    def write(self, address, byte_list):
+        self._select(address)
+        os.write(self.fd, bytes(bytearray(byte_list)))
+    # end def
+    
+    def read(self, address, read_length):
+        self._select(address)
+        return list(bytearray(os.read(self.fd, read_length)))
+    # end def
+# end class
+
+class SimulatedTransport:
+    # in process simulation of an MS5607, by default returning the example 
+    # values from the datasheet (20.00C and 110002Pa)
+    def __init__(self, prom_data = None, uncomp_P = 6465444, 
+                 uncomp_T = 8077636, noise = 0, latency = 0.0):
+        if (prom_data == None):
+            prom_data = [0x0000, 46372, 43981, 29059, 27842, 31553, 28165, 0x0000]
+        # end if
+        
+        # add a valid CRC to the last word
+        self.prom = list(prom_data)
+        self.prom[7] = (self.prom[7] & 0xFFF0) | prom_crc(self.prom)
+        
+        self.uncomp_P = uncomp_P
+        self.uncomp_T = uncomp_T
+        self.noise = noise
+        self.latency = latency
+        self.transactions = 0
+        self.is_open = False
+        
+        self._pointer = None
+        self._conversion = None
+        self._conversion_end = 0
+        self._adc = 0
+    # end def
+    
+    def open(self):
+        self.is_open = True
+    # end def
+    
+    def close(self):
+        self.is_open = False
+    # end def
+    
+    def _transaction(self):
+        self.transactions += 1
+        if (self.latency > 0):
+            time.sleep(self.latency)
+        # end if
+    # end def
+    
+    def write(self, address, byte_list):
+        self._transaction()
+        command = byte_list[0]
+        
+        if (command == MS5607_RESET):
+            self._pointer = None
+            self._conversion = None
+            
+        elif ((command & 0xF0) == MS5607_PROM_READ):
+            self._pointer = command
+            
+        elif (command & 0xF0) in [MS5607_CONVERT_P, MS5607_CONVERT_T]:
+            # start a conversion that takes the datasheet time
+            OSR = 256 << ((command & 0x0F) >> 1)
+            self._conversion = command
+            self._conversion_end = time.time() + MS5607_CONVERSION_S_DELAY[OSR]
+            
+        elif (command == MS5607_ADC_READ):
+            # the result is 0 if the conversion is not complete
+            self._pointer = command
+            self._adc = 0
+            if ((self._conversion != None) and 
+                (time.time() >= self._conversion_end)):
+                if ((self._conversion & 0xF0) == MS5607_CONVERT_P):
+                    self._adc = self.uncomp_P
+                    
+                else:
+                    self._adc = self.uncomp_T
+                # end if
+                
+                self._adc = int(self._adc + random.gauss(0, self.noise))
+            # end if
+            
+            self._conversion = None
+        # end if
+    # end def
+    
+    def read(self, address, read_length):
+        self._transaction()
+        
+        if (self._pointer == MS5607_ADC_READ):
+            return [(self._adc>>16) & 0xFF, (self._adc>>8) & 0xFF, 
+                    self._adc & 0xFF][:read_length]
+        
+        elif (self._pointer != None):
+            word = self.prom[(self._pointer - MS5607_PROM_READ)>>1]
+            return [word>>8, word & 0xFF][:read_length]
+        # end if
+        
+        return [0]*read_length
+    # end def
+# end class
+
 class MS5607:
-    def __init__(self, pin_5 = 0):
-        self.port = 0
+    def __init__(self, pin_5 = 0, transport = None):
+        self.port = None
         self.address = MS5607_ADDRESS
+        
+        # pick the transport for this platform if none was given
+        if (transport != None):
+            self.transport = transport
+            
+        elif (WINDOWS_EXECUTION):
+            self.transport = AardvarkTransport()
+            
+        elif (LINUX_EXECUTION):
+            self.transport = LinuxI2CTransport()
+            
+        else:
+            raise IOError("No I2C transport is available on " + platform.system())
+        # end if
+        
+        # calibration coefficients, read once from the PROM
+        self.prom = None
+        self.prom_valid = False
+        self.coefficients = None
+        
         if (pin_5 == 0):
             self.address += 1
         elif (pin_5 != 1):
@@ -136,18 +367,8 @@ class MS5607:
     # end if
 
     def __enter__(self):
-        if (WINDOWS_EXECUTION):
-            # configure the aardvark adapter
-            self.port = configure_aardvark()
-                
-            if (self.port == None):
-                raise IOError("No Aardvark was found")
-            # end if
-            
-            # power the device
-            aardvark_py.aa_gpio_set(self.port, aardvark_py.AA_GPIO_MISO) 
-            aardvark_py.aa_gpio_direction(self.port, aardvark_py.AA_GPIO_MISO)    
-        # end if
+        self.transport.open()
+        self.port = self.transport
         
         time.sleep(0.1)
         
@@ -158,7 +379,7 @@ class MS5607:
     
     def __exit__(self, type, value, traceback):
         if self.port != None:
-            aardvark_py.aa_close(self.port)
+            self.transport.close()
         #end if
         
         self.port = None
@@ -166,29 +387,74 @@ class MS5607:
     
     def reset(self):
         self.write([MS5607_RESET])
+        
+        # wait for the PROM to reload
+        time.sleep(MS5607_RESET_S_DELAY)
+        
+        # the reset reloads the PROM so refresh the calibration
+        self.load_calibration()
+    # end def
+    
+    def read_prom(self):
+        # read the 8 16 bit PROM words
+        prom_data = []
+        for address in range(8):
+            
+            self.write([MS5607_PROM_READ+(address<<1)])    
+            time.sleep(MS5607_PROM_S_DELAY)
+            in_data = self.read(2)
+            
+            prom_data.append((in_data[0]<<8) + in_data[1])
+        # end for
+        
+        return prom_data
+    # end def
+    
+    def load_calibration(self):
+        # ensure the readings are valid
+        prom_valid = False
+        trial_counter = 0
+        
+        while ((not prom_valid) and (trial_counter < MS5607_PROM_TRIALS)):
+            trial_counter += 1
+            
+            # read prom data
+            prom_data = self.read_prom()
+            
+            # check the crc
+            prom_valid = self.check_crc(prom_data)
+            
+            if (not prom_valid):
+                self.write([MS5607_RESET])
+                time.sleep(0.1)
+                print("Resetting to correct invalid data")
+            # end if
+            
+            if (PRINT_DEBUG):
+                print("CRC check success = " + str(prom_valid))
+                print(prom_data)
+            # end if  
+        # end while
+        
+        # extract the desired values from the PROM
+        self.prom = prom_data
+        self.prom_valid = prom_valid
+        self.coefficients = prom_coefficients(prom_data)
+        
+        return prom_valid
+    # end def
+    
+    def refresh_calibration(self):
+        return self.load_calibration()
     # end def
         
 
     def write(self, byte_list):
-        if (WINDOWS_EXECUTION):
-            out_data = array.array('B', byte_list)  
-            aardvark_py.aa_i2c_write(self.port, self.address, aardvark_py.AA_I2C_NO_FLAGS, out_data) 
-        # end if
+        self.transport.write(self.address, byte_list)
     # end def
 
     def read(self, read_length):
-        
-        return_list = []
-        if (WINDOWS_EXECUTION):  
-            in_data = array.array('B', [1]*read_length) 
-        
-            # read from the slave device
-            read_data = aardvark_py.aa_i2c_read(self.port, self.address, aardvark_py.AA_I2C_NO_FLAGS, in_data)   
-            
-            return_list = [i for i in in_data]
-        # end if
-        
-        return return_list
+        return self.transport.read(self.address, read_length)
     # end def
 
     def sample(self, OSR):
@@ -215,46 +481,12 @@ class MS5607:
             print("Invalid OSR provided, reverting to defaults")
         # end if
         
-        # ensure the readings are valid
-        prom_valid = False
-        trial_counter = 0
-        
-        while ((not prom_valid) and (trial_counter < 3)):
+        # only read the PROM again if the cached copy failed its CRC
+        if (not self.prom_valid):
+            self.load_calibration()
+        # end if
         
-            # read prom data
-            prom_data = []
-            for address in range(8):
-                
-                self.write([MS5607_PROM_READ+(address<<1)])    
-                time.sleep(0.1)
-                in_data = self.read(2)
-                
-                prom_data.append((in_data[0]<<8) + in_data[1])
-            # end for
-            
-            # extract the desired values from the PROM
-            RES = prom_data[0]
-            SENS_T1 = prom_data[1]*(2**16.0)
-            OFF_T1 = prom_data[2]*(2**17.0)
-            TCS = prom_data[3]/(2**7.0)
-            TCO = prom_data[4]/(2**6.0)
-            T_REF = prom_data[5]*(2**8.0)
-            TEMPSENS = prom_data[6]/(2**23.0)
-            
-            # check the crc
-            prom_valid = self.check_crc(prom_data)
-            
-            if (not prom_valid):
-                self.reset()
-                time.sleep(0.1)
-                print("Resetting to correct invalid data")
-            # end if
-            
-            if (PRINT_DEBUG):
-                print("CRC check success = " + str(prom_valid))
-                print(prom_data)
-            # end if  
-        # end while
+        prom_valid = self.prom_valid
         
         ## read temp and pressure
         # start the pressure conversion
@@ -263,12 +495,8 @@ class MS5607:
         # wait for the conversion to happen
         time.sleep(OSR_DELAY)        
     
-        # request ADC data
-        self.write([MS5607_ADC_READ])  
-        
         # read data
-        in_data = self.read(3) 
-        uncomp_P = ((in_data[0]<<16) + (in_data[1]<<8) +(in_data[2]))    
+        uncomp_P = self.read_adc()
     
         # start temperature conversion
         self.write([MS5607_CONVERT_T+ SELECTED_OSR])    
@@ -276,17 +504,22 @@ class MS5607:
         # wait for the conversion to happen
         time.sleep(OSR_DELAY)        
     
-        # request ADC data
-        self.write([MS5607_ADC_READ])  
-        
         # read data
-        in_data = self.read(3) 
-        uncomp_T = ((in_data[0]<<16) + (in_data[1]<<8) + in_data[2])   
+        uncomp_T = self.read_adc()
         
         if (PRINT_DEBUG):
             print("uncomp_P = " + str(uncomp_P) + ", uncomp_T = " + str(uncomp_T))
         # end if
-            
+        
+        comp_T_C, comp_P = self.compensate(uncomp_P, uncomp_T)
+        
+        return comp_T_C, comp_P, prom_valid
+    # end def
+    
+    def compensate(self, uncomp_P, uncomp_T):
+        
+        [SENS_T1, OFF_T1, TCS, TCO, T_REF, TEMPSENS] = self.coefficients
+        
         ## compensation as per the MS5607 datasheet
         # temperature compensation
         dT = uncomp_T - T_REF
@@ -317,45 +550,206 @@ class MS5607:
         SENS = SENS_T1 + TCS*dT - SENS2
         comp_P = (uncomp_P*(SENS/(2**21.0))-OFF)/(2**15.0) # Pa
         
-        return comp_T_C, comp_P, prom_valid
+        return comp_T_C, comp_P
     # end def
     
-    def check_crc(self, data_16_bit):
-        
-        # working variable
-        n_rem = 0
+    def read_adc(self):
+        # request ADC data
+        self.write([MS5607_ADC_READ])  
         
-        # convert 16 bit data into 8 bit data
-        data_8_bit = []
-        for i in data_16_bit:
-            data_8_bit.append(i>>8)
-            data_8_bit.append(i&0x00FF)
-        # end for
+        # read data
+        in_data = self.read(3) 
+        return ((in_data[0]<<16) + (in_data[1]<<8) + in_data[2])
+    # end def
+    
+    def stream(self, OSR, temperature_period = 10, count = None, raw = False):
+        # generator of (time, temperature C, pressure Pa) samples at the 
+        # fastest rate the OSR allows. Temperature is only converted every 
+        # temperature_period pressure samples and each conversion is started
+        # as soon as the previous result is read so that the compensation and
+        # the caller's processing overlap with it.
+        # With raw set the uncompensated (time, D1, D2) values are yielded 
+        # instead, for logging and later use with compensate_batch().
+        
+        if OSR not in MS5607_OSR_SETTING:
+            raise ValueError("Invalid OSR provided: " + str(OSR))
+        # end if
         
-        # extract the CRC code
-        crc_code = data_8_bit[-1]&0x0F
+        if (temperature_period < 1):
+            raise ValueError("Invalid temperature period provided: " + 
+                             str(temperature_period))
+        # end if
         
-        # set the CRC byte to zero
-        data_8_bit[-1] = 0
+        SELECTED_OSR = MS5607_OSR_SETTING[OSR]
+        OSR_DELAY = MS5607_CONVERSION_S_DELAY[OSR]
         
-        for i in data_8_bit:
-            n_rem = n_rem ^ i
+        if (not self.prom_valid):
+            self.load_calibration()
+        # end if
         
-            for i in range(8):
-                if (n_rem & 0x8000):
-                    n_rem = (n_rem<<1) ^ 0x3000
+        # start with a temperature conversion
+        sample_count = 0
+        converting_T = True
+        self.write([MS5607_CONVERT_T + SELECTED_OSR])
+        conversion_start = time.time()
+        
+        while (count is None) or (sample_count < count):
+            # wait for whatever is left of the conversion time
+            remaining = OSR_DELAY - (time.time() - conversion_start)
+            if (remaining > 0):
+                time.sleep(remaining)
+            # end if
+            
+            result = self.read_adc()
+            result_is_T = converting_T
+            
+            if (result_is_T):
+                uncomp_T = result
+                
+            else:
+                uncomp_P = result
+                sample_count += 1
+            # end if
+            
+            # refresh the temperature every temperature_period pressures
+            converting_T = ((not result_is_T) and 
+                            ((sample_count % temperature_period) == 0))
+            
+            # start the next conversion before processing this one
+            if (count is None) or (sample_count < count):
+                if (converting_T):
+                    self.write([MS5607_CONVERT_T + SELECTED_OSR])
+                    
                 else:
-                    n_rem = (n_rem<<1)
+                    self.write([MS5607_CONVERT_P + SELECTED_OSR])
                 # end if
-            # end for
-        # end for
+                
+                conversion_start = time.time()
+            # end if
+            
+            if (result_is_T):
+                pass
+            
+            elif (raw):
+                yield time.time(), uncomp_P, uncomp_T
+                
+            else:
+                comp_T_C, comp_P = self.compensate(uncomp_P, uncomp_T)
+                yield time.time(), comp_T_C, comp_P
+            # end if
+        # end while
+    # end def
+    
+    def check_crc(self, data_16_bit):
         
-        # return the appropriate 4 bits
-        crc_calc = ((n_rem>>12) & 0x000F) 
-        return crc_calc == crc_code
+        # extract the CRC code
+        crc_code = data_16_bit[-1]&0x0F
+        
+        return prom_crc(data_16_bit) == crc_code
     # end def
 # end class
 
+def prom_crc(data_16_bit):
+    # calculate the 4 bit CRC of the 8 PROM words
+    
+    # working variable
+    n_rem = 0
+    
+    # convert 16 bit data into 8 bit data
+    data_8_bit = []
+    for i in data_16_bit:
+        data_8_bit.append(i>>8)
+        data_8_bit.append(i&0x00FF)
+    # end for
+    
+    # set the CRC byte to zero
+    data_8_bit[-1] = 0
+    
+    for i in data_8_bit:
+        n_rem = n_rem ^ i
+    
+        for i in range(8):
+            if (n_rem & 0x8000):
+                n_rem = (n_rem<<1) ^ 0x3000
+            else:
+                n_rem = (n_rem<<1)
+            # end if
+        # end for
+    # end for
+    
+    # return the appropriate 4 bits
+    return ((n_rem>>12) & 0x000F) 
+# end def
+
+def prom_coefficients(prom_data):
+    # the scaled calibration coefficients from the 8 PROM words
+    return (prom_data[1]*(2**16.0),  # SENS_T1
+            prom_data[2]*(2**17.0),  # OFF_T1
+            prom_data[3]/(2**7.0),   # TCS
+            prom_data[4]/(2**6.0),   # TCO
+            prom_data[5]*(2**8.0),   # T_REF
+            prom_data[6]/(2**23.0))  # TEMPSENS
+# end def
+
+def compensate_batch(prom_data, uncomp_P, uncomp_T):
+    # vectorised version of MS5607.compensate for arrays of raw D1 (pressure)
+    # and D2 (temperature) values, returns arrays of temperature in C and 
+    # pressure in Pa
+    [SENS_T1, OFF_T1, TCS, TCO, T_REF, TEMPSENS] = prom_coefficients(prom_data)
+    
+    D1 = numpy.asarray(uncomp_P, dtype = numpy.float64)
+    D2 = numpy.asarray(uncomp_T, dtype = numpy.float64)
+    
+    # temperature compensation
+    dT = D2 - T_REF
+    TEMP = 2000 + dT*TEMPSENS
+    
+    # second order compensation
+    T2 = numpy.zeros_like(TEMP)
+    OFF2 = numpy.zeros_like(TEMP)
+    SENS2 = numpy.zeros_like(TEMP)
+    if (DO_2ND_ORDER_COMP):
+        # low temperature
+        low = TEMP < 2000
+        T2[low] = (dT[low]**2.0)/(2**31.0)
+        OFF2[low] = 61*((TEMP[low]-2000)**2.0)/(2**4.0)
+        SENS2[low] = 2*((TEMP[low]-2000)**2.0)
+        
+        # very low temperature
+        very_low = TEMP < -1500
+        OFF2[very_low] += 15*((TEMP[very_low]+1500)**2.0)
+        SENS2[very_low] += 8*((TEMP[very_low]+1500)**2.0)
+    # end if
+    
+    comp_T_C = (TEMP - T2)/100.0
+    
+    # pressure compensation
+    OFF = OFF_T1 + TCO*dT - OFF2
+    SENS = SENS_T1 + TCS*dT - SENS2
+    comp_P = (D1*(SENS/(2**21.0))-OFF)/(2**15.0) # Pa
+    
+    return comp_T_C, comp_P
+# end def
+
+def save_raw_log(filename, prom_data, times, uncomp_P, uncomp_T):
+    # save raw samples with the PROM they must be compensated with
+    numpy.savez(filename, 
+                prom = numpy.asarray(prom_data, dtype = numpy.uint16),
+                time = numpy.asarray(times, dtype = numpy.float64),
+                D1 = numpy.asarray(uncomp_P, dtype = numpy.uint32),
+                D2 = numpy.asarray(uncomp_T, dtype = numpy.uint32))
+# end def
+
+def compensate_raw_log(filename):
+    # load a log saved by save_raw_log and return arrays of time, 
+    # temperature in C and pressure in Pa
+    log = numpy.load(filename)
+    comp_T_C, comp_P = compensate_batch(log['prom'].tolist(), log['D1'], 
+                                        log['D2'])
+    
+    return log['time'], comp_T_C, comp_P
+# end def
+
 def test():
     
     global PRINT_DEBUG
@@ -0,0 +1,429 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Measurement_Sources.py
+Module to provide the sources a logger can measure a cell with, behind one
+interface that answers for named channels. The driver of a source is only
+imported when that source is created.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import collections
+import importlib
+import sys
+import time
+
+# ---------
+# Constants
+
+# a quantity a source can measure
+#   name      the name the channel is asked for by
+#   heading   the column heading the channel is logged under
+#   unit      the unit of the value, None for flags
+#   logged    whether the channel is written to every row of a log
+Channel = collections.namedtuple('Channel', ['name', 'heading', 'unit',
+                                             'logged'])
+
+# where process_SCPI is checked out, relative to the working directory
+process_SCPI_path = '../process/src'
+
+# the sources that can be created, by name
+sources = {}
+
+#
+# ---------
+# Classes
+
+class MeasurementSource(object):
+    """
+    Base class of a measurement source. Each update takes a snapshot of the
+    channels, which every request for a channel is answered from until the
+    next update, so that the values in a row are coherent and cost one read
+    of the device.
+
+    Subclasses set the class attributes and provide open_device and read.
+
+    @attribute name       (string)  The name the source is registered under
+    @attribute driver     (string)  The module imported to talk to the device
+    @attribute channels   (list)    The Channels the source provides
+    @attribute max_rate   (float)   The fastest the source can be updated (Hz)
+    @attribute device     (object)  The driver object for the device
+    @attribute snapshot   (dict)    The values of the channels by name
+    """
+    name = None
+    driver = None
+    driver_path = None
+    channels = []
+    max_rate = 1.0
+
+    def __init__(self):
+        """
+        Initialise the MeasurementSource Object, loading its driver
+        """
+        if self.driver_path is not None and self.driver_path not in sys.path:
+            sys.path.insert(1, self.driver_path)
+        # end if
+
+        self.device = self.open_device(importlib.import_module(self.driver))
+        self.snapshot = None
+        self.snapshot_time = None
+
+        self._channels = dict([(channel.name, channel)
+                               for channel in self.channels])
+    # end def
+
+    def __enter__(self):
+        """
+        For use with the 'with' operator
+        """
+        self.device.open()
+        return self
+    # end def
+
+    def __exit__(self, type, value, traceback):
+        """
+        Closes the device
+
+        For use with the 'with' operator
+        """
+        self.device.close()
+    # end def
+
+    def open_device(self, driver):
+        """
+        Create the driver object for the device
+
+        @param[in]  driver     The driver module (module)
+        @return     (object)   The driver object, which provides open and
+                               close
+        """
+        raise NotImplementedError
+    # end def
+
+    def read(self):
+        """
+        Read the device
+
+        @return     (dict)     The values of the channels read, by name
+        """
+        raise NotImplementedError
+    # end def
+
+    def read_channel(self, name):
+        """
+        Read a channel that was not part of the last snapshot
+
+        @param[in]  name       The name of the channel (string)
+        @return     The value of the channel
+        """
+        raise KeyError(name)
+    # end def
+
+    def logged_channels(self):
+        """
+        @return   (list)   The Channels written to every row of a log
+        """
+        return [channel for channel in self.channels if channel.logged]
+    # end def
+
+    def min_period(self):
+        """
+        @return   (float)   The shortest time between updates in seconds
+        """
+        return 1.0/self.max_rate
+    # end def
+
+    def update(self):
+        """
+        Take a new snapshot of the channels
+        """
+        self.snapshot_time = time.time()
+        self.snapshot = self.read()
+    # end def
+
+    def get(self, name, refresh = False):
+        """
+        Get the value of a channel from the current snapshot
+
+        @param[in]  name      The name of the channel (string)
+        @param[in]  refresh   Take a new snapshot first (bool)
+        @return     The value of the channel
+        """
+        if name not in self._channels:
+            raise ValueError('The ' + str(self.name) + ' source has no ' +
+                             str(name) + ' channel')
+        # end if
+
+        if refresh or (self.snapshot is None):
+            self.update()
+        # end if
+
+        if name not in self.snapshot:
+            self.snapshot[name] = self.read_channel(name)
+        # end if
+
+        return self.snapshot[name]
+    # end def
+# end class
+
+
+class BM2Source(MeasurementSource):
+    """
+    Class that measures a pack through the SMBus of a BM2 on an Aardvark
+    """
+    name = 'BM2'
+    driver = 'BM2_aardvark'
+    channels = [Channel('voltage',       'Voltage', 'V',  True),
+                Channel('current',       'Current', 'A',  True),
+                Channel('fully_charged', None,      None, False),
+                Channel('discharged',    None,      None, False)]
+    max_rate = 2.0
+
+    def __init__(self, backend = None, **settings):
+        """
+        Initialise the BM2Source Object
+
+        @param[in] backend    Object used in place of the Aardvark, e.g. a
+                              Battery_Sim.SimSMBus (object)
+        @param[in] settings   Settings for other sources, which are ignored
+        """
+        self.backend = backend
+
+        MeasurementSource.__init__(self)
+    # end def
+
+    def open_device(self, driver):
+        return driver.BM2(backend = self.backend)
+    # end def
+
+    def read(self):
+        while not self.device.update_data():
+            print "BM2 data collection was bad"
+            time.sleep(0.05)
+        # end while
+
+        return {'voltage': self.device.Data.Voltage/1000.0,
+                'current': self.device.Data.Current/1000.0,
+                'fully_charged': (self.device.Data.BatteryStatus &
+                                  int('0020',16)) != 0,
+                'discharged': self.device.get_CUV()}
+    # end def
+# end class
+
+
+class I2CSource(MeasurementSource):
+    """
+    Class that measures a pack through the telemetry of a BM2 SupMCU
+    """
+    name = 'I2C'
+    driver = 'process_SCPI'
+    driver_path = process_SCPI_path
+    channels = [Channel('voltage',             'Voltage',             'V',   True),
+                Channel('current',             'Current',             'A',   True),
+                Channel('internal_resistance', 'Internal Resistance', 'Ohm', True),
+                Channel('smoothed_voltage',    'Compensated Voltage', 'V',   True),
+                Channel('approximate_SOC',     'Approximate SOC',     '%',   True),
+                Channel('relative_SOC',        'Relative SOC',        '%',   True),
+                Channel('absolute_SOC',        'Absolute SOC',        '%',   True),
+                Channel('fully_charged',       None,                  None,  False),
+                Channel('discharged',          None,                  None,  False)]
+    max_rate = 1.0
+
+    # the BM2 telemetry read for each channel: the SCPI command, the data
+    # format, and the scale to divide by or the flag to test
+    telemetry = {'voltage':             ("BM2:TEL? 9,data",  "uint", 1000.0,  None),
+                 'current':             ("BM2:TEL? 10,data", "int",  1000.0,  None),
+                 'internal_resistance': ("BM2:TEL? 37,data", "uint", 10000.0, None),
+                 'smoothed_voltage':    ("BM2:TEL? 38,data", "uint", 1000.0,  None),
+                 'approximate_SOC':     ("BM2:TEL? 36,data", "char", None,    None),
+                 'relative_SOC':        ("BM2:TEL? 13,data", "char", None,    None),
+                 'absolute_SOC':        ("BM2:TEL? 14,data", "char", None,    None),
+                 'fully_charged':       ("BM2:TEL? 22,data", "uint", None,    0x0020),
+                 'discharged':          ("BM2:TEL? 80,data", "uint", None,    0x0080)}
+
+    # I2C address of the BM2 SupMCU
+    address = "0x5C"
+
+    def __init__(self, **settings):
+        """
+        Initialise the I2CSource Object
+
+        @param[in] settings   Settings for other sources, which are ignored
+        """
+        MeasurementSource.__init__(self)
+    # end def
+
+    def open_device(self, driver):
+        return driver.aardvark()
+    # end def
+
+    def read(self):
+        # each logged channel is its own SCPI transaction, anything else is
+        # read as it is first asked for
+        return dict([(channel.name, self.read_channel(channel.name))
+                     for channel in self.logged_channels()])
+    # end def
+
+    def read_channel(self, name):
+        command, data_format, scale, flag = self.telemetry[name]
+        value = self.device.read_SCPI(command, self.address, data_format)
+
+        if scale is not None:
+            value = value/scale
+
+        elif flag is not None:
+            value = (value & flag) != 0
+        # end if
+
+        return value
+    # end def
+# end class
+
+
+class DMMSource(MeasurementSource):
+    """
+    Class that measures a cell with the two displays of a multimeter, one
+    showing the voltage and the other the current
+
+    @attribute current_display  (string)  The display showing the current,
+                                          'primary' or 'secondary'
+    @attribute invert_current   (bool)    The current is measured negative
+                                          while charging
+    @attribute taper_current    (float)   The charge current below which
+                                          the cell is fully charged (A)
+    @attribute min_voltage      (float)   The voltage below which the cell is
+                                          discharged (V)
+    """
+    name = 'DMM'
+    driver = 'Multimeter'
+    channels = [Channel('voltage',       'Voltage', 'V',  True),
+                Channel('current',       'Current', 'A',  True),
+                Channel('fully_charged', None,      None, False),
+                Channel('discharged',    None,      None, False)]
+    max_rate = 5.0
+
+    def __init__(self, model = 'DM3058E', current_display = 'primary',
+                 invert_current = False, taper_current = 0.05,
+                 min_voltage = 2.5, backend = None, **settings):
+        """
+        Initialise the DMMSource Object
+
+        @param[in] model             The multimeter model (string)
+        @param[in] current_display   The display showing the current,
+                                     'primary' or 'secondary' (string)
+        @param[in] invert_current    The current is negative while charging
+                                     (bool)
+        @param[in] taper_current     The fully charged current (float)
+        @param[in] min_voltage       The discharged voltage (float)
+        @param[in] backend           Object used in place of the instrument,
+                                     e.g. a Multimeter_Sim.SimulatedDMM
+        @param[in] settings          Settings for other sources, which are
+                                     ignored
+        """
+        if current_display not in ('primary', 'secondary'):
+            raise ValueError('The current display must be primary or '
+                             'secondary')
+        # end if
+
+        self.model = model
+        self.current_display = current_display
+        self.invert_current = invert_current
+        self.taper_current = taper_current
+        self.min_voltage = min_voltage
+        self.backend = backend
+
+        # the displays are set up by the first reading of each
+        self.configured = False
+
+        MeasurementSource.__init__(self)
+    # end def
+
+    def open_device(self, driver):
+        return driver.Multimeter(self.model, backend = self.backend)
+    # end def
+
+    def read(self):
+        current_secondary = (self.current_display == 'secondary')
+
+        if not self.configured:
+            # set up the function on each display
+            current = self.device.get_DC_current(secondary = current_secondary)
+            voltage = self.device.get_DC_voltage(
+                secondary = not current_secondary)
+            self.configured = True
+
+        else:
+            # read both displays in one query
+            pair = self.device.measure_pair()
+
+            if current_secondary:
+                voltage, current = pair.primary, pair.secondary
+
+            else:
+                current, voltage = pair.primary, pair.secondary
+            # end if
+        # end if
+
+        charge_current = -current if self.invert_current else current
+
+        return {'voltage': voltage,
+                'current': current,
+                'fully_charged': charge_current < self.taper_current,
+                'discharged': voltage < self.min_voltage}
+    # end def
+# end class
+
+
+#
+# ----------------
+# Public Functions
+
+def register(source_class):
+    """
+    Make a measurement source available to create
+
+    @param[in]  source_class   The MeasurementSource subclass (class)
+    @return     (class)        The class, so this can be used as a decorator
+    """
+    sources[source_class.name] = source_class
+    return source_class
+# end def
+
+
+def create(name, **settings):
+    """
+    Create a measurement source, importing its driver
+
+    @param[in]  name       The name the source is registered under (string)
+    @param[in]  settings   Settings passed to the source, those it does not
+                           use are ignored
+    @return     (MeasurementSource)   The source
+    """
+    if name not in sources:
+        raise ValueError('Unknown measurement source ' + str(name) +
+                         ', the sources are ' + ', '.join(sorted(sources)))
+    # end if
+
+    return sources[name](**settings)
+# end def
+
+
+register(BM2Source)
+register(I2CSource)
+register(DMMSource)
@@ -25,9 +25,25 @@ __version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
 
 import Tkinter as TK
 import sys
-import ivi
+import collections
+import math
 import time
-import visa
+import numpy
+
+import Scheduler
+
+# the instrument drivers are only needed when talking to real hardware
+try:
+    import ivi
+except ImportError:
+    ivi = None
+# end try
+
+try:
+    import visa
+except ImportError:
+    visa = None
+# end try
 
 # Constants for Agilent 34410A Digital Multimeter
 Agilent34410AIPAddress = "192.168.1.124"
@@ -35,11 +51,19 @@ AgilentDCVoltsMode = "dc_volts"
 AgilentDCCurrentMode = "dc_current"
 AgilentTwoWireReistanceMode = "two_wire_resistance"
 
+AgilentBurstMaxCount = 50000 # size of the reading memory
+AgilentBurstFunctions = {'dc_volts': 'VOLTage:DC', 'dc_current': 'CURRent:DC'}
+
 # Constants for the Rigol DM3058E Digital Multimeter
 RigolDM3058Especifier = '0x09C4::DM3R185250778'
+RigolBurstFunctions = {'dc_volts': 'VOLTage:DC', 'dc_current': 'CURRent:DC'}
+RigolRateNPLC = {'F': 0.02, 'M': 1.0, 'S': 10.0} # integration time of each reading rate
 # ---------
 # Classes
 
+# a primary and secondary display reading taken in the same query
+DMM_Pair = collections.namedtuple('DMM_Pair', ['time', 'primary', 'secondary'])
+
 class Multimeter(object):
     """
     Class to serve as an abstraction layer between the program and the multimeter 
@@ -49,33 +73,47 @@ class Multimeter(object):
     @attribute model    (string)     The model of the multimeter in use
     @attribute port     (string)     The port used by the multimeter
     @attribute MM       (object)     The multimeter object
+    @attribute backend  (object)     Port object to use in place of the 
+                                     hardware, e.g. a 
+                                     Multimeter_Sim.SimulatedDMM
     """    
 
-    def __init__(self, Model):
+    def __init__(self, Model, backend = None):
         """
         Initialise the PowerSupply Object
     
         @param[in] Model     The model of the power supply selected (string)
+        @param[in] backend   Port object to use instead of connecting to the
+                             hardware (object)
         """       
         
         # Initialise attributes
         self.model = Model
         self.port = None
         self.rm = None
+        self.backend = backend
         
         # check to see if the model requested is selected
-        if self.model == '34410A':
-            # TODO
+        if self.model not in ['34410A', 'DM3058E']:
+            # The requested multimeter is not supported
+            raise ValueError('The Multimeter model selected is not supported'+
+                             'by this Module')
+        
+        elif self.backend is not None:
+            # no hardware to initialise
             pass
         
+        elif self.model == '34410A':
+            if ivi is None:
+                raise ImportError('python-ivi is required to use the 34410A')
+            # end if
+        
         elif self.model == 'DM3058E':
+            if visa is None:
+                raise ImportError('pyvisa is required to use the DM3058E')
+            # end if
+            
             self.rm = visa.ResourceManager()
-            pass
-        
-        else:
-            # The requested multimeter is not supported
-            raise ValueError('The Multimeter model selected is not supported'+
-                             'by this Module')
         # end if        
     #end def
     
@@ -90,7 +128,15 @@ class Multimeter(object):
         # check to see if a multimeter has been detected previously
         if self.port is None:
             # it has not so attempt to detect one based on the model requested
-            if self.model == '34410A':
+            if self.backend is not None:
+                # use the backend in place of the hardware
+                self.port = self.backend
+                
+                if self.model == 'DM3058E':
+                    self.port.write(":FUNCtion2:VOLTage:DC")
+                # end if
+            
+            elif self.model == '34410A':
                 # connect to the 34410A
                 # find the port associated with the 34410A multimeter
                 dmm_ip = "TCPIP0::{}::INSTR".format(Agilent34410AIPAddress)
@@ -134,7 +180,15 @@ class Multimeter(object):
         # check to see if a multimeter has been detected previously
         if self.port is None:
             # it has not so attempt to detect one based on the model requested
-            if self.model == '34410A':
+            if self.backend is not None:
+                # use the backend in place of the hardware
+                self.port = self.backend
+                
+                if self.model == 'DM3058E':
+                    self.port.write(":FUNCtion2:VOLTage:DC")
+                # end if
+            
+            elif self.model == '34410A':
                 # connect to the 34410A
                 # find the port associated with the 34410A multimeter
                 dmm_ip = "TCPIP0::{}::INSTR".format(Agilent34410AIPAddress)
@@ -305,6 +359,164 @@ class Multimeter(object):
     # end def     
     
     
+    def measure_pair(self):
+        """ 
+        Retrieve the primary and secondary readings from the Multimeter in a
+        single query so that both values describe the same instant.
+        
+        The functions shown on each display are not changed, so configure 
+        them first (e.g. current on the primary and voltage on the secondary).
+        
+        @return   (DMM_Pair)   The time of the query, the primary reading and
+                               the secondary reading
+        """
+        if self.model == '34410A':
+            query = "READ?;:DATA2?"
+            
+        elif self.model == 'DM3058E':
+            query = ":FUNCtion2:VALUe1?;:FUNCtion2:VALUe2?"
+        
+        else:
+            return DMM_Pair(time.time(), 0, 0)
+        # end if
+        
+        try:
+            if self.model == '34410A':
+                response = self.port._ask(query)
+                
+            else:
+                response = self.port.query(query)
+            # end if
+            
+            # timestamp the pair once the response has arrived
+            sample_time = time.time()
+            
+            values = response.replace(',', ';').split(';')
+            return DMM_Pair(sample_time, float(values[0]), float(values[1]))
+            
+        except:
+            print("Failed to get paired readings, is the DMM still on and connected?")
+            raise
+        # end try
+    # end def
+    
+    
+    def get_burst(self, function = 'dc_current', count = 1000, 
+                  interval = 0.001, nplc = 0.02):
+        """ 
+        Capture a burst of readings into the reading memory of the multimeter
+        and transfer them all in a single block.
+        
+        On the 34410A the samples are paced by the instrument's sample timer
+        and fetched as a REAL,64 binary block. The DM3058E has no timed 
+        reading memory so each reading is queried at deadlines an interval 
+        apart and timestamped when it arrives, at the reading rate nearest 
+        to nplc. An interval shorter than a query takes gives readings as 
+        fast as the meter answers.
+        
+        @param[in] function  The measurement function, 'dc_volts' or 
+                             'dc_current' (string)
+        @param[in] count     The number of readings to take (int)
+        @param[in] interval  The sample interval in seconds (float)
+        @param[in] nplc      The integration time in power line cycles (float)
+        @return   (numpy array, numpy array)   The sample times in seconds 
+                                               relative to the first sample 
+                                               and the readings
+        """
+        if self.model == '34410A':
+            if function not in AgilentBurstFunctions:
+                raise ValueError(function + ' is not a supported burst function')
+            # end if
+            
+            if (count < 1) or (count > AgilentBurstMaxCount):
+                raise ValueError('Burst count must be between 1 and ' + 
+                                 str(AgilentBurstMaxCount))
+            # end if
+            
+            scpi_function = AgilentBurstFunctions[function]
+            
+            try:
+                # configure the measurement and the sample timer
+                self.port._write("CONFigure:" + scpi_function + " AUTO")
+                self.port._write(scpi_function + ":NPLCycles " + str(nplc))
+                self.port._write(scpi_function + ":ZERO:AUTO OFF")
+                self.port._write("TRIGger:SOURce IMMediate")
+                self.port._write("TRIGger:COUNt 1")
+                self.port._write("SAMPle:SOURce TIMer")
+                self.port._write("SAMPle:TIMer " + str(interval))
+                self.port._write("SAMPle:COUNt " + str(count))
+                self.port._write("FORMat:DATA REAL,64")
+                
+                # take the burst and wait for it to complete
+                self.port._write("INITiate")
+                self.port._ask("*OPC?")
+                
+                # transfer the reading memory in one block
+                self.port._write("FETCh?")
+                readings = _parse_binary_block(self.port._read_raw(), '>f8')
+                
+                # restore single immediate readings and ascii transfers for 
+                # get_DC_voltage and get_DC_current
+                self.port._write("SAMPle:COUNt 1")
+                self.port._write("SAMPle:SOURce IMMediate")
+                self.port._write("FORMat:DATA ASCii")
+            except:
+                print("Failed to get burst readings, is the DMM still on and connected?")
+                raise
+            # end try
+            
+            # the sample timer paces the readings on the instrument
+            times = numpy.arange(len(readings))*float(interval)
+            
+            return times, readings
+            
+        elif self.model == 'DM3058E':
+            if function not in RigolBurstFunctions:
+                raise ValueError(function + ' is not a supported burst function')
+            # end if
+            
+            if count < 1:
+                raise ValueError('Burst count must be at least 1')
+            # end if
+            
+            # the reading rate with the integration time nearest to nplc
+            rate = min(RigolRateNPLC, key = lambda rate: 
+                       abs(math.log(RigolRateNPLC[rate]/float(nplc))))
+            
+            # preallocate the output
+            times = numpy.zeros(count)
+            readings = numpy.zeros(count)
+            
+            scheduler = Scheduler.PeriodicScheduler(interval)
+            
+            try:
+                self.port.write(":FUNCtion:" + RigolBurstFunctions[function])
+                self.port.write(":RATE:" + RigolBurstFunctions[function] + 
+                                " " + rate)
+                
+                scheduler.start()
+                for i in range(count):
+                    readings[i] = float(self.port.query(":FUNCtion2:VALUe1?"))
+                    
+                    # timestamp the reading once it has arrived
+                    times[i] = scheduler.elapsed()
+                    
+                    if i < count - 1:
+                        scheduler.wait()
+                    # end if
+                # end for
+            except:
+                print("Failed to get burst readings, is the DMM still on and connected?")
+                raise
+            # end try
+            
+            return times - times[0], readings
+        # end if
+        
+        return numpy.zeros(0), numpy.zeros(0)
+    # end def
+    
+    
     def __exit__(self, type, value, traceback):
         """
         Exit the with statement and close all ports associuated with the 
@@ -316,7 +528,7 @@ class Multimeter(object):
                 self.port.close()
                 self.port = None
                 
-            elif self.port == 'DM3058E':
+            elif self.model == 'DM3058E':
                 self.port.close()
                 self.port = None
             #end if
@@ -333,7 +545,7 @@ class Multimeter(object):
                 self.port.close()
                 self.port = None
                 
-            elif self.port == 'DM3058E':
+            elif self.model == 'DM3058E':
                 self.port.close()
                 self.port = None
             #end if
@@ -345,6 +557,29 @@ class Multimeter(object):
 # ----------------
 # Private Functions
             
+def _parse_binary_block(raw, dtype):
+    """
+    Extract the values from an IEEE 488.2 definite length binary block
+    
+    @param[in]  raw      The raw bytes read from the instrument (string)
+    @param[in]  dtype    The numpy type of the values in the block (string)
+    @return     (numpy array)   The values held in the block
+    """
+    # find the start of the block
+    start = raw.find(b'#')
+    if start < 0:
+        raise ValueError('No binary block was found in the response')
+    # end if
+    
+    # the digit after the '#' gives the length of the byte count
+    length_digits = int(raw[start + 1:start + 2])
+    byte_count = int(raw[start + 2:start + 2 + length_digits])
+    data_start = start + 2 + length_digits
+    
+    return numpy.frombuffer(raw[data_start:data_start + byte_count], 
+                            dtype = dtype)
+# end def
+
 def serial_ports():
     """ Lists serial port names
 
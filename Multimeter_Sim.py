@@ -0,0 +1,537 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Multimeter_Sim.py
+Module to simulate the multimeters supported by Multimeter.py so that code
+using them can be run and profiled without the bench equipment.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import random
+import struct
+import time
+
+# ---------
+# Constants
+
+# identification strings returned by *IDN?
+sim_identity = {'34410A':  'Agilent Technologies,34410A,SIM0000000,2.35-2.35-0.09-46-09',
+                'DM3058E': 'Rigol Technologies,DM3058E,DM3R185250778,01.01.00.01.08.00'}
+
+# the short names of the measurement functions as reported by :FUNCtion?
+sim_functions = {'VOLTAGE:DC': 'DCV',
+                 'CURRENT:DC': 'DCI',
+                 'RESISTANCE': '2WR'}
+
+# the ivi measurement_function names for each function
+sim_ivi_functions = {'dc_volts':            'VOLTAGE:DC',
+                     'dc_current':          'CURRENT:DC',
+                     'two_wire_resistance': 'RESISTANCE'}
+
+# size of the reading memory
+sim_memory_size = 50000
+
+#
+# ---------
+# Classes
+
+class SimulatedDMM(object):
+    """
+    Class that behaves as the port object of a multimeter. It provides the
+    pyvisa resource interface used for the DM3058E as well as the ivi driver
+    interface used for the 34410A, and answers a subset of the SCPI grammar
+    of both meters.
+
+    @attribute model        (string)    The model being simulated
+    @attribute latency      (float)     Seconds added to every transaction
+    @attribute noise        (float)     Standard deviation of the gaussian
+                                        noise added to every reading
+    @attribute sources      (dict)      Functions of time giving the true
+                                        value of each measurement function
+    @attribute realtime     (bool)      Whether bursts take as long as they
+                                        would on the meter
+    @attribute transactions (int)       The number of reads and writes made
+    @attribute measurement  (object)    The ivi measurement sub-object
+    """
+
+    def __init__(self, model, latency = 0.0, noise = 0.0, voltage = 4.0,
+                 current = 0.5, resistance = 10000.0, realtime = False):
+        """
+        Initialise the simulated multimeter
+
+        @param[in] model       The model to simulate (string)
+        @param[in] latency     Seconds to add to each transaction (float)
+        @param[in] noise       Standard deviation of the reading noise (float)
+        @param[in] voltage     Constant value or function of time giving the
+                               voltage in volts
+        @param[in] current     Constant value or function of time giving the
+                               current in amps
+        @param[in] resistance  Constant value or function of time giving the
+                               resistance in ohms
+        @param[in] realtime    Make bursts take the time they would on the
+                               meter (bool)
+        """
+        if model not in sim_identity:
+            raise ValueError('The Multimeter model selected is not supported'+
+                             'by the simulator')
+        # end if
+
+        self.model = model
+        self.latency = latency
+        self.noise = noise
+        self.realtime = realtime
+        self.sources = {'VOLTAGE:DC': _as_source(voltage),
+                        'CURRENT:DC': _as_source(current),
+                        'RESISTANCE': _as_source(resistance)}
+        self.transactions = 0
+        self.measurement = _SimulatedMeasurement(self)
+
+        self._output = []
+        self.reset()
+    # end def
+
+    def reset(self):
+        """
+        Return the simulated meter to its power on state
+        """
+        self.function = 'VOLTAGE:DC'
+        self.function2 = 'VOLTAGE:DC'
+        self.trigger_count = 1
+        self.sample_count = 1
+        self.sample_source = 'IMMEDIATE'
+        self.sample_timer = 0.001
+        self.nplc = 10.0
+        self.binary_format = False
+        self.memory = []
+        self._output = []
+    # end def
+
+    def value(self, function):
+        """
+        Generate a noisy reading of a measurement function at this instant
+
+        @param[in]  function   The long SCPI name of the function (string)
+        @return     (float)    The reading
+        """
+        return self.sources[function](time.time()) + random.gauss(0, self.noise)
+    # end def
+
+    # pyvisa resource interface
+
+    def write(self, command):
+        """
+        Write a command string, which may hold several ';' separated commands
+
+        @param[in]  command    The command to write (string)
+        """
+        self._transaction()
+
+        responses = []
+        header_path = ''
+        for part in command.strip().split(';'):
+            part = part.strip()
+            if part == '':
+                continue
+            # end if
+
+            # a command without a leading ':' is relative to the previous one
+            if not (part.startswith(':') or part.startswith('*')) and header_path:
+                part = header_path + part
+            # end if
+
+            response = self._execute(part)
+            if response is not None:
+                responses.append(response)
+            # end if
+
+            header = part.split()[0].lstrip(':')
+            header_path = ':'.join(header.split(':')[:-1])
+            if header_path:
+                header_path = ':' + header_path + ':'
+            # end if
+        # end for
+
+        if len(responses) > 0:
+            responses = [r if isinstance(r, bytes) else r.encode('latin-1')
+                         for r in responses]
+            self._output.append(b';'.join(responses))
+        # end if
+    # end def
+
+    def read(self):
+        """
+        Read the next response as a string
+
+        @return   (string)   the response including the '\\n' terminator
+        """
+        return self.read_raw().decode('latin-1')
+    # end def
+
+    def read_raw(self):
+        """
+        Read the next response as bytes
+
+        @return   (bytes)   the response including the '\\n' terminator
+        """
+        self._transaction()
+
+        if len(self._output) == 0:
+            raise IOError('Query UNTERMINATED, no response is available')
+        # end if
+
+        return self._output.pop(0) + b'\n'
+    # end def
+
+    def query(self, command):
+        """
+        Write a command and read back the response
+
+        @param[in]  command   The query to send (string)
+        @return     (string)  The response including the '\\n' terminator
+        """
+        self.write(command)
+        return self.read_raw().decode('latin-1')
+    # end def
+
+    def close(self):
+        """
+        Close the simulated connection
+        """
+        self._output = []
+    # end def
+
+    # ivi driver interface
+
+    def _write(self, command):
+        self.write(command)
+    # end def
+
+    def _read_raw(self):
+        return self.read_raw()
+    # end def
+
+    def _ask(self, command):
+        return self.query(command).strip()
+    # end def
+
+    def _get_measurement_function(self):
+        for name, function in sim_ivi_functions.items():
+            if function == self.function:
+                return name
+            # end if
+        # end for
+    # end def
+
+    def _set_measurement_function(self, name):
+        self.function = sim_ivi_functions[name]
+    # end def
+
+    measurement_function = property(_get_measurement_function,
+                                    _set_measurement_function)
+
+    # SCPI grammar
+
+    def _transaction(self):
+        """
+        Account for a single transaction with the meter
+        """
+        self.transactions += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        # end if
+    # end def
+
+    def _execute(self, command):
+        """
+        Execute a single SCPI command
+
+        @param[in]  command   The command with any arguments (string)
+        @return     (string)  The response if the command is a query,
+                              otherwise None
+        """
+        parts = command.split(None, 1)
+        header = parts[0]
+        argument = parts[1].strip() if len(parts) > 1 else ''
+
+        if _scpi_match(header, '*IDN?'):
+            return sim_identity[self.model]
+
+        elif _scpi_match(header, '*RST'):
+            self.reset()
+
+        elif _scpi_match(header, '*CLS'):
+            pass
+
+        elif _scpi_match(header, '*OPC?'):
+            return '1'
+
+        elif _scpi_match(header, 'FUNCtion?'):
+            return sim_functions[self.function]
+
+        elif _scpi_match(header, 'FUNCtion2?'):
+            return sim_functions[self.function2]
+
+        elif _scpi_match(header, 'FUNCtion2:VALUe1?'):
+            return _format_reading(self.value(self.function))
+
+        elif _scpi_match(header, 'FUNCtion2:VALUe2?'):
+            return _format_reading(self.value(self.function2))
+
+        elif _scpi_match(header, 'FUNCtion2:OFF'):
+            pass
+
+        elif self._match_function(header, 'FUNCtion:') is not None:
+            self.function = self._match_function(header, 'FUNCtion:')
+
+        elif self._match_function(header, 'FUNCtion2:') is not None:
+            self.function2 = self._match_function(header, 'FUNCtion2:')
+
+        elif self._match_function(header, 'MEASure:', '?') is not None:
+            self.function = self._match_function(header, 'MEASure:', '?')
+            return _format_reading(self.value(self.function))
+
+        elif self._match_function(header, 'CONFigure:') is not None:
+            self.function = self._match_function(header, 'CONFigure:')
+            self.trigger_count = 1
+            self.sample_count = 1
+
+        elif self._match_function(header, 'RATE:') is not None:
+            # the DM3058E reading rates map onto integration times
+            self.nplc = {'F': 0.02, 'M': 1.0, 'S': 10.0}.get(argument.upper()[:1], 10.0)
+
+        elif self._match_function(header, '', ':NPLCycles') is not None:
+            self.nplc = float(argument)
+
+        elif self._match_function(header, '', ':ZERO:AUTO') is not None:
+            pass
+
+        elif _scpi_match(header, 'TRIGger:SOURce'):
+            pass
+
+        elif _scpi_match(header, 'SAMPle:SOURce'):
+            self.sample_source = 'TIMER' if argument.upper().startswith('TIM') \
+                                 else 'IMMEDIATE'
+
+        elif _scpi_match(header, 'TRIGger:COUNt'):
+            self.trigger_count = int(float(argument))
+
+        elif _scpi_match(header, 'SAMPle:COUNt'):
+            self.sample_count = int(float(argument))
+
+        elif _scpi_match(header, 'SAMPle:TIMer'):
+            self.sample_timer = float(argument)
+
+        elif _scpi_match(header, 'FORMat:DATA'):
+            self.binary_format = argument.upper().startswith('REAL')
+
+        elif _scpi_match(header, 'INITiate'):
+            self._acquire()
+
+        elif _scpi_match(header, 'FETCh?'):
+            return self._format_memory()
+
+        elif _scpi_match(header, 'READ?'):
+            self._acquire()
+            return self._format_memory()
+
+        elif _scpi_match(header, 'DATA2?'):
+            return _format_reading(self.value(self.function2))
+
+        else:
+            raise ValueError('Undefined header: ' + command)
+        # end if
+
+        return None
+    # end def
+
+    def _match_function(self, header, prefix, suffix = ''):
+        """
+        Match a header of the form <prefix><function><suffix>
+
+        @param[in]  header   The header to test (string)
+        @param[in]  prefix   The SCPI nodes before the function (string)
+        @param[in]  suffix   The SCPI nodes after the function (string)
+        @return     (string) The long name of the matched function or None
+        """
+        for function in ['VOLTage:DC', 'CURRent:DC', 'RESistance']:
+            if _scpi_match(header, prefix + function + suffix):
+                return function.upper()
+            # end if
+        # end for
+
+        return None
+    # end def
+
+    def _acquire(self):
+        """
+        Fill the reading memory with a burst of timer paced readings
+        """
+        count = min(self.trigger_count*self.sample_count, sim_memory_size)
+
+        # the meter cannot sample faster than the integration time
+        interval = max(self.sample_timer, self.nplc/50.0)
+
+        if self.realtime:
+            time.sleep(count*interval)
+        # end if
+
+        start_time = time.time()
+        source = self.sources[self.function]
+        self.memory = [source(start_time + i*interval) + random.gauss(0, self.noise)
+                       for i in range(count)]
+    # end def
+
+    def _format_memory(self):
+        """
+        Format the reading memory as a response and clear it
+
+        @return   (string or bytes)   The readings as ascii or as a REAL,64
+                                      definite length block
+        """
+        readings = self.memory
+        self.memory = []
+
+        if self.binary_format:
+            data = struct.pack('>%dd' % len(readings), *readings)
+            length = str(len(data))
+            return ('#' + str(len(length)) + length).encode('latin-1') + data
+
+        else:
+            return ','.join([_format_reading(i) for i in readings])
+        # end if
+    # end def
+# end class
+
+
+class _SimulatedMeasurement(object):
+    """
+    The measurement sub-object of the ivi driver
+    """
+
+    def __init__(self, dmm):
+        self.dmm = dmm
+        self.reading = 0
+    # end def
+
+    def initiate(self):
+        # takes as many readings as the trigger and sample counts ask for
+        self.dmm._transaction()
+        self.dmm._acquire()
+    # end def
+
+    def fetch(self, max_time):
+        self.dmm._transaction()
+
+        if len(self.dmm.memory) != 1:
+            raise IOError('Fetched ' + str(len(self.dmm.memory)) +
+                          ' readings where one was expected')
+        # end if
+
+        self.reading = self.dmm.memory.pop()
+        return self.reading
+    # end def
+# end class
+
+
+#
+# ----------------
+# Private Functions
+
+def _as_source(value):
+    """
+    Convert a constant into a function of time
+
+    @param[in]  value      A constant or a function of time
+    @return     (function) A function of time
+    """
+    if callable(value):
+        return value
+    # end if
+
+    return lambda t: value
+# end def
+
+def _format_reading(value):
+    """
+    Format a reading the way the meters do
+
+    @param[in]  value     The reading (float)
+    @return     (string)  The reading in scientific notation
+    """
+    return '%.9E' % value
+# end def
+
+def _scpi_match(header, pattern):
+    """
+    Determine if a SCPI header matches a pattern written in long form, where
+    the upper case letters of each node are its short form.
+
+    @param[in]  header    The header received (string)
+    @param[in]  pattern   The long form of the command (string)
+    @return     (bool)    True if the header is the long or short form
+    """
+    header_nodes = header.lstrip(':').split(':')
+    pattern_nodes = pattern.lstrip(':').split(':')
+
+    if len(header_nodes) != len(pattern_nodes):
+        return False
+    # end if
+
+    for header_node, pattern_node in zip(header_nodes, pattern_nodes):
+        # seperate any query mark and numeric suffix
+        query = pattern_node.endswith('?')
+        if header_node.endswith('?') != query:
+            return False
+        # end if
+        header_node = header_node.rstrip('?').upper()
+        pattern_node = pattern_node.rstrip('?')
+
+        suffix = ''
+        while pattern_node and pattern_node[-1].isdigit():
+            suffix = pattern_node[-1] + suffix
+            pattern_node = pattern_node[:-1]
+        # end while
+
+        short_form = ''.join([c for c in pattern_node if not c.islower()])
+
+        if header_node not in [pattern_node.upper() + suffix,
+                               short_form.upper() + suffix]:
+            return False
+        # end if
+    # end for
+
+    return True
+# end def
+
+def _test():
+    """
+    Test code for this module.
+    """
+    dmm = SimulatedDMM('DM3058E', noise = 0.001)
+    print(dmm.query('*IDN?').strip())
+    dmm.write(':FUNCtion:CURRent:DC')
+    print(dmm.query(':FUNCtion?').strip())
+    print(dmm.query(':FUNCtion2:VALUe1?;:FUNCtion2:VALUe2?').strip())
+    print("Transactions: " + str(dmm.transactions))
+# end def
+
+if __name__ == '__main__':
+    # if this code is not running as an imported module run test code
+    _test()
+# end if
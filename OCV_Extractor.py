@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package OCV_Extractor.py
+Module to extract open circuit voltage against state of charge curves from
+the discharge and charge logs written by the Profile Logger.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import glob
+import os
+import re
+
+import numpy
+
+import Log_Reader
+import Result_Cache
+
+# ---------
+# Constants
+
+# the logs processed by default
+profile_log_pattern = 'Profile Log *.csv'
+
+# where the extracted curves are cached
+default_cache_dir = 'OCV cache'
+
+# changed whenever the extraction changes so that old cache entries are
+# not used
+cache_version = '1'
+
+# current magnitude above which the cell is charging or discharging (A)
+current_threshold = 0.05
+
+# the states of charge the curves are given at
+soc_grid = numpy.linspace(0.0, 1.0, 101)
+
+seconds_per_hour = 3600.0
+
+#
+# ----------------
+# Public Functions
+
+def parse_name(filename):
+    """
+    Find the cell and test current from the name of a profile log,
+    'Profile Log <cell>_<current or run>.csv'
+
+    @param[in]  filename   The log filename (string)
+    @return     (tuple)    The cell name and the current label, which is
+                           None if the name only has a run number
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    if name.startswith('Profile Log '):
+        name = name[len('Profile Log '):]
+    # end if
+
+    cell, _, suffix = name.partition('_')
+
+    if re.match(r'^\d+(\.\d+)?mA$', suffix):
+        return cell, suffix
+    # end if
+
+    return cell, None
+# end def
+
+
+def load_profile(filename):
+    """
+    Load a profile log
+
+    @param[in]  filename   The log filename (string)
+    @return     (tuple)    Arrays of the time (s), voltage (V) and current (A)
+    """
+    data = Log_Reader.read_log(filename, ['time', 'voltage', 'current'])
+
+    return data['time'], data['voltage'], data['current']
+# end def
+
+
+def find_segment(current, sign):
+    """
+    Find the longest run of samples where the cell is discharging (sign 1)
+    or charging (sign -1)
+
+    @param[in]  current   The current, positive when discharging (array)
+    @param[in]  sign      1 for discharge, -1 for charge (int)
+    @return     (tuple)   The start and end index of the run, end exclusive,
+                          or None if there is no run
+    """
+    active = numpy.concatenate(([False], sign*current > current_threshold,
+                                [False])).astype(int)
+    edges = numpy.diff(active)
+    starts = numpy.flatnonzero(edges == 1)
+    ends = numpy.flatnonzero(edges == -1)
+
+    if len(starts) == 0:
+        return None
+    # end if
+
+    longest = numpy.argmax(ends - starts)
+    return starts[longest], ends[longest]
+# end def
+
+
+def integrate_charge(time, current):
+    """
+    Integrate the current with the trapezoidal rule
+
+    @param[in]  time      The sample times in seconds (array)
+    @param[in]  current   The current in amps (array)
+    @return     (array)   The charge passed since the first sample in Ah
+    """
+    steps = (current[1:] + current[:-1])/2.0*numpy.diff(time)
+    return numpy.concatenate(([0.0], numpy.cumsum(steps)))/seconds_per_hour
+# end def
+
+
+def step_resistance(voltage, current, index):
+    """
+    Find the resistance from the voltage step as the current steps between
+    two samples
+
+    @param[in]  voltage   The voltage in volts (array)
+    @param[in]  current   The current in amps (array)
+    @param[in]  index     The first sample after the step (int)
+    @return     (float)   The resistance in ohms, None if there is no step
+    """
+    if (index < 1) or (index >= len(current)):
+        return None
+    # end if
+
+    d_current = current[index] - current[index - 1]
+    if abs(d_current) < current_threshold:
+        return None
+    # end if
+
+    # the voltage falls as the discharge current rises
+    return -(voltage[index] - voltage[index - 1])/d_current
+# end def
+
+
+def extract_curve(time, voltage, current):
+    """
+    Extract the OCV-SOC curves from a log. The resistance is taken from the
+    voltage steps where the load and charger turn on and off, and is used
+    to remove the IR drop from the loaded voltage.
+
+    @param[in]  time      The sample times in seconds (array)
+    @param[in]  voltage   The voltage in volts (array)
+    @param[in]  current   The current in amps, positive when discharging
+                          (array)
+    @return     (dict)    soc, discharge_ocv, charge_ocv and ocv arrays, the
+                          last being the mean of the two where both exist,
+                          and the capacity, charge_capacity, resistance and
+                          current
+    """
+    discharge = find_segment(current, 1)
+    charge = find_segment(current, -1)
+
+    if discharge is None:
+        raise ValueError('The log has no discharge')
+    # end if
+
+    steps = [discharge[0], discharge[1]]
+    if charge is not None:
+        steps += [charge[0], charge[1]]
+    # end if
+
+    resistances = [step_resistance(voltage, current, index)
+                   for index in steps]
+    resistances = [r for r in resistances if (r is not None) and (r > 0)]
+    resistance = numpy.median(resistances) if resistances else 0.0
+
+    # the open circuit voltage is above the terminal voltage while
+    # discharging and below it while charging
+    ocv = voltage + current*resistance
+
+    start, end = discharge
+    discharged = integrate_charge(time[start:end], current[start:end])
+    capacity = discharged[-1]
+    discharge_soc = 1.0 - discharged/capacity
+
+    result = {'soc': soc_grid,
+              'discharge_ocv': numpy.interp(soc_grid, discharge_soc[::-1],
+                                            ocv[start:end][::-1],
+                                            left = numpy.nan,
+                                            right = numpy.nan),
+              'charge_ocv': numpy.full(len(soc_grid), numpy.nan),
+              'capacity': capacity,
+              'charge_capacity': numpy.nan,
+              'resistance': resistance,
+              'current': numpy.median(current[start:end])}
+
+    if charge is not None:
+        start, end = charge
+        charged = integrate_charge(time[start:end], -current[start:end])
+        result['charge_capacity'] = charged[-1]
+        result['charge_ocv'] = numpy.interp(soc_grid, charged/charged[-1],
+                                            ocv[start:end],
+                                            left = numpy.nan,
+                                            right = numpy.nan)
+    # end if
+
+    result['ocv'] = numpy.where(numpy.isnan(result['charge_ocv']),
+                                result['discharge_ocv'],
+                                (result['discharge_ocv'] +
+                                 result['charge_ocv'])/2.0)
+
+    return result
+# end def
+
+
+def extract_file(filename, cache_dir = default_cache_dir):
+    """
+    Extract the curves from a profile log, using the cached result if the
+    log has been processed before
+
+    @param[in]  filename    The log filename (string)
+    @param[in]  cache_dir   The cache directory, None to not cache (string)
+    @return     (dict)      The curves, as extract_curve
+    """
+    return Result_Cache.cached(filename, cache_dir, cache_version, '.npz',
+                               lambda: extract_curve(*load_profile(filename)),
+                               _load_npz, _save_npz)
+# end def
+
+
+def extract_all(filenames = None, cache_dir = default_cache_dir,
+                processes = None):
+    """
+    Extract the curves from several profile logs in parallel
+
+    @param[in]  filenames   The logs, all the profile logs in the working
+                            directory by default (list)
+    @param[in]  cache_dir   The cache directory, None to not cache (string)
+    @param[in]  processes   The number of worker processes, one per core by
+                            default (int)
+    @return     (dict)      The curves of each log by filename
+    """
+    if filenames is None:
+        filenames = sorted(glob.glob(profile_log_pattern))
+    # end if
+
+    return dict(zip(filenames, Result_Cache.map_files(extract_file, filenames,
+                                                      cache_dir, processes)))
+# end def
+
+
+def write_curves(results, filename):
+    """
+    Write the OCV curve of each log as a column of a tab delimited file
+
+    @param[in]  results    The curves of each log by filename (dict)
+    @param[in]  filename   The file to write (string)
+    """
+    names = sorted(results)
+    headers = ['SOC'] + [os.path.splitext(os.path.basename(name))[0]
+                         for name in names]
+    columns = [soc_grid] + [results[name]['ocv'] for name in names]
+
+    numpy.savetxt(filename, numpy.column_stack(columns), fmt = '%.5f',
+                  delimiter = '\t', header = '\t'.join(headers),
+                  comments = '')
+# end def
+
+
+#
+# ----------------
+# Private Functions
+
+def _load_npz(filename):
+    """
+    @param[in]  filename   A cache entry (string)
+    @return     (dict)     The curves in the entry
+    """
+    with numpy.load(filename) as cached:
+        return dict([(key, cached[key][()] if cached[key].ndim == 0
+                           else cached[key]) for key in cached.files])
+    # end with
+# end def
+
+
+def _save_npz(filename, result):
+    """
+    @param[in]  filename   The cache entry to write (string)
+    @param[in]  result     The curves (dict)
+    """
+    numpy.savez_compressed(filename, **result)
+# end def
+
+
+def _main():
+    """
+    Extract the curves from every profile log in the working directory and
+    summarise them
+    """
+    results = extract_all()
+
+    for filename in sorted(results):
+        result = results[filename]
+        cell, label = parse_name(filename)
+
+        print('%-6s %-8s %.3f A  %.3f Ah  %.3f ohm' %
+              (cell, label or '', result['current'], result['capacity'],
+               result['resistance']))
+    # end for
+
+    write_curves(results, 'OCV SOC curves.csv')
+# end def
+
+if __name__ == '__main__':
+    # if this code is not running as an imported module run the extraction
+    _main()
+# end if
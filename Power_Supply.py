@@ -46,28 +46,38 @@ class PowerSupply(object):
     @attribute port     (string)     The COM port being used by the power supply
     @attribute PS       (object)     The power supply object
     @attribute output   (object)     The output port of KA3005P Power Supply
+    @attribute backend  (object)     Power supply object to use in place of 
+                                     the hardware, e.g. a 
+                                     Battery_Sim.SimKorad
     """    
     
-    def __init__(self, Model):
+    def __init__(self, Model, backend = None):
         """
         Initialise the PowerSupply Object
     
         @param[in] Model     The model of the power supply selected (string)
+        @param[in] backend   Power supply object to use instead of connecting
+                             to the hardware (object)
         """       
         
         # Initialise attributes
         self.model = Model
         self.port = 'NULL'
+        self.backend = backend
         
         # check to see if the model requested is selected
-        if self.model == 'KA3005P':
-            # find the port associated with the KA3005P Power Supply
-            self.port = findKoradPort()
-            
-        else:
+        if self.model not in ['KA3005P']:
             # The requested power supply is not supported
             raise ValueError('The Power Supply model selected is not supported'+
                              'by this Module')
+        
+        elif self.backend is not None:
+            # no hardware to find
+            pass
+        
+        elif self.model == 'KA3005P':
+            # find the port associated with the KA3005P Power Supply
+            self.port = findKoradPort()
         # end if        
     #end def
     
@@ -79,8 +89,13 @@ class PowerSupply(object):
     
         """        
         
+        if self.backend is not None:
+            # use the backend in place of the hardware
+            self.PS = self.backend
+            self.output = self.PS.channels[0]
+        
         # check to see if a power supply has been detected previously
-        if self.port == 'NULL':
+        elif self.port == 'NULL':
             # it has not so attempt to detect one based on the model requested
             if self.model == 'KA3005P':
                 # find the port associated with the KA3005P
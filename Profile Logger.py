@@ -5,20 +5,25 @@ import DC_Load
 import csv
 import os
 import time
-import Multimeter
 import random
-import BM2_aardvark
-
-import sys
-sys.path.insert(1, '../process/src')
-
-import process_SCPI
+import Adaptive_Sampler
+import Scheduler
+import Measurement_Sources
+import Coulomb_Counter
 
 # set constants
 output_filename = "Profile Log.csv"
 full_filename = os.getcwd() + '/' + output_filename
 
 timestep = 5
+
+# logged sample period limits and the slopes that trigger fast sampling, while
+# the load or charger is on the end of the step is still checked every 
+# min_timestep however long the logged sample period grows
+min_timestep = 1
+max_timestep = 60
+dvdt_threshold = 0.0005   # V/s
+didt_threshold = 0.002    # A/s
 taper_current = 0.050
 charge_voltage = 4.2
 charge_current = 1.25
@@ -27,147 +32,66 @@ min_voltage = 2.5
 
 rest_duration = 3600
 
+# stop the discharge once this much charge (Ah) or energy (Wh) has been 
+# drawn, None to discharge to min_voltage
+capacity_target = None
+energy_target = None
+
 is_test = False
-use_BM2 = False
-use_I2C = False
+
+# what the cell is measured with, one of Measurement_Sources.sources
+measurement_source = 'DMM'
+
 invert_current = True
 
-class Measurement_device:
-    def __init__(self):
-        if use_BM2:
-            self.device = BM2_aardvark.BM2()
-            
-        elif use_I2C:
-            self.device = process_SCPI.aardvark()
-            
-        else:
-            self.device = Multimeter.Multimeter('DM3058E')
-        # end if        
-    # end def
-    
-    def __enter__(self):
-        self.device.open()
-    # end def
-    
-    def __exit__(self, type, value, traceback):
-        self.device.close()
-    # end def       
-    
-    def get_is_fully_charged(self):
-        if use_BM2:
-            while not self.device.update_data():
-                print "BM2 data collection was bad"
-                time.sleep(0.05)
-            # end while        
-            return self.device.get_FC()
-        
-        elif use_I2C:
-            return (self.device.read_SCPI("BM2:TEL? 22,data", "0x5C", "uint") & int('0020',16)) != 0
-            
-        else:
-            if invert_current:
-                return ((self.device.get_DC_current()*-1) < taper_current)
-            
-            else:
-                return (self.device.get_DC_current() < taper_current)
-            # end if
-        # end if    
-    # end def
-    
-    def get_is_discharged(self):
-        if use_BM2:
-            while not self.device.update_data():
-                print "BM2 data collection was bad"
-                time.sleep(0.05)
-            # end while            
-            return self.device.get_CUV()
-        
-        elif use_I2C:
-            return (self.device.read_SCPI("BM2:TEL? 80,data", "0x5C", "uint") & int('0080',16)) != 0
-            
-        else:
-            return (self.device.get_DC_voltage(secondary = True) < min_voltage)
-        # end if    
-    # end def        
-    
-    def get_current(self):
-        if use_BM2:
-            while not self.device.update_data():
-                print "BM2 data collection was bad"
-                time.sleep(0.05)
-            # end while            
-            return self.device.Data.Current/1000.0
-        
-        elif use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 10,data", "0x5C", "int")/1000.0
-            
-        else:
-            return self.device.get_DC_current()
-        # end if    
-    # end def  
-    
-    def get_voltage(self):
-        if use_BM2:
-            while not self.device.update_data():
-                print "BM2 data collection was bad"
-                time.sleep(0.05)
-            # end while            
-            return self.device.Data.Voltage/1000.0
-        
-        elif use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 9,data", "0x5C", "uint")/1000.0        
-            
-        else:
-            return self.device.get_DC_voltage(secondary = True)
-        # end if    
-    # end def   
-    
-    def get_internal_resistance(self):
-        if use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 37,data", "0x5C", "uint")/10000.0      
-        else:
-            print "Internal resistance capture is not supported by this capture mode"
-        # end if
-    # end def
-    
-    def get_smoothed_voltage(self):
-        if use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 38,data", "0x5C", "uint")/1000.0      
-        else:
-            print "smoothed voltage capture is not supported by this capture mode"
-        # end if
-    # end def    
-    
-    def get_approximate_SOC(self):
-        if use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 36,data", "0x5C", "char")     
-        else:
-            print "Approximate SOC capture is not supported by this capture mode"
-        # end if
-    # end def    
+# the display of the multimeter that shows the current when measuring with it
+current_display = 'primary'
+
+
+def log_sample(output_writer, sample_time):
+    global last_log_time
     
-    def get_relative_SOC(self):
-        if use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 13,data", "0x5C", "char")  
-        else:
-            print "Approximate SOC capture is not supported by this capture mode"
-        # end if
-    # end def
+    output_writer.writerow([sample_time] + 
+                           [Meas_Dev.get(channel.name) 
+                            for channel in Meas_Dev.logged_channels()])
     
-    def get_absolute_SOC(self):
-        if use_I2C:
-            return self.device.read_SCPI("BM2:TEL? 14,data", "0x5C", "char")   
-        else:
-            print "Approximate SOC capture is not supported by this capture mode"
-        # end if
-    # end def    
-# end class
+    # choose when to sample next from how fast the cell is changing
+    sampler.update(sample_time, Meas_Dev.get('voltage'), Meas_Dev.get('current'))
+    last_log_time = sample_time
+# end def
+
+def count_sample(sample_time):
+    # every reading is added to the charge and energy totals, not just the 
+    # rows logged, so the targets are checked as soon as they are reached
+    counter.add(sample_time, Meas_Dev.get('voltage'), Meas_Dev.get('current'))
+# end def
+
+def log_if_due(output_writer, sample_time):
+    # the end of the step is checked on every tick, but a sample is only 
+    # logged once the adaptive sample period has passed, allowing for jitter
+    if (sample_time - last_log_time) >= (sampler.period - sampler.min_period/2.0):
+        log_sample(output_writer, sample_time)
+    # end if
+# end def
 
 # init
 
 PS = Power_Supply.PowerSupply('KA3005P')
 Load = DC_Load.DCLoad('M9711')
-Meas_Dev = Measurement_device()
+Meas_Dev = Measurement_Sources.create(measurement_source, 
+                                      current_display = current_display,
+                                      invert_current = invert_current,
+                                      taper_current = taper_current,
+                                      min_voltage = min_voltage)
+sampler = Adaptive_Sampler.AdaptiveSampler(max(min_timestep, Meas_Dev.min_period()), 
+                                           max_timestep, 
+                                           dvdt_threshold, didt_threshold)
+scheduler = Scheduler.PeriodicScheduler(min_timestep)
+
+# intervals longer than a few sample periods are not integrated over
+counter = Coulomb_Counter.CoulombCounter(max_gap = 2*max_timestep, 
+                                         capacity_target = capacity_target,
+                                         energy_target = energy_target)
 
 total_start_time = time.time()
 
@@ -180,13 +104,12 @@ with Meas_Dev:
         PS.set_current(charge_current)
         PS.output_on()
         
-        Meas_Dev.get_current()
-        Meas_Dev.get_voltage()
+        Meas_Dev.update()
         
         time.sleep(timestep)
         
         # wait for the taper current requirement to be met.
-        while not Meas_Dev.get_is_fully_charged():
+        while not Meas_Dev.get('fully_charged', refresh = True):
             
             if is_test:
                 # if this is a test, stop charging after 1 min
@@ -195,8 +118,8 @@ with Meas_Dev:
                 # end if
                 
                 print ("time = " + str((time.time() - total_start_time) / 60) + "mins, voltage = "
-                       + str(Meas_Dev.get_voltage()) + "V, current = "
-                       + str(Meas_Dev.get_current()) + "A")
+                       + str(Meas_Dev.get('voltage')) + "V, current = "
+                       + str(Meas_Dev.get('current')) + "A")
             # end if
             
             time.sleep(timestep)
@@ -222,60 +145,47 @@ with Meas_Dev:
         output_writer = csv.writer(csv_output, delimiter = '\t')
         
         # write the header row
-        if use_I2C:
-            output_writer.writerow(['Time (s)' , 'Voltage', 'Current', 
-                                    'Internal Resistance', 'Compensated Voltage',
-                                    'Approximate SOC', 'Relative SOC', 'Absolute SOC'])
-        else:
-            output_writer.writerow(['Time (s)' , 'Voltage', 'Current'])
-        # end if
+        output_writer.writerow(['Time (s)'] + 
+                               [channel.heading 
+                                for channel in Meas_Dev.logged_channels()])
         
         # baseling for logging time
         start_time = time.time()
+        scheduler.start()
         
         # discharge the cell and log
         print "Discharging after " + str((time.time() - total_start_time) / 60) + " mins"
         with Load:
             
             # write initial row
-            if use_I2C:
-                output_writer.writerow([0 , Meas_Dev.get_voltage(), 
-                                        Meas_Dev.get_current(),
-                                        Meas_Dev.get_internal_resistance(),
-                                        Meas_Dev.get_smoothed_voltage(),
-                                        Meas_Dev.get_approximate_SOC(),
-                                        Meas_Dev.get_relative_SOC(),
-                                        Meas_Dev.get_absolute_SOC()])
-            else:
-                output_writer.writerow([0 , Meas_Dev.get_voltage(), Meas_Dev.get_current()])
-            # end if
+            counter.reset()
+            Meas_Dev.update()
+            count_sample(0)
+            log_sample(output_writer, 0)
             
             # turn on the load
             Load.set_mode('constant_current', discharge_current)
             Load.load_on()
+            sampler.trigger()
             
             # wait for the next time step
-            time.sleep(timestep)
+            scheduler.wait(sampler.min_period)
             
-            # wait for the cell to discahrge
-            while not Meas_Dev.get_is_discharged():
+            # wait for the cell to discahrge, taking this tick's snapshot
+            while not Meas_Dev.get('discharged', refresh = True):
+                
+                # count every reading and write the current data when due
+                sample_time = time.time() - start_time
+                count_sample(sample_time)
+                log_if_due(output_writer, sample_time)
                 
-                # write current data
-                if use_I2C:
-                    output_writer.writerow([(time.time() - start_time),
-                                            Meas_Dev.get_voltage(), 
-                                            Meas_Dev.get_current(),
-                                            Meas_Dev.get_internal_resistance(),
-                                            Meas_Dev.get_smoothed_voltage(),
-                                            Meas_Dev.get_approximate_SOC(),
-                                            Meas_Dev.get_relative_SOC(),
-                                            Meas_Dev.get_absolute_SOC()])            
-                else:
-                    output_writer.writerow([(time.time() - start_time) , Meas_Dev.get_voltage(), Meas_Dev.get_current()])
+                if counter.target_reached():
+                    print "Discharge target reached"
+                    break
                 # end if
                 
                 # wait for the next time step
-                time.sleep(timestep)                
+                scheduler.wait(sampler.min_period)
                 
                 if is_test:
                     # only run for 5 mins if this is a test
@@ -284,8 +194,9 @@ with Meas_Dev:
                     # end if
                     
                     print ("time = " + str((time.time() - start_time) / 60) + "mins, voltage = "
-                                       + str(Meas_Dev.get_voltage()) + "V, current = "
-                                       + str(Meas_Dev.get_current()) + "A")                    
+                                       + str(Meas_Dev.get('voltage')) + "V, current = "
+                                       + str(Meas_Dev.get('current')) + "A, discharged = "
+                                       + str(abs(counter.amp_hours)) + "Ah")                    
                 # end if
             # end while
             
@@ -293,28 +204,23 @@ with Meas_Dev:
             Load.load_off()
         # end with
         
+        print "Discharged " + counter.report()
+        
         # rest
         print "Resting after " + str((time.time() - total_start_time) / 60) + " mins"
         
         restart_time = time.time()
+        sampler.trigger()
         
         while True:
             # wait for the next time step
-            time.sleep(timestep)
+            scheduler.wait(sampler.period)
         
             # write current data
-            if use_I2C:
-                output_writer.writerow([(time.time() - start_time),
-                                        Meas_Dev.get_voltage(), 
-                                        Meas_Dev.get_current(),
-                                        Meas_Dev.get_internal_resistance(),
-                                        Meas_Dev.get_smoothed_voltage(),
-                                        Meas_Dev.get_approximate_SOC(),
-                                        Meas_Dev.get_relative_SOC(),
-                                        Meas_Dev.get_absolute_SOC()])            
-            else:            
-                output_writer.writerow([(time.time() - start_time) , Meas_Dev.get_voltage(), Meas_Dev.get_current()])   
-            # end if
+            Meas_Dev.update()
+            sample_time = time.time() - start_time
+            count_sample(sample_time)
+            log_sample(output_writer, sample_time)
             
             if is_test and ((time.time() - restart_time) > 60):
                 break
@@ -334,41 +240,28 @@ with Meas_Dev:
             PS.set_voltage(charge_voltage)
             PS.set_current(charge_current)
             PS.output_on()
+            sampler.trigger()
             
             # write initial row
-            if use_I2C:
-                output_writer.writerow([(time.time() - start_time),
-                                        Meas_Dev.get_voltage(), 
-                                        Meas_Dev.get_current(),
-                                        Meas_Dev.get_internal_resistance(),
-                                        Meas_Dev.get_smoothed_voltage(),
-                                        Meas_Dev.get_approximate_SOC(),
-                                        Meas_Dev.get_relative_SOC(),
-                                        Meas_Dev.get_absolute_SOC()])            
-            else:            
-                output_writer.writerow([(time.time() - start_time) , Meas_Dev.get_voltage(), Meas_Dev.get_current()])  
-            # end if
+            counter.reset()
+            Meas_Dev.update()
+            sample_time = time.time() - start_time
+            count_sample(sample_time)
+            log_sample(output_writer, sample_time)
             
             restart_time = time.time()
             
-            time.sleep(timestep)
+            scheduler.wait(sampler.min_period)
             # write current data            
             
-            # wait for the taper current requirement to be met.
-            while not Meas_Dev.get_is_fully_charged():
+            # wait for the taper current requirement to be met, taking this 
+            # tick's snapshot
+            while not Meas_Dev.get('fully_charged', refresh = True):
 
-                if use_I2C:
-                    output_writer.writerow([(time.time() - start_time),
-                                            Meas_Dev.get_voltage(), 
-                                            Meas_Dev.get_current(),
-                                            Meas_Dev.get_internal_resistance(),
-                                            Meas_Dev.get_smoothed_voltage(),
-                                            Meas_Dev.get_approximate_SOC(),
-                                            Meas_Dev.get_relative_SOC(),
-                                            Meas_Dev.get_absolute_SOC()])            
-                else:                
-                    output_writer.writerow([(time.time() - start_time) , Meas_Dev.get_voltage(), Meas_Dev.get_current()])
-                # end if  
+                # count every reading and write the current data when due
+                sample_time = time.time() - start_time
+                count_sample(sample_time)
+                log_if_due(output_writer, sample_time)
                 
                 if is_test:
                     # only run for 5 mins if this is a test
@@ -377,20 +270,24 @@ with Meas_Dev:
                     # end if
                     
                     print ("time = " + str((time.time() - start_time) / 60) + "mins, voltage = "
-                                       + str(Meas_Dev.get_voltage()) + "V, current = "
-                                       + str(Meas_Dev.get_current()) + "A")                    
+                                       + str(Meas_Dev.get('voltage')) + "V, current = "
+                                       + str(Meas_Dev.get('current')) + "A, charged = "
+                                       + str(abs(counter.amp_hours)) + "Ah")                    
                 # end if   
                 
-                time.sleep(timestep)
+                scheduler.wait(sampler.min_period)
                 # write current data                
             # end while
             
             PS.output_off()
         # end with
+        
+        print "Charged " + counter.report()
     # end with
 # end with
 
 print "Complete after " + str((time.time() - total_start_time) / 60) + " mins"
+print scheduler.report()
 
         
         
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Result_Cache.py
+Module to cache the results computed from log files under the hash of each
+log, and to compute the results of many logs in parallel.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import errno
+import hashlib
+import multiprocessing
+import os
+
+# ---------
+# Constants
+
+# the size of the blocks a file is hashed in (bytes)
+hash_block_size = 1 << 20
+
+#
+# ----------------
+# Public Functions
+
+def file_hash(filename, version):
+    """
+    @param[in]  filename   The file to hash (string)
+    @param[in]  version    The version of the results cached, changed
+                           whenever they change so that old entries are not
+                           used (string)
+    @return     (string)   The SHA1 of the version and the file contents
+    """
+    digest = hashlib.sha1(version.encode('ascii'))
+
+    with open(filename, 'rb') as log_file:
+        for block in iter(lambda: log_file.read(hash_block_size), b''):
+            digest.update(block)
+        # end for
+    # end with
+
+    return digest.hexdigest()
+# end def
+
+
+def cached(filename, cache_dir, version, extension, compute, load, save):
+    """
+    Get the result computed from a file, using the cached result if the
+    file has been processed before and caching it otherwise
+
+    @param[in]  filename    The file the result is computed from (string)
+    @param[in]  cache_dir   The cache directory, None to not cache (string)
+    @param[in]  version     The version of the results (string)
+    @param[in]  extension   The extension of a cache entry, e.g. '.json'
+                            (string)
+    @param[in]  compute     Called with no arguments to compute the result
+                            (function)
+    @param[in]  load        Called with a cache entry filename, returns the
+                            result (function)
+    @param[in]  save        Called with a filename and the result to write a
+                            cache entry (function)
+    @return     (object)    The result
+    """
+    cache_file = None
+
+    if cache_dir is not None:
+        cache_file = os.path.join(cache_dir,
+                                  file_hash(filename, version) + extension)
+
+        if os.path.isfile(cache_file):
+            return load(cache_file)
+        # end if
+    # end if
+
+    result = compute()
+
+    if cache_file is not None:
+        _make_dir(cache_dir)
+
+        # write then rename so a reader never sees a partial entry. The
+        # temporary name is unique to the process, as workers given the same
+        # log write the same entry, and keeps the extension as numpy.savez
+        # adds it to any other name
+        temp_file = cache_file + '.' + str(os.getpid()) + '.tmp' + extension
+        save(temp_file, result)
+        replace_file(temp_file, cache_file)
+    # end if
+
+    return result
+# end def
+
+
+def replace_file(source, destination):
+    """
+    Rename a file over another one, e.g. to put a file written under a
+    temporary name in place in one step
+
+    @param[in]  source        The file to rename (string)
+    @param[in]  destination   The file to replace (string)
+    """
+    if hasattr(os, 'replace'):
+        os.replace(source, destination)
+
+    else:
+        # os.rename will not replace a file on Windows
+        if os.path.isfile(destination):
+            os.remove(destination)
+        # end if
+
+        os.rename(source, destination)
+    # end if
+# end def
+
+
+def map_files(function, filenames, cache_dir, processes = None,
+              skipped = ()):
+    """
+    Compute the results of several files in parallel
+
+    @param[in]  function    Called with a filename and the cache directory
+                            in a worker process, returns the result. It
+                            must be a module level function (function)
+    @param[in]  filenames   The files (list)
+    @param[in]  cache_dir   The cache directory, None to not cache (string)
+    @param[in]  processes   The number of worker processes, one per core by
+                            default (int)
+    @param[in]  skipped     The exceptions that mean a file has no result
+                            (tuple)
+    @return     (list)      The result of each file, None for those skipped
+    """
+    if len(filenames) == 0:
+        return []
+    # end if
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_worker, [(function, filename, cache_dir, skipped)
+                                  for filename in filenames])
+    finally:
+        pool.close()
+        pool.join()
+    # end try
+# end def
+
+
+#
+# ----------------
+# Private Functions
+
+def _worker(arguments):
+    """
+    Compute the result of one file in a worker process
+
+    @param[in]  arguments   The function, filename, cache directory and
+                            skipped exceptions (tuple)
+    @return     (object)    The result, None if the file was skipped
+    """
+    function, filename, cache_dir, skipped = arguments
+
+    try:
+        return function(filename, cache_dir)
+
+    except skipped:
+        return None
+    # end try
+# end def
+
+
+def _make_dir(directory):
+    """
+    Create a directory if it does not exist, allowing for another worker
+    creating it at the same time
+
+    @param[in]  directory   The directory (string)
+    """
+    try:
+        os.makedirs(directory)
+
+    except OSError as error:
+        if (error.errno != errno.EEXIST) or not os.path.isdir(directory):
+            raise
+        # end if
+    # end try
+# end def
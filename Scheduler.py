@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Scheduler.py
+Module to pace acquisition loops to absolute deadlines so that the time
+taken by each reading does not add to the sample period, and to record how
+well the deadlines were met.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import bisect
+import ctypes
+import ctypes.util
+import os
+import sys
+import time
+
+# ---------
+# Constants
+
+# a clock that is not affected by changes to the system time, and its name
+# for the reports
+if hasattr(time, 'monotonic'):
+    monotonic = time.monotonic
+    monotonic_name = 'time.monotonic'
+
+elif sys.platform.startswith('win'):
+    # time.clock is the high resolution performance counter on Windows
+    monotonic = time.clock
+    monotonic_name = 'time.clock'
+
+else:
+    # Python 2 has no monotonic clock on POSIX so clock_gettime is called in
+    # the C library, which is only given up for the system time, and its
+    # steps, if it cannot be loaded
+    try:
+        _clock_gettime = ctypes.CDLL(ctypes.util.find_library('rt') or
+                                     ctypes.util.find_library('c'),
+                                     use_errno = True).clock_gettime
+        _clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(ctypes.c_long)]
+
+        # CLOCK_MONOTONIC, and a timespec of seconds and nanoseconds
+        _clock_id = 6 if sys.platform == 'darwin' else 1
+        _timespec = ctypes.c_long*2
+
+        def monotonic():
+            timespec = _timespec()
+            if _clock_gettime(_clock_id, timespec) != 0:
+                error = ctypes.get_errno()
+                raise OSError(error, os.strerror(error))
+            # end if
+
+            return timespec[0] + timespec[1]*1e-9
+        # end def
+
+        monotonic()
+        monotonic_name = 'clock_gettime(CLOCK_MONOTONIC)'
+
+    except (OSError, AttributeError, TypeError):
+        monotonic = time.time
+        monotonic_name = 'time.time, which steps with the system time'
+    # end try
+# end if
+
+# upper edges of the jitter and overrun histogram bins in seconds, the last
+# bin holds everything above the last edge
+histogram_edges = [0.0001, 0.001, 0.01, 0.1, 1.0]
+
+#
+# ---------
+# Classes
+
+class Histogram(object):
+    """
+    Class that counts values into fixed bins
+
+    @attribute edges    (list)    The upper edge of each bin
+    @attribute counts   (list)    The number of values in each bin, with one
+                                  extra bin for values above the last edge
+    @attribute count    (int)     The number of values added
+    @attribute total    (float)   The sum of the values added
+    @attribute maximum  (float)   The largest value added
+    """
+
+    def __init__(self, edges = histogram_edges):
+        """
+        Initialise the Histogram Object
+
+        @param[in] edges   The upper edge of each bin, ascending (list)
+        """
+        self.edges = list(edges)
+        self.counts = [0]*(len(self.edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+    # end def
+
+    def add(self, value):
+        """
+        Count a value
+
+        @param[in] value   The value to add (float)
+        """
+        self.counts[bisect.bisect_left(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+    # end def
+
+    def mean(self):
+        """
+        @return   (float)   The mean of the values added, 0 if there are none
+        """
+        if self.count == 0:
+            return 0.0
+        # end if
+
+        return self.total/self.count
+    # end def
+
+    def __str__(self):
+        """
+        @return   (string)   The counts in each bin
+        """
+        labels = ['<' + _format_time(edge) for edge in self.edges]
+        labels.append('>' + _format_time(self.edges[-1]))
+
+        return ', '.join([label + ': ' + str(count)
+                          for label, count in zip(labels, self.counts)])
+    # end def
+# end class
+
+
+class PeriodicScheduler(object):
+    """
+    Class that waits until deadlines spaced a period apart from the start
+    time, rather than for a period after the work finished, so the sample
+    spacing does not drift. Deadlines the loop was too late for are counted
+    and skipped so that the loop stays on the same grid.
+
+    @attribute period      (float)      The time between deadlines in seconds
+    @attribute start_time  (float)      The clock time of the first deadline
+    @attribute ticks       (int)        The number of deadlines waited for
+    @attribute missed      (int)        The number of deadlines that had
+                                        already passed when waited for
+    @attribute skipped     (int)        The number of whole periods skipped
+                                        after missed deadlines
+    @attribute jitter      (Histogram)  How late the waits returned
+    @attribute overrun     (Histogram)  How far past missed deadlines the
+                                        work ran
+    @attribute clock_name  (string)     The clock the deadlines are timed by
+    """
+
+    def __init__(self, period, clock = None):
+        """
+        Initialise the PeriodicScheduler Object
+
+        @param[in] period   The time between deadlines in seconds (float)
+        @param[in] clock    Object providing time() and sleep(seconds), a
+                            monotonic clock by default (object)
+        """
+        self.period = period
+
+        if clock is None:
+            self._time = monotonic
+            self._sleep = time.sleep
+            self.clock_name = monotonic_name
+
+        else:
+            self._time = clock.time
+            self._sleep = clock.sleep
+            self.clock_name = type(clock).__name__
+        # end if
+
+        self.start_time = None
+        self.last_deadline = None
+        self.ticks = 0
+        self.missed = 0
+        self.skipped = 0
+        self.jitter = Histogram()
+        self.overrun = Histogram()
+    # end def
+
+    def start(self):
+        """
+        Start the deadlines from now
+        """
+        self.start_time = self._time()
+        self.last_deadline = self.start_time
+    # end def
+
+    def elapsed(self):
+        """
+        @return   (float)   Seconds since the scheduler was started
+        """
+        if self.start_time is None:
+            self.start()
+        # end if
+
+        return self._time() - self.start_time
+    # end def
+
+    def wait(self, period = None):
+        """
+        Wait for the next deadline
+
+        @param[in]  period    The time from the last deadline to the next,
+                              to change the period (float)
+        @return     (float)   The time of the deadline since the start
+        """
+        if self.start_time is None:
+            self.start()
+        # end if
+
+        if period is not None:
+            self.period = period
+        # end if
+
+        deadline = self.last_deadline + self.period
+        lateness = self._time() - deadline
+
+        if lateness > 0:
+            # the work ran past the deadline so do not wait, and skip any
+            # whole periods that have been missed entirely
+            self.missed += 1
+            self.overrun.add(lateness)
+
+            skipped = int(lateness // self.period)
+            self.skipped += skipped
+            deadline += skipped*self.period
+
+        else:
+            self._sleep(-lateness)
+            self.jitter.add(abs(self._time() - deadline))
+        # end if
+
+        self.last_deadline = deadline
+        self.ticks += 1
+
+        return deadline - self.start_time
+    # end def
+
+    def report(self):
+        """
+        @return   (string)   A summary of how well the deadlines were met
+        """
+        return ('Scheduler: ' + str(self.ticks) + ' deadlines, ' +
+                str(self.missed) + ' missed, ' + str(self.skipped) +
+                ' periods skipped, timed by ' + self.clock_name + '\n' +
+                '  jitter:  mean ' + _format_time(self.jitter.mean()) +
+                ', max ' + _format_time(self.jitter.maximum) +
+                ' (' + str(self.jitter) + ')\n' +
+                '  overrun: mean ' + _format_time(self.overrun.mean()) +
+                ', max ' + _format_time(self.overrun.maximum) +
+                ' (' + str(self.overrun) + ')')
+    # end def
+# end class
+
+
+#
+# ----------------
+# Private Functions
+
+def _format_time(seconds):
+    """
+    Format a time for a report
+
+    @param[in]  seconds    The time to format (float)
+    @return     (string)   The time in s or ms
+    """
+    if seconds >= 1.0:
+        return '%gs' % seconds
+    # end if
+
+    return '%gms' % (seconds*1000)
+# end def
@@ -0,0 +1,664 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Sequence_Engine.py
+Module to run test sequences that are described as a set of states with
+entry actions, periodic actions and debounced transitions.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import json
+import os
+import time
+import traceback
+from multiprocessing.pool import ThreadPool
+
+import Result_Cache
+import Scheduler
+
+# ---------
+# Constants
+
+# number of consecutive passing checks needed before a transition is taken
+default_debounce = 2
+
+# default time between ticks in seconds
+default_sample_period = 1.0
+
+# default time between checkpoints in seconds
+default_checkpoint_period = 60.0
+
+#
+# ---------
+# Classes
+
+class ActionError(Exception):
+    """
+    Exception raised when a periodic action fails and the sequence has no
+    fault state to move to
+    """
+    pass
+# end class
+
+
+class Transition(object):
+    """
+    Class describing a move from one state to another once a guard condition
+    has held for a number of consecutive ticks.
+
+    @attribute target     (string)    The name of the state to move to
+    @attribute guard      (function)  Called with the Sequence, returns True
+                                      when the transition should be taken
+    @attribute debounce   (int)       The number of consecutive ticks the
+                                      guard must pass
+    @attribute count      (int)       The number of consecutive passes so far
+    """
+
+    def __init__(self, target, guard, debounce = default_debounce):
+        """
+        Initialise the Transition Object
+
+        @param[in] target     The name of the state to move to (string)
+        @param[in] guard      Function of the Sequence returning a bool
+        @param[in] debounce   Consecutive passes required (int)
+        """
+        self.target = target
+        self.guard = guard
+        self.debounce = debounce
+        self.count = 0
+    # end def
+
+    def check(self, sequence):
+        """
+        Evaluate the guard and update the debounce count
+
+        @param[in]  sequence   The Sequence being run
+        @return     (bool)     True if the transition should be taken
+        """
+        if self.guard(sequence):
+            self.count += 1
+
+        else:
+            self.count = 0
+        # end if
+
+        return self.count >= self.debounce
+    # end def
+# end class
+
+
+class State(object):
+    """
+    Class describing one state of a test sequence.
+
+    @attribute name           (string)    The name of the state
+    @attribute entry          (function)  Called with the Sequence once when
+                                          the state is entered
+    @attribute actions        (list)      Functions of the Sequence run every
+                                          tick, one after another in order so
+                                          that e.g. a load is configured
+                                          before the pack is connected to it
+    @attribute concurrent     (bool)      Run the actions at the same time
+                                          instead, only for actions that do
+                                          not depend on each other's order
+    @attribute transitions    (list)      The Transitions out of the state, in
+                                          order of priority
+    @attribute timeout        (float)     Seconds after which timeout_target
+                                          is entered, None for no timeout
+    @attribute timeout_target (string)    The state to enter on a timeout
+    @attribute sample_period  (float)     Seconds between ticks in this state
+    @attribute adaptive       (bool)      Let the Sequence sampler stretch the
+                                          time between ticks, only for states
+                                          whose guards can wait, e.g. rests
+                                          with no load or charger on
+    @attribute final          (bool)      Whether the sequence ends here
+    """
+
+    def __init__(self, name, entry = None, actions = None, transitions = None,
+                 timeout = None, timeout_target = None,
+                 sample_period = default_sample_period, final = False,
+                 concurrent = False, adaptive = False):
+        """
+        Initialise the State Object
+
+        @param[in] name            The name of the state (string)
+        @param[in] entry           Entry action (function)
+        @param[in] actions         Periodic actions (list of functions)
+        @param[in] transitions     Transitions out of the state (list)
+        @param[in] timeout         Seconds before timing out (float)
+        @param[in] timeout_target  State to enter on a timeout (string)
+        @param[in] sample_period   Seconds between ticks (float)
+        @param[in] final           The sequence ends in this state (bool)
+        @param[in] concurrent      Run the actions at the same time (bool)
+        @param[in] adaptive        Let the sampler choose the period (bool)
+        """
+        self.name = name
+        self.entry = entry
+        self.actions = actions if actions is not None else []
+        self.transitions = transitions if transitions is not None else []
+        self.timeout = timeout
+        self.timeout_target = timeout_target
+        self.sample_period = sample_period
+        self.final = final
+        self.concurrent = concurrent
+        self.adaptive = adaptive
+    # end def
+# end class
+
+
+class Checkpoint(object):
+    """
+    Class that saves the progress of a Sequence to a json file so that it can
+    be resumed after a crash or reboot. The file is replaced atomically so a
+    crash while saving leaves the previous checkpoint intact. Each save
+    records what is being tested and when, so that a checkpoint left by an
+    old run or another unit is not resumed.
+
+    @attribute filename   (string)   The checkpoint file
+    @attribute period     (float)    Maximum seconds between saves
+    @attribute extra      (dict)     Additional values to save, e.g. the log
+                                     filename
+    @attribute identity   (dict)     What is being tested, e.g. the pack
+                                     serial number, which a checkpoint must
+                                     match to be resumed
+    @attribute max_age    (float)    The oldest checkpoint that can be
+                                     resumed in seconds, None for any age
+    @attribute last_save  (float)    When the checkpoint was last saved
+    """
+
+    def __init__(self, filename, period = default_checkpoint_period,
+                 extra = None, identity = None, max_age = None):
+        """
+        Initialise the Checkpoint Object
+
+        @param[in] filename   The checkpoint file (string)
+        @param[in] period     Maximum seconds between saves (float)
+        @param[in] extra      Additional values to save (dict)
+        @param[in] identity   What is being tested (dict)
+        @param[in] max_age    The oldest checkpoint to resume in seconds
+                              (float)
+        """
+        self.filename = filename
+        self.period = period
+        self.extra = extra if extra is not None else {}
+        self.identity = identity if identity is not None else {}
+        self.max_age = max_age
+        self.last_save = None
+    # end def
+
+    def due(self, now):
+        """
+        @param[in]  now      The current time (float)
+        @return     (bool)   True if the checkpoint period has elapsed
+        """
+        return (self.last_save is None) or ((now - self.last_save) >= self.period)
+    # end def
+
+    def save(self, sequence):
+        """
+        Save the progress of a sequence
+
+        @param[in] sequence   The Sequence to save (Sequence)
+        """
+        data = sequence.snapshot()
+        data['extra'] = self.extra
+        data['identity'] = self.identity
+        data['saved_time'] = sequence.clock.time()
+
+        temp_filename = self.filename + '.tmp'
+        with open(temp_filename, 'w') as temp_file:
+            json.dump(data, temp_file, indent = 2, sort_keys = True)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        # end with
+
+        Result_Cache.replace_file(temp_filename, self.filename)
+        self.last_save = sequence.clock.time()
+    # end def
+
+    def load(self):
+        """
+        Read the last checkpoint saved
+
+        @return   (dict)   The checkpoint or None if there is not one
+        """
+        # the temporary file is only left on its own if saving was
+        # interrupted after the old checkpoint was removed
+        for filename in [self.filename, self.filename + '.tmp']:
+            if os.path.isfile(filename):
+                try:
+                    with open(filename, 'r') as checkpoint_file:
+                        return json.load(checkpoint_file)
+                    # end with
+
+                except ValueError:
+                    # incomplete file
+                    pass
+                # end try
+            # end if
+        # end for
+
+        return None
+    # end def
+
+    def check(self, data, now):
+        """
+        Make sure a loaded checkpoint can be resumed
+
+        @param[in]  data   The checkpoint, as load returns (dict)
+        @param[in]  now    The current time (float)
+        """
+        if data.get('identity') != self.identity:
+            raise ValueError('The checkpoint is for ' +
+                             str(data.get('identity')) + ', not ' +
+                             str(self.identity))
+        # end if
+
+        if self.max_age is not None:
+            if 'saved_time' not in data:
+                raise ValueError('The checkpoint does not say when it was '
+                                 'saved')
+            # end if
+
+            age = now - data['saved_time']
+            if (age < 0) or (age > self.max_age):
+                raise ValueError('The checkpoint was saved %.0f s ago, '
+                                 'more than %.0f s' % (age, self.max_age))
+            # end if
+        # end if
+    # end def
+
+    def remove(self):
+        """
+        Delete the checkpoint once the sequence is complete
+        """
+        for filename in [self.filename, self.filename + '.tmp']:
+            if os.path.isfile(filename):
+                os.remove(filename)
+            # end if
+        # end for
+    # end def
+# end class
+
+
+class Sequence(object):
+    """
+    Class that runs a set of States as an event loop. Every tick the sample
+    function is called, the periodic actions of the current state are run,
+    and then its transitions are checked. If an action fails the rest are
+    not run and the sequence moves to its fault state, or stops if it has
+    none.
+
+    @attribute states          (dict)       The States by name
+    @attribute state           (State)      The current State
+    @attribute previous_state  (State)      The State before the current one
+    @attribute sample          (function)   Called with the Sequence at the
+                                            start of every tick, returns False
+                                            if the data is bad and the
+                                            transitions should not be checked
+    @attribute clock           (object)     Provides time() and sleep(), the
+                                            time module by default
+    @attribute start_time      (float)      When the sequence started
+    @attribute state_start_time (float)     When the current state was entered
+    @attribute ticks           (int)        The number of ticks run
+    @attribute checkpoint      (Checkpoint) Where progress is saved, None to
+                                            not save it
+    @attribute sampler         (object)     Chooses the time between ticks in
+                                            place of the sample periods of
+                                            adaptive states, e.g. an 
+                                            Adaptive_Sampler.AdaptiveSampler
+    @attribute scheduler       (PeriodicScheduler) Paces the ticks and
+                                            records missed deadlines
+    @attribute fault_state     (string)     The state entered when an action
+                                            fails, None to raise ActionError
+    @attribute faulted         (bool)       An action has failed and the
+                                            fault state was entered
+    """
+
+    def __init__(self, states, initial, sample = None, clock = time,
+                 workers = 4, checkpoint = None, sampler = None,
+                 fault_state = None):
+        """
+        Initialise the Sequence Object
+
+        @param[in] states      The states of the sequence (list of States)
+        @param[in] initial     The name of the first state (string)
+        @param[in] sample      Function called at the start of each tick
+        @param[in] clock       Object providing time() and sleep(seconds)
+        @param[in] workers     Number of threads used to run concurrent
+                               actions (int)
+        @param[in] checkpoint  Where to save progress (Checkpoint)
+        @param[in] sampler     Chooses the time between ticks (object)
+        @param[in] fault_state The state to enter when an action fails
+                               (string)
+        """
+        self.states = dict([(state.name, state) for state in states])
+        self.initial = initial
+        self.sample = sample
+        self.clock = clock
+        self.workers = workers
+        self.checkpoint = checkpoint
+        self.sampler = sampler
+        self.fault_state = fault_state
+
+        if initial not in self.states:
+            raise ValueError('The initial state ' + str(initial) +
+                             ' is not defined')
+        # end if
+
+        if (fault_state is not None) and (fault_state not in self.states):
+            raise ValueError('The fault state ' + str(fault_state) +
+                             ' is not defined')
+        # end if
+
+        for state in states:
+            targets = [transition.target for transition in state.transitions]
+            if state.timeout_target is not None:
+                targets.append(state.timeout_target)
+            # end if
+
+            for target in targets:
+                if target not in self.states:
+                    raise ValueError('State ' + str(state.name) +
+                                     ' moves to undefined state ' + str(target))
+                # end if
+            # end for
+        # end for
+
+        self.state = None
+        self.previous_state = None
+        self.start_time = None
+        self.state_start_time = None
+        self.scheduler = Scheduler.PeriodicScheduler(default_sample_period,
+                                                     clock = self.clock)
+        self.ticks = 0
+        self.faulted = False
+        self._pool = None
+    # end def
+
+    def elapsed(self):
+        """
+        @return   (float)   Seconds since the sequence started
+        """
+        return self.clock.time() - self.start_time
+    # end def
+
+    def time_in_state(self):
+        """
+        @return   (float)   Seconds since the current state was entered
+        """
+        return self.clock.time() - self.state_start_time
+    # end def
+
+    def is_complete(self):
+        """
+        @return   (bool)   True once a final state has been reached
+        """
+        return (self.state is not None) and self.state.final
+    # end def
+
+    def start(self, state = None, start_time = None, state_start_time = None,
+              run_entry = True):
+        """
+        Start the sequence, by default in the initial state
+
+        @param[in] state             The name of the state to start in (string)
+        @param[in] start_time        When the sequence started (float)
+        @param[in] state_start_time  When the state was entered (float)
+        @param[in] run_entry         Run the entry action of the state (bool)
+        """
+        now = self.clock.time()
+        self.start_time = start_time if start_time is not None else now
+        self.scheduler.start()
+
+        self.enter(state if state is not None else self.initial, run_entry)
+
+        if state_start_time is not None:
+            self.state_start_time = state_start_time
+        # end if
+    # end def
+
+    def snapshot(self):
+        """
+        @return   (dict)   The progress of the sequence, as saved in a
+                           Checkpoint
+        """
+        return {'state': self.state.name,
+                'start_time': self.start_time,
+                'state_start_time': self.state_start_time,
+                'debounce_counts': [transition.count
+                                    for transition in self.state.transitions]}
+    # end def
+
+    def resume(self, snapshot):
+        """
+        Start the sequence from a snapshot. The entry action of the state
+        already ran before the snapshot was saved, and may have side effects
+        such as commands to the pack, so it is not run again. The periodic
+        actions bring the equipment back in line.
+
+        @param[in] snapshot   The progress to resume from (dict)
+        """
+        self.start(snapshot['state'], snapshot['start_time'],
+                   snapshot['state_start_time'], run_entry = False)
+
+        for transition, count in zip(self.state.transitions,
+                                     snapshot['debounce_counts']):
+            transition.count = count
+        # end for
+    # end def
+
+    def enter(self, name, run_entry = True):
+        """
+        Move to a state and run its entry action
+
+        @param[in] name        The name of the state to enter (string)
+        @param[in] run_entry   Run the entry action (bool)
+        """
+        self.previous_state = self.state
+        self.state = self.states[name]
+        self.state_start_time = self.clock.time()
+
+        # debouncing starts again in every state
+        for transition in self.state.transitions:
+            transition.count = 0
+        # end for
+
+        # sample quickly after a state change
+        if self.sampler is not None:
+            self.sampler.trigger()
+        # end if
+
+        if run_entry and (self.state.entry is not None):
+            self.state.entry(self)
+        # end if
+    # end def
+
+    def step(self):
+        """
+        Run a single tick of the sequence
+
+        @return   (bool)   True if the sequence is complete
+        """
+        if self.state is None:
+            self.start()
+        # end if
+
+        if self.state.final:
+            return True
+        # end if
+
+        self.ticks += 1
+
+        # collect this tick's data
+        good_data = True
+        if self.sample is not None:
+            good_data = self.sample(self)
+        # end if
+
+        # run the periodic actions of this state
+        error = self._run_actions(self.state)
+
+        if error is not None:
+            print("Action failed in state " + str(self.state.name) + ": " +
+                  error)
+
+            if self.fault_state is None:
+                raise ActionError('Action failed in state ' +
+                                  str(self.state.name))
+            # end if
+
+            # the last checkpoint is kept as it is, so the sequence can be
+            # resumed from before the failure
+            self.faulted = True
+            self.enter(self.fault_state)
+            return self.state.final
+        # end if
+
+        # check the transitions out of this state
+        state = self.state
+        if good_data:
+            for transition in self.state.transitions:
+                if transition.check(self):
+                    self.enter(transition.target)
+                    break
+                # end if
+            # end for
+        # end if
+
+        if ((self.state is state) and (self.state.timeout is not None) and
+            (self.time_in_state() > self.state.timeout)):
+            self.enter(self.state.timeout_target)
+        # end if
+
+        # save progress on every state change and periodically otherwise
+        if ((self.checkpoint is not None) and
+            ((self.state is not state) or
+             self.checkpoint.due(self.clock.time()))):
+            self.checkpoint.save(self)
+        # end if
+
+        return self.state.final
+    # end def
+
+    def run(self):
+        """
+        Run the sequence until a final state is reached
+        """
+        try:
+            if self.state is None:
+                self.start()
+            # end if
+
+            while not self.step():
+                self.wait()
+            # end while
+
+            if (self.checkpoint is not None) and not self.faulted:
+                self.checkpoint.remove()
+            # end if
+        finally:
+            self.close()
+        # end try
+    # end def
+
+    def wait(self):
+        """
+        Sleep until the next tick, which is one sample period after the last
+        deadline so that the time taken by the tick does not add to the period.
+        The sampler only chooses the period in adaptive states.
+        """
+        if (self.sampler is not None) and self.state.adaptive:
+            self.scheduler.wait(self.sampler.period)
+
+        else:
+            self.scheduler.wait(self.state.sample_period)
+        # end if
+    # end def
+
+    def close(self):
+        """
+        Stop the threads used to run actions
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        # end if
+    # end def
+
+    def _run_actions(self, state):
+        """
+        Run the actions of a state in order, stopping at the first to fail,
+        or all at the same time if the state allows it
+
+        @param[in] state     The State whose actions to run (State)
+        @return    (string)  The formatted exception of the first action to
+                             fail, None if they all succeeded
+        """
+        if state.concurrent and (len(state.actions) > 1):
+            if self._pool is None:
+                self._pool = ThreadPool(self.workers)
+            # end if
+
+            pending = [self._pool.apply_async(_run_action, (action, self))
+                       for action in state.actions]
+            results = [result.get() for result in pending]
+
+            for error in results:
+                if error is not None:
+                    return error
+                # end if
+            # end for
+
+        else:
+            for action in state.actions:
+                error = _run_action(action, self)
+
+                if error is not None:
+                    return error
+                # end if
+            # end for
+        # end if
+
+        return None
+    # end def
+# end class
+
+
+#
+# ----------------
+# Private Functions
+
+def _run_action(action, sequence):
+    """
+    Run an action, catching any exception
+
+    @param[in]  action     Function of the Sequence
+    @param[in]  sequence   The Sequence being run
+    @return     (string)   The formatted exception or None if it succeeded
+    """
+    try:
+        action(sequence)
+        return None
+
+    except Exception:
+        return traceback.format_exc()
+    # end try
+# end def
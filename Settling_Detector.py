@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+###########################################################################
+#(C) Copyright Pumpkin, Inc. All Rights Reserved.
+#
+#This file may be distributed under the terms of the License
+#Agreement provided with this software.
+#
+#THIS FILE IS PROVIDED AS IS WITH NO WARRANTY OF ANY KIND,
+#INCLUDING THE WARRANTY OF DESIGN, MERCHANTABILITY AND
+#FITNESS FOR A PARTICULAR PURPOSE.
+###########################################################################
+"""
+@package Settling_Detector.py
+Module to decide when readings taken after a setpoint change have settled,
+so that a stepped test can move on as soon as they are steady rather than
+after a fixed dwell.
+"""
+
+__author__ = 'David Wright (david@asteriaec.com)'
+__version__ = '0.1.0' #Versioning: http://www.python.org/dev/peps/pep-0386/
+
+
+#
+# -------
+# Imports
+
+import collections
+import time
+
+import numpy
+
+# ---------
+# Constants
+
+# the fewest samples in the window that settling is judged from
+default_min_samples = 3
+
+#
+# ---------
+# Classes
+
+class SettlingDetector(object):
+    """
+    Class that watches one or more signals after a setpoint change. The
+    signals have settled once the samples of the last window span the whole
+    window and, for every signal, the slope of a straight line fitted to
+    them and the scatter of the samples about that line are both within
+    their thresholds. If that has not happened by the maximum dwell the
+    detector times out, so a signal that never settles cannot stall a test.
+
+    @attribute window            (float)  The time the signals are judged
+                                          over (s)
+    @attribute slope_thresholds  (list)   The largest slope of each signal
+                                          that is steady (units/s)
+    @attribute noise_thresholds  (list)   The largest standard deviation of
+                                          each signal about its fit that is
+                                          steady (units)
+    @attribute max_dwell         (float)  The longest time to wait (s)
+    @attribute min_samples       (int)    The fewest samples judged from
+    @attribute start_time        (float)  When the setpoint changed (s)
+    @attribute settled           (bool)   The signals have settled
+    @attribute timed_out         (bool)   The maximum dwell has passed
+                                          without the signals settling
+    @attribute settling_time     (float)  The time from the setpoint change to
+                                          settling, or to the time out (s),
+                                          None until one of them happens
+    """
+
+    def __init__(self, window, slope_thresholds, noise_thresholds, max_dwell,
+                 min_samples = default_min_samples):
+        """
+        Initialise the SettlingDetector Object
+
+        @param[in] window             The time to judge the signals over in
+                                      seconds (float)
+        @param[in] slope_thresholds   The steady slope of each signal, or one
+                                      for a single signal (list or float)
+        @param[in] noise_thresholds   The steady standard deviation of each
+                                      signal (list or float)
+        @param[in] max_dwell          The longest time to wait in seconds
+                                      (float)
+        @param[in] min_samples        The fewest samples to judge from (int)
+        """
+        self.slope_thresholds = _as_list(slope_thresholds)
+        self.noise_thresholds = _as_list(noise_thresholds)
+
+        if len(self.slope_thresholds) != len(self.noise_thresholds):
+            raise ValueError('There must be a slope and a noise threshold '
+                             'for each signal')
+        # end if
+
+        if window > max_dwell:
+            raise ValueError('The settling window must not exceed the '
+                             'maximum dwell')
+        # end if
+
+        self.window = window
+        self.max_dwell = max_dwell
+        self.min_samples = max(min_samples, 2)
+        self.start()
+    # end def
+
+    def start(self, start_time = None):
+        """
+        Begin watching for settling after a setpoint change
+
+        @param[in]  start_time   When the setpoint changed in seconds, the
+                                 time of the first sample by default (float)
+        """
+        self.start_time = start_time
+        self.settled = False
+        self.timed_out = False
+        self.settling_time = None
+
+        self.samples = collections.deque()
+    # end def
+
+    def done(self):
+        """
+        @return   (bool)   True once the signals have settled or the detector
+                           has timed out
+        """
+        return self.settled or self.timed_out
+    # end def
+
+    def add(self, sample_time, values):
+        """
+        Add a sample and judge whether the signals have settled
+
+        @param[in]  sample_time   When the sample was taken in seconds (float)
+        @param[in]  values        The value of each signal, or the value of a
+                                  single signal (list or float)
+        @return     (bool)        True once the signals have settled or the
+                                  detector has timed out
+        """
+        values = _as_list(values)
+        if len(values) != len(self.slope_thresholds):
+            raise ValueError('Expected ' + str(len(self.slope_thresholds)) +
+                             ' values, got ' + str(len(values)))
+        # end if
+
+        if self.done():
+            return True
+        # end if
+
+        if self.start_time is None:
+            self.start_time = sample_time
+        # end if
+
+        self.samples.append((sample_time, values))
+
+        # keep the samples of the last window, and the one before it so the
+        # samples can be seen to span the whole window
+        while ((len(self.samples) > 1) and
+               (self.samples[1][0] <= sample_time - self.window)):
+            self.samples.popleft()
+        # end while
+
+        dwell = sample_time - self.start_time
+
+        if self._steady():
+            self.settled = True
+            self.settling_time = dwell
+
+        elif dwell >= self.max_dwell:
+            self.timed_out = True
+            self.settling_time = dwell
+        # end if
+
+        return self.done()
+    # end def
+
+    def mean(self):
+        """
+        @return   (list)   The mean of each signal over the window
+        """
+        return list(numpy.mean([values for _, values in self.samples],
+                               axis = 0))
+    # end def
+
+    def _steady(self):
+        """
+        @return   (bool)   True if the samples span the window and every
+                           signal is within its thresholds
+        """
+        if ((len(self.samples) < self.min_samples) or
+            (self.samples[-1][0] - self.samples[0][0] < self.window)):
+            return False
+        # end if
+
+        times = numpy.array([sample_time for sample_time, _ in self.samples])
+        values = numpy.array([values for _, values in self.samples])
+        times = times - times.mean()
+        spread = numpy.dot(times, times)
+
+        if spread <= 0:
+            return False
+        # end if
+
+        for index in range(values.shape[1]):
+            signal = values[:, index] - values[:, index].mean()
+            slope = numpy.dot(times, signal)/spread
+            noise = numpy.std(signal - slope*times)
+
+            if ((abs(slope) > self.slope_thresholds[index]) or
+                (noise > self.noise_thresholds[index])):
+                return False
+            # end if
+        # end for
+
+        return True
+    # end def
+# end class
+
+
+#
+# ----------------
+# Public Functions
+
+def wait_until_settled(detector, read, period, clock = time.time,
+                       sleep = time.sleep):
+    """
+    Read the signals every period until they settle or the detector times
+    out. The detector is started at the call.
+
+    @param[in]  detector   The detector (SettlingDetector)
+    @param[in]  read       Returns the value of each signal (function)
+    @param[in]  period     The time between readings in seconds (float)
+    @param[in]  clock      Returns the time in seconds (function)
+    @param[in]  sleep      Waits a number of seconds (function)
+    @return     (float)    The settling time in seconds
+    """
+    detector.start(clock())
+
+    while not detector.add(clock(), read()):
+        sleep(period)
+    # end while
+
+    return detector.settling_time
+# end def
+
+
+#
+# ----------------
+# Private Functions
+
+def _as_list(values):
+    """
+    @param[in]  values   A value or a sequence of values
+    @return     (list)   The values as a list
+    """
+    if isinstance(values, (list, tuple, numpy.ndarray)):
+        return list(values)
+    # end if
+
+    return [values]
+# end def
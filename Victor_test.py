@@ -5,7 +5,50 @@
 # (C) Andrew Tridgell 2011
 # Released under GNU GPLv3 or later
 
-import usb
+import threading
+import Queue
+import time
+
+# pyusb is only needed when talking to a real meter
+try:
+    import usb
+except ImportError:
+    usb = None
+
+# Victor 86B LCD segment decoding
+VICTOR86B_DIGITS = { 0x42: '0', 0x61: '1', 0x04: '2', 0xE6: '3', 0xA5: '4', 0x2E: '5',
+                     0x4E: '6', 0xE1: '7', 0x46: '8', 0x26: '9', 0x67: ' ', 0xC8: 'L' }
+VICTOR86B_UNITS = { (0x8F, 0x6E, 0xAc) : "Hz",
+                    (0xBF, 0x6E, 0x6C) : "C",
+                    (0x8F, 0x6E, 0x8C) : "V",
+                    (0x8F, 0x6E, 0x6C) : "Ohm",
+                    (0x8F, 0xAE, 0x6C) : "kOhm",
+                    (0x8F, 0x7E, 0x7C) : "uA",
+                    (0x8F, 0x6E, 0x7C) : "A",
+                    }
+VICTOR86B_OFFSETS = [ 0, 0, 0xEF, 0x01 ]
+VICTOR86B_FRAME_LENGTH = 14
+
+def _build_digit_tables():
+    '''precompute the text for every raw value of each of the 4 digits'''
+    tables = []
+    for i in range(0,4):
+        table = [None]*256
+        for raw in range(0,256):
+            val = (raw + VICTOR86B_OFFSETS[i]) & 0xFF
+            text = ""
+            if val & 0x10:
+                if i == 0:
+                    text = "-"
+                else:
+                    text = "."
+            val &= 0xEF
+            if val in VICTOR86B_DIGITS:
+                table[raw] = text + VICTOR86B_DIGITS[val]
+        tables.append(table)
+    return tables
+
+VICTOR86B_DIGIT_TABLES = _build_digit_tables()
 
 class DMMException(Exception):
     '''an exception class for DMM errors'''
@@ -59,6 +102,10 @@ class DMM(object):
 
     def read(self):
         '''read a set of data'''
+        return self.read_raw()
+
+    def read_raw(self):
+        '''read one raw interrupt transfer'''
         ret = DMMData()
         try:
             data = self.handle.interruptRead(self.idEndpoint, self.readSize)
@@ -71,7 +118,7 @@ class DMM(object):
                     print("%2d " % i),
                 print
         except usb.USBError, e:
-            if str(e).find("No data available"):
+            if str(e).find("No data available") != -1:
                 raise DMMTimeout(e)
             raise DMMDeviceError(e)
         return ret
@@ -87,53 +134,113 @@ class DMM_Victor86B(DMM):
         tries = 4
         while tries > 0:
             tries -= 1
-            ret = DMM.read(self)
-            if len(ret.rawData) != 14:
+            ret = self.read_raw()
+            if len(ret.rawData) != VICTOR86B_FRAME_LENGTH:
                 continue
-            if ret.rawData[11:14] == ( 0, 0, 0):
+            if tuple(ret.rawData[11:14]) == ( 0, 0, 0):
                 continue
             break
         if tries == 0:
             raise DMMDataError("Bad DMM data: %s" % ret.rawData)
-        digmap = { 0x42: '0', 0x61: '1', 0x04: '2', 0xE6: '3', 0xA5: '4', 0x2E: '5',
-                   0x4E: '6', 0xE1: '7', 0x46: '8', 0x26: '9', 0x67: ' ', 0xC8: 'L' }
-        units = { (0x8F, 0x6E, 0xAc) : "Hz",
-                  (0xBF, 0x6E, 0x6C) : "C",
-                  (0x8F, 0x6E, 0x8C) : "V",
-                  (0x8F, 0x6E, 0x6C) : "Ohm",
-                  (0x8F, 0xAE, 0x6C) : "kOhm",
-                  (0x8F, 0x7E, 0x7C) : "uA",
-                  (0x8F, 0x6E, 0x7C) : "A",
-                  }
-        v = [(ret.rawData[10] & 0xF0) | (ret.rawData[3]>>4),
-             (ret.rawData[9]  & 0xF0) | (ret.rawData[6]>>4),
-             (ret.rawData[7]  & 0xF0) | (ret.rawData[5]>>4),
-             (ret.rawData[0]  & 0xF0) | (ret.rawData[2]>>4)]
-        offsets = [ 0, 0, 0xEF, 0x01 ]
-        ret.lcd = ""
-        for i in range(0,4):
-            val = v[i]
-            val += offsets[i]
-            val &= 0xFF
-            if val & 0x10:
-                if i == 0:
-                    ret.lcd += "-"
-                else:
-                    ret.lcd += "."
-            val &= 0xEF
-            if not val in digmap:
-                raise DMMDataError("Digit %d invalid value 0x%02X" % (i+1, val))
-            else:
-                ret.lcd += digmap[val]
-        ret.mode = ""
-        u = (ret.rawData[11], ret.rawData[12], ret.rawData[13])
-        if u in units:
-            ret.units = units[u]
-        if ret.rawData[1] == 0x47 and ret.rawData[4] == 0x71:
-            ret.mode = "AC"
-        if ret.rawData[1] == 0x57 and ret.rawData[4] == 0x71:
-            ret.mode = "DC"
-        return ret
+        return decode_victor86b(ret)
+
+
+def decode_victor86b(ret):
+    '''decode the LCD contents of a raw Victor 86B frame into ret'''
+    d = ret.rawData
+    v = [(d[10] & 0xF0) | (d[3]>>4),
+         (d[9]  & 0xF0) | (d[6]>>4),
+         (d[7]  & 0xF0) | (d[5]>>4),
+         (d[0]  & 0xF0) | (d[2]>>4)]
+    digits = []
+    for i in range(0,4):
+        text = VICTOR86B_DIGIT_TABLES[i][v[i]]
+        if text is None:
+            raise DMMDataError("Digit %d invalid value 0x%02X" % (
+                i+1, ((v[i] + VICTOR86B_OFFSETS[i]) & 0xEF)))
+        digits.append(text)
+    ret.lcd = "".join(digits)
+    ret.mode = ""
+    ret.units = VICTOR86B_UNITS.get((d[11], d[12], d[13]), ret.units)
+    if d[1] == 0x47 and d[4] == 0x71:
+        ret.mode = "AC"
+    if d[1] == 0x57 and d[4] == 0x71:
+        ret.mode = "DC"
+    return ret
+
+
+class DMMStreamReader(threading.Thread):
+    '''background thread that keeps interrupt reads flowing from a DMM and
+    queues timestamped readings
+
+    readings are (time, DMMData) tuples in a bounded queue, when the queue
+    is full the oldest reading is dropped to make room for the newest. The
+    meter sends frames continuously, so after max_timeouts timeouts in a
+    row it is taken to have gone away and the thread stops'''
+    def __init__(self, dmm, maxsize=1024, max_timeouts=100):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.dmm = dmm
+        self.readings = Queue.Queue(maxsize)
+        self.frames = 0
+        self.timeouts = 0
+        self.max_timeouts = max_timeouts
+        self.bad_frames = 0
+        self.dropped = 0
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        consecutive = 0
+        while not self._stop_event.is_set():
+            try:
+                ret = self.dmm.read_raw()
+            except DMMTimeout, e:
+                self.timeouts += 1
+                consecutive += 1
+                if (self.max_timeouts is not None and
+                        consecutive >= self.max_timeouts):
+                    self.error = e
+                    break
+                continue
+            except DMMDeviceError, e:
+                # the device has gone away so stop streaming
+                self.error = e
+                break
+            consecutive = 0
+            sample_time = time.time()
+            if (len(ret.rawData) != VICTOR86B_FRAME_LENGTH or
+                    tuple(ret.rawData[11:14]) == (0, 0, 0)):
+                self.bad_frames += 1
+                continue
+            try:
+                decode_victor86b(ret)
+            except DMMDataError:
+                self.bad_frames += 1
+                continue
+            self.frames += 1
+            self._put((sample_time, ret))
+
+    def _put(self, reading):
+        while True:
+            try:
+                self.readings.put_nowait(reading)
+                return
+            except Queue.Full:
+                try:
+                    self.readings.get_nowait()
+                    self.dropped += 1
+                except Queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        '''get the oldest queued (time, DMMData) reading'''
+        return self.readings.get(timeout=timeout)
+
+    def stop(self):
+        '''stop reading and wait for the thread to finish'''
+        self._stop_event.set()
+        self.join()
 
 
 ############################################
@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+from Adaptive_Sampler import AdaptiveSampler
+
+
+class AdaptiveSamplerTest(TestCase):
+    def setUp(self):
+        self.sampler = AdaptiveSampler(1, 60, 0.001, 0.01, backoff=2)
+
+    def run_samples(self, voltages, currents=None):
+        t = 0
+        periods = []
+        for i in range(len(voltages)):
+            current = currents[i] if currents else 0.5
+            periods.append(self.sampler.update(t, voltages[i], current))
+            t += periods[-1]
+        return periods
+
+    def test_backs_off_when_steady(self):
+        """ The period doubles up to the maximum while nothing changes.
+        """
+        periods = self.run_samples([4.0]*10)
+        self.assertEqual([2, 4, 8, 16, 32, 60, 60, 60, 60, 60], periods)
+
+    def test_voltage_transient(self):
+        """ A fast voltage change returns the period to the minimum.
+        """
+        self.run_samples([4.0]*5)
+        period = self.sampler.period
+        sample_time = self.sampler.last_time + period
+        self.assertEqual(1, self.sampler.update(sample_time, 4.0 - 0.002*period, 0.5))
+
+    def test_current_step(self):
+        """ A current step returns the period to the minimum.
+        """
+        periods = self.run_samples([4.0]*6, [0.5]*5 + [1.0])
+        self.assertEqual(1, periods[-1])
+
+    def test_trigger(self):
+        """ An event shortens the next period before the signals move.
+        """
+        self.run_samples([4.0]*5)
+        self.sampler.trigger()
+        self.assertEqual(1, self.sampler.period)
+        self.assertEqual(1, self.sampler.update(1000, 4.0, 0.5))
+        self.assertEqual(2, self.sampler.update(1001, 4.0, 0.5))
@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+import BM2_aardvark
+import Battery_Sim
+
+
+class BatterySimTest(TestCase):
+    def setUp(self):
+        self.clock = Battery_Sim.VirtualClock(start=0)
+        self.pack = Battery_Sim.SimPack(clock=self.clock, soc=0.5)
+        self.BM = BM2_aardvark.BM2(backend=Battery_Sim.SimSMBus(self.pack))
+        self.load = Battery_Sim.SimMaynuo(self.pack)
+        self.PS = Battery_Sim.SimKorad(self.pack)
+
+    def wait_for(self, condition, limit=20000):
+        """ Step the clock a second at a time until the condition holds.
+        """
+        for i in range(limit):
+            self.clock.sleep(1)
+            self.assertTrue(self.BM.update_data())
+            if condition():
+                return i
+        self.fail('condition not reached')
+
+    def test_registers(self):
+        """ The gauge registers read back through the BM2 driver.
+        """
+        with self.BM:
+            self.assertTrue(self.BM.update_data())
+            self.assertEqual(8400, self.BM.get_ChargingVoltage())
+            self.assertEqual(Battery_Sim.taper_current, self.BM.get_TaperCurrent())
+            self.assertEqual('0x00', self.BM.Data.UpdateStatus)
+            self.assertAlmostEqual(self.pack.voltage()*1000, self.BM.Data.Voltage, delta=1)
+
+    def test_learning_sequence(self):
+        """ A discharge, charge, discharge cycle produces the learning flags.
+        """
+        with self.BM:
+            self.load.setConstantCurrent(2.4)
+            self.load.setMode('constant_current')
+            self.load.on()
+            self.wait_for(self.BM.get_CUV)
+            self.assertEqual(-2400, self.BM.Data.Current)
+            self.load.off()
+
+            self.BM.write_data(['0x00', '0x21', '0x00'])
+            self.BM.update_data()
+            self.assertTrue(self.BM.get_QEN())
+
+            self.PS.channels[0].voltage = 8.4
+            self.PS.channels[0].current = 3.5
+            self.PS.output.on()
+            self.wait_for(self.BM.get_FC)
+            self.assertEqual('constant_voltage', self.PS.status.channel1.name)
+            self.PS.output.off()
+
+            self.wait_for(lambda: not self.BM.get_VOK())
+            self.assertEqual(3, self.BM.Data.MaxError)
+            self.assertEqual('0x0D', self.BM.Data.UpdateStatus)
+
+            self.load.on()
+            self.wait_for(self.BM.get_CUV)
+            self.load.off()
+
+            self.wait_for(lambda: not self.BM.get_VOK())
+            self.assertEqual(1, self.BM.Data.MaxError)
+            self.assertEqual('0x0E', self.BM.Data.UpdateStatus)
+
+    def test_power_switch(self):
+        """ The aardvark SS pin disconnects the pack from the load.
+        """
+        with self.BM:
+            self.load.setConstantCurrent(1.0)
+            self.load.on()
+            self.BM.gpio_set(0)
+            self.clock.sleep(10)
+            self.assertEqual(0.0, self.load.getCurrent())
+
+            self.BM.gpio_set(BM2_aardvark.GPIO_SS)
+            self.clock.sleep(10)
+            self.assertAlmostEqual(1.0, self.load.getCurrent())
@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+from Coulomb_Counter import CoulombCounter
+
+
+class CoulombCounterTest(TestCase):
+    def test_trapezoid(self):
+        """ Charge and energy are integrated with the trapezoidal rule.
+        """
+        counter = CoulombCounter()
+        counter.add(0, 4.0, 1.0)
+        counter.add(1800, 3.0, 2.0)
+
+        self.assertAlmostEqual(0.75, counter.amp_hours)
+        self.assertAlmostEqual(2.5, counter.watt_hours)
+        self.assertAlmostEqual(1800, counter.duration)
+
+    def test_gaps(self):
+        """ Long and out of order intervals are not integrated.
+        """
+        counter = CoulombCounter(max_gap=10)
+        counter.add(0, 4.0, 3.6)
+        counter.add(10, 4.0, 3.6)
+        counter.add(100, 4.0, 3.6)
+        counter.add(50, 4.0, 3.6)
+        counter.add(110, 4.0, 3.6)
+
+        self.assertAlmostEqual(0.02, counter.amp_hours)
+        self.assertEqual(1, counter.gaps)
+        self.assertAlmostEqual(90, counter.gap_time)
+        self.assertEqual(4, counter.samples)
+        self.assertIn('1 gaps', counter.report())
+
+    def test_targets(self):
+        """ Targets are reached by the magnitude of either total.
+        """
+        counter = CoulombCounter(capacity_target=1.0)
+        counter.add(0, 4.0, -3.6)
+        counter.add(900, 4.0, -3.6)
+        self.assertFalse(counter.target_reached())
+        counter.add(1000, 4.0, -3.6)
+        self.assertTrue(counter.target_reached())
+
+        counter.reset()
+        self.assertFalse(counter.target_reached())
+        self.assertEqual(0.0, counter.amp_hours)
+
+        counter = CoulombCounter(energy_target=1.0)
+        counter.add(0, 4.0, 1.0)
+        counter.add(900, 4.0, 1.0)
+        self.assertTrue(counter.target_reached())
@@ -0,0 +1,125 @@
+import math
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy
+
+import Cycle_Report
+
+HEADINGS = ('time,voltage,current,ChargingVoltage,ChargingCurrent,'
+            'OperationStatus,SafetyAlert,MaxError,BatteryStatus,CellVoltage1,'
+            'CellVoltage2,CellVoltage3,CellVoltage4,UpdateStatus\n')
+
+
+def learning_log(filename):
+    """ A 2 Ah discharge to CUV, a rest, a 2.5 Ah charge to FC, a rest and a
+        2.4 Ah final discharge to CUV, sampled every 10 s, with failed
+        reads part way through.
+    """
+    phases = [(-2000, 3600, 0), (0, 600, 0x80), (2500, 3600, 0),
+              (0, 600, 0x20), (-2000, 4320, 0), (0, 600, 0x80)]
+    rows = []
+    time = 0.0
+    for current, duration, flags in phases:
+        for _ in range(int(duration/10)):
+            voltage = 7000 if current < 0 else 8000
+            cell = 3400 if current < 0 else 3900
+            rows.append([time, voltage, current, 8400, 3500, 32833,
+                         flags & 0x80, 3, 199 | (flags & 0x20), cell,
+                         cell - 10, 0, 0, '0x04'])
+            time += 10
+
+    rows[500] = [rows[500][0]] + [257]*12 + ['0x01']
+    rows[400][9] = 257
+
+    with open(filename, 'w') as log_file:
+        log_file.write(HEADINGS)
+        for row in rows:
+            log_file.write(','.join([str(value) for value in row]) + '\n')
+
+
+class CycleReportTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.directory,
+                                     'log file 2019-01-01 00-00.csv')
+        learning_log(self.log_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_infer_states(self):
+        """ The states follow the current, FC and CUV, and brief changes
+            are ignored.
+        """
+        current = numpy.array([-1, -1, -1, 1, 1, -1, -1, -1, 0, 0, 0,
+                               1, 1, 1, 1, 0, 0, 0, -1, -1, -1, 0, 0, 0])
+        battery_status = numpy.zeros(len(current), dtype=int)
+        battery_status[14] = 0x20
+        safety_alert = numpy.zeros(len(current), dtype=int)
+
+        names = [Cycle_Report.states[index] for index in
+                 Cycle_Report.infer_states(current, battery_status,
+                                           safety_alert)]
+        self.assertEqual(['INITIAL_DISCHARGE']*8 + ['LOW_REST']*3 +
+                         ['CHARGE']*3 + ['VOK_WAIT']*4 +
+                         ['FINAL_DISCHARGE']*3 + ['MAX_ERROR_WAIT']*3,
+                         names)
+
+    def test_summarise(self):
+        """ Capacity, energy and time in each state are integrated from the
+            log, and failed reads are left out.
+        """
+        result = Cycle_Report.summarise_run(
+            Cycle_Report.load_log(self.log_file))
+
+        self.assertAlmostEqual(2.4, result['discharge_capacity'], places=2)
+        self.assertAlmostEqual(2.5, result['charge_capacity'], places=2)
+        self.assertAlmostEqual(16.8, result['discharge_energy'], places=1)
+        self.assertAlmostEqual(20.0, result['charge_energy'], places=1)
+        self.assertAlmostEqual(0.96, result['coulombic_efficiency'],
+                               places=2)
+        self.assertAlmostEqual(0.84, result['energy_efficiency'], places=2)
+        self.assertAlmostEqual(3600, result['state_time']['CHARGE'],
+                               delta=20)
+        self.assertAlmostEqual(600, result['state_time']['VOK_WAIT'],
+                               delta=20)
+        self.assertAlmostEqual(3.39, result['min_cell_voltage'])
+        self.assertEqual(2, result['min_cell'])
+        self.assertEqual(1331, result['samples'])
+
+    def test_report(self):
+        """ Results are cached by log and written as a table, empty where
+            a run has no value.
+        """
+        cache_dir = os.path.join(self.directory, 'cache')
+        partial = os.path.join(self.directory,
+                               'log file 2019-01-02 00-00.csv')
+        with open(self.log_file) as log_file:
+            lines = log_file.readlines()
+        with open(partial, 'w') as log_file:
+            log_file.writelines(lines[:200])
+        empty = os.path.join(self.directory, 'log file 2019-01-03 00-00.csv')
+        with open(empty, 'w') as log_file:
+            log_file.write(HEADINGS)
+
+        results = Cycle_Report.report_all([self.log_file, partial, empty],
+                                          cache_dir, processes=2)
+        self.assertEqual([self.log_file, partial], sorted(results))
+        self.assertEqual(2, len(os.listdir(cache_dir)))
+        self.assertTrue(math.isnan(results[partial]['coulombic_efficiency']))
+
+        cached = Cycle_Report.report_file(self.log_file, cache_dir)
+        self.assertAlmostEqual(results[self.log_file]['charge_capacity'],
+                               cached['charge_capacity'])
+
+        report = os.path.join(self.directory, 'report.csv')
+        Cycle_Report.write_report(results, report)
+        with open(report) as report_file:
+            rows = [line.rstrip('\n').split('\t') for line in report_file]
+        self.assertEqual(3, len(rows))
+        self.assertEqual('log file 2019-01-01 00-00', rows[1][0])
+        self.assertEqual('96.0', rows[1][6][:4])
+        self.assertEqual('', rows[2][6])
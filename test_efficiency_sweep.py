@@ -0,0 +1,207 @@
+import math
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import Efficiency_Sweep
+import Log_Reader
+import Settling_Detector
+
+
+class FakeSupply(object):
+    def __init__(self):
+        self.voltage = 0.0
+        self.load_power = 0.0
+        self.on = False
+
+    def set_voltage(self, volts):
+        self.voltage = volts
+
+    def set_current(self, amps):
+        pass
+
+    def output_on(self):
+        self.on = True
+
+    def output_off(self):
+        self.on = False
+
+    def get_output_voltage(self):
+        return self.voltage
+
+    def get_output_current(self):
+        # 80% efficient with a 0.1 W overhead
+        return (self.load_power/0.8 + 0.1)/self.voltage
+
+
+class FakeLoad(object):
+    def __init__(self, supply, failures=0):
+        self.supply = supply
+        self.failures = failures
+        self.reopened = 0
+        self.readings = 0
+
+    def set_mode(self, mode, value):
+        self.supply.load_power = value
+
+    def load_on(self):
+        pass
+
+    def load_off(self):
+        pass
+
+    def re_enter(self):
+        self.reopened += 1
+
+    def get_current(self):
+        self.readings += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise IOError('no response')
+        return self.supply.load_power/5.0
+
+    def get_voltage(self):
+        return 5.0
+
+
+class EfficiencySweepTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.efficiency_file = os.path.join(self.directory, 'Efficiency.csv')
+        self.voltage_file = os.path.join(self.directory, 'Voltage.csv')
+        self.points_file = os.path.join(self.directory, 'Points.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_sweep(self):
+        """ Every point is measured, reported and written to the grids.
+        """
+        supply = FakeSupply()
+        load = FakeLoad(supply, failures=2)
+        grid = Efficiency_Sweep.SweepGrid([12.0, 9.0], [1.0, 2.0, 4.0])
+        points = []
+
+        Efficiency_Sweep.run_sweep(supply, load, grid, 0, 5, 4,
+                                   self.efficiency_file, self.voltage_file,
+                                   point_callback=lambda row, column:
+                                   points.append((row, column)))
+
+        self.assertEqual(6, len(points))
+        self.assertEqual(2, load.reopened)
+        self.assertFalse(supply.on)
+        self.assertAlmostEqual(1.0, grid.progress())
+        self.assertAlmostEqual(1.0/(1.0/0.8 + 0.1), grid.efficiency[0, 0])
+
+        efficiency = Log_Reader.read_grid(self.efficiency_file)
+        self.assertEqual([12.0, 9.0], list(efficiency.voltage))
+        self.assertEqual([1.0, 2.0, 4.0], list(efficiency.power))
+        self.assertAlmostEqual(grid.efficiency[1, 2], efficiency.values[1, 2])
+        self.assertEqual(5.0, Log_Reader.read_grid(
+            self.voltage_file).values[0, 1])
+
+    def test_partial_grid(self):
+        """ Only the measured rows are written, failed points left empty.
+        """
+        grid = Efficiency_Sweep.SweepGrid([12.0, 9.0], [1.0, 2.0])
+        grid.set(0, 0, 0.5, 5.0)
+        grid.set(0, 1, None, None)
+        grid.write(self.efficiency_file, self.voltage_file)
+
+        efficiency = Log_Reader.read_grid(self.efficiency_file)
+        self.assertEqual([12.0], list(efficiency.voltage))
+        self.assertEqual(0.5, efficiency.values[0, 0])
+        self.assertTrue(math.isnan(efficiency.values[0, 1]))
+
+    def test_order_points(self):
+        """ Rows are swept up and down alternately from the nearest end.
+        """
+        points = [(0, 0), (0, 2), (1, 0), (1, 1), (1, 2), (2, 1)]
+        self.assertEqual([(0, 0), (0, 2), (1, 2), (1, 1), (1, 0), (2, 1)],
+                         Efficiency_Sweep.order_points(points))
+        self.assertEqual([(2, 1), (1, 2), (1, 1), (1, 0), (0, 0), (0, 2)],
+                         Efficiency_Sweep.order_points(points, (2, 2)))
+
+    def test_adaptive_sweep(self):
+        """ Refinement follows the steep low power end and the grid is
+            resumed from the points log without measuring again.
+        """
+        powers = [0.25*(i + 1) for i in range(33)]
+        grid = Efficiency_Sweep.SweepGrid([12.0, 10.0, 8.0], powers)
+        supply = FakeSupply()
+        load = FakeLoad(supply)
+
+        Efficiency_Sweep.run_adaptive_sweep(
+            supply, load, grid, 0, 5, 4, self.efficiency_file,
+            self.voltage_file, self.points_file, coarse_step=8,
+            gradient_threshold=0.01)
+
+        measured = grid.measured.sum()
+        self.assertTrue(measured < grid.measured.size/2)
+        self.assertTrue(grid.measured[0, :4].all())
+
+        truth = [power/(power/0.8 + 0.1) for power in powers]
+        filled = Log_Reader.read_grid(self.efficiency_file).values
+        for row in filled:
+            for value, expected in zip(row, truth):
+                self.assertAlmostEqual(expected, value, delta=0.01)
+
+        resumed = Efficiency_Sweep.SweepGrid([12.0, 10.0, 8.0], powers)
+        self.assertEqual(measured, resumed.load_points(self.points_file))
+        self.assertEqual(measured, resumed.measured.sum())
+
+        load = FakeLoad(supply)
+        Efficiency_Sweep.run_adaptive_sweep(
+            supply, load, resumed, 0, 5, 4, self.efficiency_file,
+            self.voltage_file, self.points_file, coarse_step=8,
+            gradient_threshold=0.01)
+        self.assertEqual(0, load.readings)
+
+    def test_settling(self):
+        """ With a detector each point waits until steady and the settling
+            time is logged.
+        """
+        supply = FakeSupply()
+        load = FakeLoad(supply)
+        grid = Efficiency_Sweep.SweepGrid([12.0], [1.0, 2.0])
+        detector = Settling_Detector.SettlingDetector(0.03, [0.1, 0.1],
+                                                      [0.01, 0.01], 1.0)
+
+        settle_period = Efficiency_Sweep.settle_period
+        Efficiency_Sweep.settle_period = 0.01
+        try:
+            Efficiency_Sweep.run_sweep(supply, load, grid, detector, 5, 4,
+                                       self.efficiency_file,
+                                       self.voltage_file, self.points_file)
+        finally:
+            Efficiency_Sweep.settle_period = settle_period
+
+        self.assertTrue((grid.settling_time >= 0.03).all())
+        self.assertTrue((grid.settling_time < 1.0).all())
+
+        resumed = Efficiency_Sweep.SweepGrid([12.0], [1.0, 2.0])
+        resumed.load_points(self.points_file)
+        self.assertTrue((resumed.settling_time == grid.settling_time).all())
+
+    def test_resume_settings(self):
+        """ A points log is only resumed for the converter and grid it was
+            started for.
+        """
+        grid = Efficiency_Sweep.SweepGrid([12.0, 9.0], [1.0, 2.0])
+        Efficiency_Sweep.new_points_log(self.points_file, 'PTH08T221WAZ',
+                                        grid)
+        supply = FakeSupply()
+        Efficiency_Sweep.run_sweep(supply, FakeLoad(supply), grid, 0, 5, 4,
+                                   self.efficiency_file, self.voltage_file,
+                                   self.points_file)
+
+        resumed = Efficiency_Sweep.SweepGrid([12.0, 9.0], [1.0, 2.0])
+        self.assertEqual(4, resumed.load_points(self.points_file,
+                                                'PTH08T221WAZ'))
+
+        self.assertRaises(ValueError, resumed.load_points, self.points_file,
+                          'TPS54331')
+        other = Efficiency_Sweep.SweepGrid([12.0, 9.0], [1.0, 2.0, 3.0])
+        self.assertRaises(ValueError, other.load_points, self.points_file,
+                          'PTH08T221WAZ')
@@ -0,0 +1,106 @@
+import io
+import math
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from Log_Reader import LogReader
+
+LEARNING_LOG = (
+    u'time,voltage,current,ChargingVoltage,ChargingCurrent,OperationStatus,'
+    u'SafetyAlert,MaxError,BatteryStatus,CellVoltage1,CellVoltage2,'
+    u'CellVoltage3,CellVoltage4,UpdateStatus\r\n'
+    u'1.5,7000,-500,8400,6000,32833,0,3,199,3575,3572,0,0,0x04\r\n'
+    u'\r\n'
+    u',,,,,,,,,,,,,\r\n'
+    u'2.5,6900,-500,8400,6000,32833,0,3,199,3575,3572,0,0,\r\n'
+    u'3.5,6800,-500,8400,6000,32833,0,3,199,35\r\n'
+    u'4.5,6700,bad,8400,6000,32833,0,3,199,3575,3572,0,0,0x0D\r\n'
+    u'5.5,6600,-500,8400,6000,32833,0,3,199,3575,3572,0,0,0x0D\r\n')
+
+HEATER_LOG = (
+    u'Heater validation test for Pumpkin BM Heater\n'
+    u'Serial Number\t105\n'
+    u'\n'
+    u'Time (s)\tHeater Voltage (V)\tVoltage\n'
+    u'0.3\t0.0\t16.5\n'
+    u'1.3\t5.0\t16.4\n')
+
+GRID = (
+    u'Adjusted Voltage,,Resistance,0.0895,,\n'
+    u',Power,0.1,0.3,0.5,\n'
+    u'Voltage,,,,,\n'
+    u'12.6,,5.01,5.02,5.03,\n'
+    u'12.4,,4.99,,4.97,\n')
+
+
+class LogReaderTest(TestCase):
+    def test_learning(self):
+        """ Learning logs are scaled to volts and amps and bad rows dropped.
+        """
+        reader = LogReader(io.StringIO(LEARNING_LOG), chunk_rows=2)
+        chunks = list(reader)
+
+        self.assertEqual('learning', reader.schema)
+        self.assertEqual([2, 1], [len(chunk['time']) for chunk in chunks])
+        self.assertEqual(3, reader.rows)
+        # the row of empty cells is blank, only the cut short and garbled
+        # rows are skipped
+        self.assertEqual(2, reader.skipped)
+        self.assertEqual('V', reader.units()['voltage'])
+        self.assertAlmostEqual(6.9, chunks[0]['voltage'][1])
+        self.assertEqual([4, -1], list(chunks[0]['update_status']))
+
+        data = LogReader(io.StringIO(LEARNING_LOG), convert=False,
+                         names=['voltage']).read_all()
+        # only the columns returned are read, so the bad current is not seen
+        self.assertEqual(['voltage'], list(data))
+        self.assertEqual([7000, 6900, 6700, 6600], list(data['voltage']))
+
+    def test_timed(self):
+        """ The preamble is kept and units are taken from the headings.
+        """
+        reader = LogReader(io.StringIO(HEATER_LOG))
+        data = reader.read_all()
+
+        self.assertEqual('timed', reader.schema)
+        self.assertEqual('\t', reader.delimiter)
+        self.assertEqual({'Serial Number': '105'}, reader.metadata)
+        self.assertEqual('V', reader.units()['heater_voltage'])
+        self.assertEqual([0.3, 1.3], list(data['time']))
+        self.assertEqual([16.5, 16.4], list(data['voltage']))
+
+    def test_grid(self):
+        """ Grids are returned a cell per row, empty cells as NaN.
+        """
+        reader = LogReader(io.StringIO(GRID))
+        data = reader.read_all()
+
+        self.assertEqual('grid', reader.schema)
+        self.assertEqual({'Resistance': '0.0895'}, reader.metadata)
+        self.assertEqual([12.6]*3 + [12.4]*3, list(data['input_voltage']))
+        self.assertEqual([0.1, 0.3, 0.5]*2, list(data['power']))
+        self.assertEqual(5.02, data['adjusted_voltage'][1])
+        self.assertTrue(math.isnan(data['adjusted_voltage'][4]))
+
+    def test_unicode_filename(self):
+        """ A log can be named by a unicode path, as glob and os.listdir
+            give for a unicode pattern.
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, u'log file.csv')
+            with io.open(filename, 'w', newline='') as log_file:
+                log_file.write(LEARNING_LOG)
+
+            reader = LogReader(filename)
+            self.assertEqual(3, len(reader.read_all()['time']))
+            reader.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_unknown(self):
+        """ A file that is not a log is refused.
+        """
+        self.assertRaises(ValueError, LogReader, io.StringIO(u'hello\n'))
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import TestCase
+
+from Log_Store import LogStore
+
+HEADER = ('time,voltage,current,ChargingVoltage,ChargingCurrent,'
+          'OperationStatus,SafetyAlert,MaxError,BatteryStatus,CellVoltage1,'
+          'CellVoltage2,CellVoltage3,CellVoltage4,UpdateStatus\r\n')
+
+
+def log_row(time, voltage, status):
+    return '%s,%d,-500,8400,6000,32833,0,3,199,3575,3572,0,0,%s\r\n' % (
+        time, voltage, status)
+
+
+class LogStoreTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log = os.path.join(self.directory, 'log file 2019-04-22 11-15.csv')
+
+        with open(self.log, 'w') as log_file:
+            log_file.write(HEADER)
+            log_file.write(log_row(1.5, 7000, '0x04'))
+            log_file.write('\r\n')
+            log_file.write(log_row(2.5, 6900, '0x04'))
+            log_file.write(log_row(3.5, 6800, '0xE4'))
+            log_file.write(HEADER)
+            log_file.write(log_row(4.5, 6700, '0x0D'))
+            log_file.write(log_row(5.5, 6600, '0x0D'))
+
+        self.zip = os.path.join(self.directory, 'learning logs.zip')
+        with zipfile.ZipFile(self.zip, 'w') as archive:
+            archive.writestr('run.csv', HEADER + log_row(0, 7100, '0x0E'))
+
+        self.store_dir = os.path.join(self.directory, 'store')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_catalog(self):
+        """ Logs are parsed into columns and summarised in the catalog.
+        """
+        store = LogStore(self.store_dir)
+        added = store.ingest([self.log], self.zip)
+
+        self.assertEqual(['log file 2019-04-22 11-15', 'learning logs/run'],
+                         added)
+        entry = store.catalog['log file 2019-04-22 11-15']
+        self.assertEqual(5, entry['rows'])
+        self.assertAlmostEqual(4.0, entry['duration'])
+        self.assertEqual([0x04, 0x0D], entry['states'])
+        self.assertEqual(6600, entry['min_voltage'])
+        self.assertEqual(7000, entry['max_voltage'])
+        self.assertEqual([-1] * 5,
+                         list(store.column(added[0], 'SafetyStatus')))
+
+        # the catalog is saved and unchanged logs are not ingested again
+        store = LogStore(self.store_dir)
+        self.assertEqual(2, len(store.catalog))
+        self.assertEqual([], store.ingest([self.log], self.zip))
+
+    def test_read(self):
+        """ Only the rows in the time range are returned.
+        """
+        store = LogStore(self.store_dir)
+        store.ingest([self.log])
+        name = 'log file 2019-04-22 11-15'
+
+        data = store.read(name, ['voltage'], start=2.0, end=5.0)
+        self.assertEqual([6900, 6800, 6700], list(data['voltage']))
+
+        start = store.catalog[name]['start_time']
+        results = list(store.query(['time'], after=start + 4, before=start + 6))
+        self.assertEqual(1, len(results))
+        self.assertEqual([4.5, 5.5], list(results[0][1]['time']))
+        self.assertEqual([name], store.names(state=0x0D))
+        self.assertEqual([], store.names(state=0x0E))
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from Log_Writer import LogWriter, recover
+
+
+class LogWriterTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'log file.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data, filename=None):
+        with open(filename or self.filename, 'wb') as log_file:
+            log_file.write(data)
+
+    def read(self, filename=None):
+        with open(filename or self.filename, 'rb') as log_file:
+            return log_file.read()
+
+    def test_recover(self):
+        """ A torn last line is removed and complete lines are kept.
+        """
+        self.write(b'time,voltage\n0,7400\n1,74')
+        self.assertEqual(4, recover(self.filename))
+        self.assertEqual(b'time,voltage\n0,7400\n', self.read())
+
+        self.assertEqual(0, recover(self.filename))
+        self.assertEqual(b'time,voltage\n0,7400\n', self.read())
+        self.assertEqual(0, recover(os.path.join(self.directory, 'none')))
+
+    def test_recover_single_line(self):
+        """ A file with no line end is kept rather than emptied.
+        """
+        self.write(b'time,voltage')
+        self.assertEqual(0, recover(self.filename))
+        self.assertEqual(b'time,voltage\n', self.read())
+
+        with LogWriter(self.filename, ['time', 'voltage']) as writer:
+            writer.writerow([0, 7400])
+        self.assertEqual(b'time,voltage\n0,7400\r\n', self.read())
+
+    def test_headers(self):
+        """ The headers are only written at the top of a new file.
+        """
+        for value in (7400, 7300):
+            with LogWriter(self.filename, ['time', 'voltage']) as writer:
+                writer.writerow([0, value])
+
+        self.assertEqual([b'time,voltage', b'0,7400', b'0,7300'],
+                         self.read().splitlines())
+
+    def test_rotation(self):
+        """ The log continues in numbered files once it reaches its size or
+            age limit.
+        """
+        with LogWriter(self.filename, ['time'], flush_interval=0,
+                       max_bytes=20) as writer:
+            for index in range(6):
+                writer.writerow([1000 + index])
+
+        rotated = os.path.join(self.directory, 'log file 1.csv')
+        self.assertEqual(self.filename, writer.base_filename)
+        self.assertEqual([b'time', b'1000', b'1001', b'1002'],
+                         self.read().splitlines())
+        self.assertEqual([b'time', b'1003', b'1004', b'1005'],
+                         self.read(rotated).splitlines())
+
+        aged = os.path.join(self.directory, 'aged.csv')
+        with LogWriter(aged, flush_interval=0, max_age=0.05) as writer:
+            writer.writerow([0])
+            time.sleep(0.06)
+            writer.writerow([1])
+        self.assertEqual(os.path.join(self.directory, 'aged 1.csv'),
+                         writer.filename)
+
+    def test_flush_interval(self):
+        """ Rows are buffered until the flush interval has passed.
+        """
+        writer = LogWriter(self.filename, flush_interval=0.05)
+        writer.open()
+        try:
+            writer.writerow([0])
+            self.assertEqual(b'', self.read())
+
+            time.sleep(0.06)
+            writer.writerow([1])
+            self.assertEqual([b'0', b'1'], self.read().splitlines())
+        finally:
+            writer.close()
@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import Measurement_Sources
+from Measurement_Sources import Channel, MeasurementSource
+from Multimeter_Sim import SimulatedDMM
+
+
+class CountingSource(MeasurementSource):
+    name = 'counting'
+    driver = 'json'
+    channels = [Channel('voltage', 'Voltage', 'V', True),
+                Channel('extra', None, None, False)]
+
+    def __init__(self, **settings):
+        self.reads = 0
+        MeasurementSource.__init__(self)
+
+    def open_device(self, driver):
+        self.driver_module = driver
+        return None
+
+    def read(self):
+        self.reads += 1
+        return {'voltage': float(self.reads)}
+
+    def read_channel(self, name):
+        return 'extra ' + str(self.reads)
+
+
+class MeasurementSourcesTest(TestCase):
+    def test_registry(self):
+        """ Sources are created by name and their driver is imported then.
+        """
+        self.assertEqual(['BM2', 'DMM', 'I2C'],
+                         sorted(Measurement_Sources.sources)[:3])
+        self.assertRaises(ValueError, Measurement_Sources.create, 'nothing')
+
+        Measurement_Sources.register(CountingSource)
+        try:
+            source = Measurement_Sources.create('counting', unused=1)
+        finally:
+            del Measurement_Sources.sources['counting']
+
+        self.assertEqual('json', source.driver_module.__name__)
+
+    def test_snapshot(self):
+        """ Channels are answered from one snapshot until it is refreshed.
+        """
+        source = CountingSource()
+
+        self.assertEqual(1.0, source.get('voltage'))
+        self.assertEqual('extra 1', source.get('extra'))
+        self.assertEqual(1.0, source.get('voltage'))
+        self.assertEqual(2.0, source.get('voltage', refresh=True))
+        self.assertEqual('extra 2', source.get('extra'))
+        self.assertEqual(2, source.reads)
+        self.assertRaises(ValueError, source.get, 'current')
+        self.assertEqual(['voltage'],
+                         [channel.name for channel in source.logged_channels()])
+
+    def test_dmm(self):
+        """ The DMM reads both displays together and derives the flags.
+        """
+        sim = SimulatedDMM('DM3058E', voltage=3.6, current=-0.02)
+        source = Measurement_Sources.create('DMM', backend=sim,
+                                            invert_current=True,
+                                            taper_current=0.05,
+                                            min_voltage=2.5)
+        with source:
+            self.assertAlmostEqual(3.6, source.get('voltage'))
+            self.assertAlmostEqual(-0.02, source.get('current'))
+            self.assertTrue(source.get('fully_charged'))
+
+            transactions = sim.transactions
+            self.assertFalse(source.get('discharged', refresh=True))
+            self.assertEqual(transactions + 2, sim.transactions)
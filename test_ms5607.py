@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy
+
+import MS5607
+
+
+class MS5607SimTest(TestCase):
+    def setUp(self):
+        self.prom_delay = MS5607.MS5607_PROM_S_DELAY
+        MS5607.MS5607_PROM_S_DELAY = 0
+        self.transport = MS5607.SimulatedTransport()
+        self.sensor = MS5607.MS5607(pin_5=0, transport=self.transport)
+
+    def tearDown(self):
+        MS5607.MS5607_PROM_S_DELAY = self.prom_delay
+
+    def test_datasheet_example(self):
+        """ The simulated sensor gives the worked example from the datasheet.
+        """
+        with self.sensor:
+            T, P, valid = self.sensor.sample(4096)
+
+        self.assertTrue(valid)
+        self.assertAlmostEqual(20.00, T, places=1)
+        self.assertAlmostEqual(110002, P, delta=5)
+
+    def test_calibration_is_cached(self):
+        """ The PROM is only read when the sensor is entered.
+        """
+        with self.sensor:
+            transactions = self.transport.transactions
+            self.sensor.sample(256)
+            self.sensor.sample(256)
+
+            # convert, ADC read command and read for each of P and T
+            self.assertEqual(transactions + 12, self.transport.transactions)
+
+    def test_invalid_crc(self):
+        """ A corrupted PROM fails its CRC check.
+        """
+        self.transport.prom[3] ^= 0x0100
+        with self.sensor:
+            T, P, valid = self.sensor.sample(256)
+
+        self.assertFalse(valid)
+
+    def test_stream(self):
+        """ Streaming converts temperature once per temperature_period pressures.
+        """
+        commands = []
+        write = self.transport.write
+
+        def record(address, byte_list):
+            commands.append(byte_list[0])
+            write(address, byte_list)
+
+        with self.sensor:
+            self.transport.write = record
+            samples = list(self.sensor.stream(256, temperature_period=5, count=10))
+
+        conversions = ['T' if command == MS5607.MS5607_CONVERT_T_256 else 'P'
+                       for command in commands
+                       if command in [MS5607.MS5607_CONVERT_T_256,
+                                      MS5607.MS5607_CONVERT_P_256]]
+        self.assertEqual(list('TPPPPPTPPPPP'), conversions)
+        self.assertEqual(10, len(samples))
+        for sample_time, T, P in samples:
+            self.assertAlmostEqual(20.00, T, places=1)
+            self.assertAlmostEqual(110002, P, delta=5)
+
+    def test_compensate_batch(self):
+        """ The vectorised compensation matches the scalar one in every branch.
+        """
+        D1 = numpy.linspace(4000000, 9000000, 50)
+        D2 = numpy.linspace(5000000, 10000000, 50)
+
+        with self.sensor:
+            T, P = MS5607.compensate_batch(self.sensor.prom, D1, D2)
+
+            for i in range(len(D1)):
+                T_ref, P_ref = self.sensor.compensate(D1[i], D2[i])
+                self.assertAlmostEqual(T_ref, T[i])
+                self.assertAlmostEqual(P_ref, P[i], places=6)
+
+        # the low and very low temperature branches are covered
+        self.assertTrue((T < -15).any())
+        self.assertTrue((T > 20).any())
+
+    def test_stream_period(self):
+        """ A temperature period below one is rejected.
+        """
+        with self.sensor:
+            for period in [0, -1]:
+                samples = self.sensor.stream(256, temperature_period=period,
+                                             count=1)
+                self.assertRaises(ValueError, next, samples)
+
+    def test_raw_log(self):
+        """ A raw log read back compensates to the streamed values.
+        """
+        with self.sensor:
+            raw = list(self.sensor.stream(256, temperature_period=5,
+                                          count=10, raw=True))
+            prom = self.sensor.prom
+
+        times = [sample[0] for sample in raw]
+        D1 = [sample[1] for sample in raw]
+        D2 = [sample[2] for sample in raw]
+
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'raw.npz')
+            MS5607.save_raw_log(filename, prom, times, D1, D2)
+            log_times, T, P = MS5607.compensate_raw_log(filename)
+        finally:
+            shutil.rmtree(directory)
+
+        T_ref, P_ref = MS5607.compensate_batch(prom, D1, D2)
+        self.assertEqual(times, list(log_times))
+        self.assertEqual(list(T_ref), list(T))
+        self.assertEqual(list(P_ref), list(P))
+        for i in range(len(T)):
+            self.assertAlmostEqual(20.00, T[i], places=1)
+            self.assertAlmostEqual(110002, P[i], delta=5)
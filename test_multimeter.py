@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+import numpy
+
+from Multimeter import Multimeter
+from Multimeter_Sim import SimulatedDMM
+
+
+class MultimeterSimTest(TestCase):
+    def setUp(self):
+        self.dm3058e = SimulatedDMM('DM3058E', voltage=4.1, current=0.7)
+        self.agilent = SimulatedDMM('34410A', voltage=4.1, current=0.7)
+
+    def test_single_readings(self):
+        """ Each model returns the simulated values through the normal accessors.
+        """
+        for sim in [self.dm3058e, self.agilent]:
+            with Multimeter(sim.model, backend=sim) as dmm:
+                self.assertAlmostEqual(4.1, dmm.get_DC_voltage())
+                self.assertAlmostEqual(0.7, dmm.get_DC_current())
+
+    def test_measure_pair(self):
+        """ The primary and secondary displays are read in one transaction pair.
+        """
+        with Multimeter('DM3058E', backend=self.dm3058e) as dmm:
+            dmm.get_DC_current()
+            transactions = self.dm3058e.transactions
+            pair = dmm.measure_pair()
+
+            self.assertAlmostEqual(0.7, pair.primary)
+            self.assertAlmostEqual(4.1, pair.secondary)
+            self.assertEqual(transactions + 2, self.dm3058e.transactions)
+
+    def test_burst(self):
+        """ A 34410A burst is transferred as a single binary block.
+        """
+        with Multimeter('34410A', backend=self.agilent) as dmm:
+            times, readings = dmm.get_burst('dc_current', 1000, 0.001)
+
+            self.assertEqual(1000, len(readings))
+            self.assertAlmostEqual(0.999, times[-1])
+            self.assertAlmostEqual(0.7, readings.mean())
+
+            # single readings still work after the burst
+            self.assertAlmostEqual(4.1, dmm.get_DC_voltage())
+            self.assertEqual(1, self.agilent.sample_count)
+            self.assertEqual('IMMEDIATE', self.agilent.sample_source)
+
+    def test_paced_burst(self):
+        """ A DM3058E burst is paced at the interval and timestamped as each
+            reading arrives.
+        """
+        with Multimeter('DM3058E', backend=self.dm3058e) as dmm:
+            times, readings = dmm.get_burst('dc_current', 5, 0.02, 1.0)
+
+            self.assertEqual(5, len(readings))
+            self.assertEqual(0.0, times[0])
+            self.assertTrue(times[-1] >= 0.075)
+            self.assertTrue((numpy.diff(times) > 0.015).all())
+            self.assertAlmostEqual(0.7, readings.mean())
+            self.assertEqual(1.0, self.dm3058e.nplc)
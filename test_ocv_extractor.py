@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy
+
+import OCV_Extractor
+
+
+def synthetic_profile(resistance=0.1, capacity=2.0, current=1.0):
+    """ A rest, a constant current discharge, a rest and a constant current
+        charge of a cell whose OCV rises linearly from 3.0 V to 4.2 V.
+    """
+    duration = capacity/current*3600
+    time = numpy.arange(0, 2*duration + 200, 10.0)
+    current_profile = numpy.zeros(len(time))
+    current_profile[(time >= 50) & (time < 50 + duration)] = current
+    current_profile[(time >= 100 + duration) &
+                    (time < 100 + 2*duration)] = -current
+
+    charge = numpy.concatenate(([0.0], numpy.cumsum(
+        current_profile[:-1]*numpy.diff(time))))/3600
+    soc = 1 - charge/capacity
+    voltage = 3.0 + 1.2*soc - current_profile*resistance
+    return time, voltage, current_profile
+
+
+class OCVExtractorTest(TestCase):
+    def test_parse_name(self):
+        """ The cell and current label come from the filename.
+        """
+        self.assertEqual(('MJ1', '700mA'),
+                         OCV_Extractor.parse_name('Profile Log MJ1_700mA.csv'))
+        self.assertEqual(('25R', None),
+                         OCV_Extractor.parse_name('Profile Log 25R_1.csv'))
+
+    def test_extract_curve(self):
+        """ The IR drop is removed and SOC follows the integrated current.
+        """
+        result = OCV_Extractor.extract_curve(*synthetic_profile())
+
+        self.assertAlmostEqual(0.1, result['resistance'], places=2)
+        self.assertAlmostEqual(2.0, result['capacity'], places=2)
+        self.assertAlmostEqual(2.0, result['charge_capacity'], places=2)
+        expected = 3.0 + 1.2*OCV_Extractor.soc_grid
+        self.assertTrue(numpy.allclose(expected, result['ocv'], atol=0.01))
+
+    def test_cache(self):
+        """ A second extraction of the same log is read from the cache.
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'Profile Log TEST_1000mA.csv')
+            numpy.savetxt(filename, numpy.column_stack(synthetic_profile()),
+                          delimiter='\t', header='Time (s)\tVoltage\tCurrent',
+                          comments='')
+            cache_dir = os.path.join(directory, 'cache')
+
+            first = OCV_Extractor.extract_file(filename, cache_dir)
+            self.assertEqual(1, len(os.listdir(cache_dir)))
+            second = OCV_Extractor.extract_file(filename, cache_dir)
+
+            self.assertAlmostEqual(first['capacity'], second['capacity'])
+            self.assertTrue(numpy.allclose(first['ocv'], second['ocv']))
+        finally:
+            shutil.rmtree(directory)
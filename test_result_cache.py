@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import Result_Cache
+
+
+def load_text(filename):
+    with open(filename) as cached:
+        return cached.read()
+
+
+def save_text(filename, result):
+    with open(filename, 'w') as cached:
+        cached.write(result)
+
+
+def length(filename, cache_dir):
+    with open(filename) as log_file:
+        text = log_file.read()
+    if len(text) == 0:
+        raise ValueError('empty log')
+    return len(text)
+
+
+def cached_length(filename, cache_dir):
+    return int(Result_Cache.cached(filename, cache_dir, '1', '.txt',
+                                   lambda: str(length(filename, cache_dir)),
+                                   load_text, save_text))
+
+
+class ResultCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, 'cache')
+        self.log_file = os.path.join(self.directory, 'log.csv')
+        with open(self.log_file, 'w') as log_file:
+            log_file.write('time,voltage\n0,4.2\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hash(self):
+        """ The hash changes with the contents and the version.
+        """
+        first = Result_Cache.file_hash(self.log_file, '1')
+        self.assertEqual(first, Result_Cache.file_hash(self.log_file, '1'))
+        self.assertNotEqual(first, Result_Cache.file_hash(self.log_file, '2'))
+
+    def test_cached(self):
+        """ A result is computed once, and an entry can be replaced.
+        """
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'result'
+
+        for _ in range(2):
+            self.assertEqual('result', Result_Cache.cached(
+                self.log_file, self.cache_dir, '1', '.txt', compute,
+                load_text, save_text))
+        self.assertEqual(1, len(calls))
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+        # another worker may have written the same entry in the meantime
+        entry = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        save_text(entry + '.tmp', 'again')
+        Result_Cache.replace_file(entry + '.tmp', entry)
+        self.assertEqual('again', load_text(entry))
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+    def test_cold_cache(self):
+        """ Workers starting on a cold cache all create its directory and
+            write their entries without clashing.
+        """
+        filenames = []
+        for index in range(16):
+            filenames.append(os.path.join(self.directory,
+                                          'log %d.csv' % index))
+            shutil.copy(self.log_file, filenames[-1])
+
+        self.assertEqual([19]*16, Result_Cache.map_files(
+            cached_length, filenames, self.cache_dir, 8))
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+    def test_map_files(self):
+        """ Files are processed in parallel, in order, and skipped files
+            have no result.
+        """
+        empty = os.path.join(self.directory, 'empty.csv')
+        open(empty, 'w').close()
+
+        self.assertEqual([19, None], Result_Cache.map_files(
+            length, [self.log_file, empty], None, 2, (ValueError,)))
+        self.assertEqual([], Result_Cache.map_files(length, [], None))
@@ -0,0 +1,69 @@
+from unittest import TestCase
+
+import Scheduler
+from Battery_Sim import VirtualClock
+from Scheduler import Histogram, PeriodicScheduler
+
+
+class HistogramTest(TestCase):
+    def test_bins(self):
+        """ Values are counted into the bin whose upper edge they are under.
+        """
+        histogram = Histogram([0.001, 0.01])
+        for value in [0.0005, 0.005, 0.005, 0.5]:
+            histogram.add(value)
+
+        self.assertEqual([1, 2, 1], histogram.counts)
+        self.assertAlmostEqual(0.5, histogram.maximum)
+        self.assertAlmostEqual(0.5105 / 4, histogram.mean())
+
+
+class PeriodicSchedulerTest(TestCase):
+    def setUp(self):
+        self.clock = VirtualClock(start=100.0)
+        self.scheduler = PeriodicScheduler(1.0, clock=self.clock)
+        self.scheduler.start()
+
+    def test_no_drift(self):
+        """ The time taken by the work does not add to the period.
+        """
+        for tick in range(1, 11):
+            self.clock.now += 0.3
+            self.assertAlmostEqual(tick, self.scheduler.wait())
+
+        self.assertAlmostEqual(10.0, self.scheduler.elapsed())
+        self.assertEqual(10, self.scheduler.ticks)
+        self.assertEqual(0, self.scheduler.missed)
+
+    def test_missed_deadlines(self):
+        """ Late ticks are counted and whole missed periods are skipped.
+        """
+        self.clock.now += 2.5
+        deadline = self.scheduler.wait()
+
+        self.assertEqual(1, self.scheduler.missed)
+        self.assertEqual(1, self.scheduler.skipped)
+        self.assertAlmostEqual(2.0, deadline)
+        self.assertAlmostEqual(1.5, self.scheduler.overrun.maximum)
+
+        # the next deadline stays on the grid
+        self.assertAlmostEqual(3.0, self.scheduler.wait())
+        self.assertAlmostEqual(3.0, self.scheduler.elapsed())
+
+    def test_change_period(self):
+        """ A new period applies from the last deadline.
+        """
+        self.scheduler.wait()
+        self.assertAlmostEqual(1.25, self.scheduler.wait(0.25))
+        self.assertIn('2 deadlines, 0 missed', self.scheduler.report())
+
+    def test_monotonic(self):
+        """ The default clock never goes backwards and is named in the
+            report.
+        """
+        times = [Scheduler.monotonic() for _ in range(1000)]
+        self.assertEqual(sorted(times), times)
+
+        scheduler = PeriodicScheduler(1.0)
+        self.assertIn(Scheduler.monotonic_name, scheduler.report())
+        self.assertIn('VirtualClock', self.scheduler.report())
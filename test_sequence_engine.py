@@ -0,0 +1,190 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import Sequence_Engine
+from Battery_Sim import VirtualClock
+from Sequence_Engine import Sequence, State, Transition
+
+
+class SequenceTest(TestCase):
+    def setUp(self):
+        self.clock = VirtualClock(start=0.0)
+        self.level = 0
+        self.entered = []
+
+    def build(self, sample=None, checkpoint=None):
+        def enter(seq):
+            self.entered.append(seq.state.name)
+
+        def rise(seq):
+            self.level += 1
+
+        return Sequence([
+            State('RISE', entry=enter, actions=[rise],
+                  transitions=[Transition('HOLD', lambda seq: self.level >= 3)]),
+            State('HOLD', entry=enter, timeout=10, timeout_target='DONE'),
+            State('DONE', entry=enter, final=True),
+            ], 'RISE', sample=sample, clock=self.clock, checkpoint=checkpoint)
+
+    def test_run(self):
+        """ Transitions are debounced and timeouts use the sequence clock.
+        """
+        seq = self.build()
+        seq.run()
+
+        self.assertEqual(['RISE', 'HOLD', 'DONE'], self.entered)
+        # the guard first passes on the third tick and must pass twice
+        self.assertEqual(4, self.level)
+        self.assertTrue(seq.is_complete())
+        # HOLD is entered on the fourth tick and times out 11 ticks later
+        self.assertAlmostEqual(3 + 11, seq.elapsed())
+
+    def test_bad_data_holds_state(self):
+        """ Transitions are not checked on ticks with bad data.
+        """
+        seq = self.build(sample=lambda seq: False)
+        for i in range(10):
+            seq.step()
+
+        self.assertEqual('RISE', seq.state.name)
+        seq.close()
+
+    def test_undefined_target(self):
+        """ A transition to a state that does not exist is rejected.
+        """
+        self.assertRaises(ValueError, Sequence,
+                          [State('A', transitions=[Transition('B', bool)])],
+                          'A')
+
+    def test_checkpoint_resume(self):
+        """ A sequence resumes from its checkpoint with its timing and
+        debounce counts, and the checkpoint is removed on completion.
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'checkpoint.json')
+            checkpoint = Sequence_Engine.Checkpoint(filename, period=0,
+                                                    extra={'log': 'a.csv'})
+            seq = self.build(checkpoint=checkpoint)
+            for i in range(3):
+                seq.step()
+                seq.wait()
+            seq.close()
+
+            # the guard has passed once in RISE
+            saved = Sequence_Engine.Checkpoint(filename).load()
+            self.assertEqual('RISE', saved['state'])
+            self.assertEqual([1], saved['debounce_counts'])
+            self.assertEqual('a.csv', saved['extra']['log'])
+
+            # a second process picks up where the first left off
+            self.clock.now += 100
+            self.entered = []
+            resumed = self.build(checkpoint=checkpoint)
+            resumed.resume(saved)
+            self.assertEqual(0, resumed.start_time)
+            # the entry action of RISE already ran before the checkpoint
+            resumed.step()
+            self.assertEqual(['HOLD'], self.entered)
+
+            resumed.run()
+            self.assertFalse(os.path.exists(filename))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_checkpoint_check(self):
+        """ Only a recent checkpoint saved for the same unit is resumed.
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'checkpoint.json')
+            checkpoint = Sequence_Engine.Checkpoint(
+                filename, identity={'pack_serial': 7}, max_age=60)
+            seq = self.build(checkpoint=checkpoint)
+            seq.step()
+            checkpoint.save(seq)
+            seq.close()
+            saved = checkpoint.load()
+
+            checkpoint.check(saved, self.clock.now + 60)
+            self.assertRaises(ValueError, checkpoint.check, saved,
+                              self.clock.now + 61)
+
+            other = Sequence_Engine.Checkpoint(
+                filename, identity={'pack_serial': 8}, max_age=60)
+            self.assertRaises(ValueError, other.check, saved, self.clock.now)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_adaptive_states(self):
+        """ The sampler only stretches the period in adaptive states.
+        """
+        class SlowSampler(object):
+            period = 30.0
+
+            def trigger(self):
+                pass
+
+        seq = Sequence([
+            State('LOAD', sample_period=1.0,
+                  transitions=[Transition('REST', lambda seq: True, 1)]),
+            State('REST', sample_period=1.0, adaptive=True, final=True),
+            ], 'LOAD', clock=self.clock, sampler=SlowSampler())
+        seq.start()
+        seq.wait()
+        self.assertAlmostEqual(1.0, self.clock.now)
+        seq.step()
+        seq.wait()
+        self.assertAlmostEqual(31.0, self.clock.now)
+        seq.close()
+
+    def test_actions_in_order(self):
+        """ Actions run one after another in order, and a failure stops the
+        rest and moves the sequence to its fault state.
+        """
+        calls = []
+
+        def configure(seq):
+            calls.append('configure')
+            if len(calls) > 2:
+                raise IOError('no response')
+
+        def connect(seq):
+            calls.append('connect')
+
+        seq = Sequence([
+            State('RUN', actions=[configure, connect]),
+            State('FAULT', final=True),
+            ], 'RUN', clock=self.clock, fault_state='FAULT')
+        seq.run()
+
+        self.assertEqual(['configure', 'connect', 'configure'], calls)
+        self.assertTrue(seq.faulted)
+        self.assertEqual('FAULT', seq.state.name)
+
+    def test_action_failure_stops(self):
+        """ Without a fault state a failed action stops the sequence.
+        """
+        def fail(seq):
+            raise IOError('no response')
+
+        seq = Sequence([State('RUN', actions=[fail])], 'RUN',
+                       clock=self.clock)
+        self.assertRaises(Sequence_Engine.ActionError, seq.run)
+
+    def test_concurrent_actions(self):
+        """ Actions only run at the same time when the state asks for it.
+        """
+        calls = []
+        seq = Sequence([
+            State('RUN', actions=[lambda seq: calls.append(1),
+                                  lambda seq: calls.append(2)],
+                  concurrent=True,
+                  transitions=[Transition('DONE', lambda seq: True, 1)]),
+            State('DONE', final=True),
+            ], 'RUN', clock=self.clock)
+        seq.run()
+
+        self.assertEqual([1, 2], sorted(calls))
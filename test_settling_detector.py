@@ -0,0 +1,65 @@
+import math
+from unittest import TestCase
+
+from Battery_Sim import VirtualClock
+from Settling_Detector import SettlingDetector, wait_until_settled
+
+
+class SettlingDetectorTest(TestCase):
+    def run_signal(self, detector, signal, period=0.2, duration=30):
+        t = 0.0
+        detector.start(t)
+        while t <= duration:
+            if detector.add(t, signal(t)):
+                break
+            t += period
+        return detector
+
+    def test_exponential(self):
+        """ A decaying step settles once its slope is under the threshold.
+        """
+        detector = self.run_signal(
+            SettlingDetector(1.0, 0.01, 0.005, 20),
+            lambda t: 4.0 + 0.5*math.exp(-t/2.0))
+
+        self.assertTrue(detector.settled)
+        self.assertFalse(detector.timed_out)
+        # the slope is 0.01 V/s at 6.4 s, judged over the 1 s before
+        self.assertTrue(6.4 < detector.settling_time < 8.5)
+        self.assertAlmostEqual(4.0, detector.mean()[0], places=1)
+
+    def test_noise(self):
+        """ A flat but noisy signal times out at the maximum dwell.
+        """
+        detector = self.run_signal(
+            SettlingDetector(1.0, 0.01, 0.005, 5),
+            lambda t: 4.0 + (0.02 if int(round(t/0.2)) % 2 else -0.02))
+
+        self.assertFalse(detector.settled)
+        self.assertTrue(detector.timed_out)
+        self.assertAlmostEqual(5.0, detector.settling_time, places=6)
+
+    def test_every_signal(self):
+        """ Every signal must be steady, and the window must be spanned.
+        """
+        detector = self.run_signal(
+            SettlingDetector(2.0, [0.01, 0.01], [0.005, 0.005], 10),
+            lambda t: [4.0, 1.0 + 0.1*max(3.0 - t, 0)])
+
+        self.assertTrue(detector.settled)
+        self.assertTrue(4.5 <= detector.settling_time < 5.5)
+        self.assertRaises(ValueError, detector.add, 0, 4.0)
+        detector.start()
+        self.assertRaises(ValueError, detector.add, 0, 4.0)
+        self.assertRaises(ValueError, SettlingDetector, 5, 0.1, 0.1, 2)
+
+    def test_wait(self):
+        """ Readings are taken every period until the signal settles.
+        """
+        clock = VirtualClock(start=100.0)
+        detector = SettlingDetector(1.0, 0.01, 0.005, 10)
+
+        settling_time = wait_until_settled(detector, lambda: 4.0, 0.25,
+                                           clock.time, clock.sleep)
+        self.assertAlmostEqual(1.0, settling_time)
+        self.assertAlmostEqual(101.0, clock.now)
@@ -0,0 +1,124 @@
+import time
+from unittest import TestCase
+
+import Victor_test
+from Victor_test import (DMMData, DMMDeviceError, DMMStreamReader,
+                         DMMTimeout, decode_victor86b)
+
+DIGIT_CODES = dict([(text, code) for code, text in
+                    Victor_test.VICTOR86B_DIGITS.items()])
+
+
+def victor_frame(lcd, units=(0x8F, 0x6E, 0x8C), mode='DC'):
+    """ Encode four LCD digits, each with an optional leading '-' or '.',
+        into a raw 14 byte Victor 86B frame.
+    """
+    frame = [0]*14
+    digits = []
+    for text in lcd:
+        if text in '-.':
+            digits.append([0x10, None])
+        elif digits and digits[-1][1] is None:
+            digits[-1][1] = text
+        else:
+            digits.append([0, text])
+
+    positions = [(10, 3), (9, 6), (7, 5), (0, 2)]
+    for i, (flag, text) in enumerate(digits):
+        raw = ((DIGIT_CODES[text] | flag) -
+               Victor_test.VICTOR86B_OFFSETS[i]) & 0xFF
+        high, low = positions[i]
+        frame[high] |= raw & 0xF0
+        frame[low] |= (raw & 0x0F) << 4
+
+    frame[1] = 0x57 if mode == 'DC' else 0x47
+    frame[4] = 0x71
+    frame[11:14] = units
+    return frame
+
+
+class FakeDMM(object):
+    def __init__(self, frames, error=None):
+        self.frames = list(frames)
+        self.error = error
+
+    def read_raw(self):
+        if self.frames:
+            ret = DMMData()
+            ret.rawData = self.frames.pop(0)
+            return ret
+        if self.error is not None:
+            raise self.error
+        time.sleep(0.001)
+        raise DMMTimeout('No data available')
+
+
+class VictorTest(TestCase):
+    def decode(self, frame):
+        ret = DMMData()
+        ret.rawData = frame
+        return decode_victor86b(ret)
+
+    def test_decode(self):
+        """ The digits, decimal point, units and mode are read from a frame.
+        """
+        ret = self.decode(victor_frame('1.234'))
+        self.assertEqual('1.234', ret.lcd)
+        self.assertEqual('V', ret.units)
+        self.assertEqual('DC', ret.mode)
+
+        ret = self.decode(victor_frame('-0L 9', units=(0x8F, 0x6E, 0x7C),
+                                       mode='AC'))
+        self.assertEqual('-0L 9', ret.lcd)
+        self.assertEqual('A', ret.units)
+        self.assertEqual('AC', ret.mode)
+
+    def test_decode_invalid(self):
+        """ A digit that is not a segment pattern is a data error.
+        """
+        frame = victor_frame('1234')
+        raw = Victor_test.VICTOR86B_DIGIT_TABLES[0].index(None)
+        frame[10] = raw & 0xF0
+        frame[3] = (raw & 0x0F) << 4
+        self.assertRaises(Victor_test.DMMDataError, self.decode, frame)
+
+    def test_reader(self):
+        """ Good frames are queued with their time and bad ones counted.
+        """
+        frames = [victor_frame('1.234'), [0]*13, victor_frame('0.500')]
+        reader = DMMStreamReader(FakeDMM(frames), max_timeouts=5)
+        reader.start()
+        reader.join(2)
+
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(2, reader.frames)
+        self.assertEqual(1, reader.bad_frames)
+        self.assertEqual(5, reader.timeouts)
+        self.assertTrue(isinstance(reader.error, DMMTimeout))
+        self.assertEqual('1.234', reader.get(0)[1].lcd)
+        self.assertEqual('0.500', reader.get(0)[1].lcd)
+
+    def test_reader_device_error(self):
+        """ The thread stops when the meter goes away.
+        """
+        error = DMMDeviceError('No such device')
+        reader = DMMStreamReader(FakeDMM([victor_frame('1234')],
+                                         error=error))
+        reader.start()
+        reader.join(2)
+
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(1, reader.frames)
+        self.assertTrue(reader.error is error)
+
+    def test_reader_stop(self):
+        """ A reader that is only timing out can be stopped.
+        """
+        reader = DMMStreamReader(FakeDMM([]), max_timeouts=None)
+        reader.start()
+        time.sleep(0.01)
+        reader.stop()
+
+        self.assertFalse(reader.is_alive())
+        self.assertTrue(reader.timeouts > 0)
+        self.assertTrue(reader.error is None)